@@ -2,13 +2,35 @@ import os
 import json
 import csv
 import re
+import time
 from difflib import SequenceMatcher
+from candidate_store import CandidateStore, CANDIDATE_STORE
+from field_cleaning import normalize_street
+from prefetch_reader import prefetch
+from parcel_scheduler import process_parcels, PARCEL_WORKERS
+from input_discovery import iter_input_files
+from run_metrics import RunMetrics
+from slow_parcels import SlowParcelCapture
+from compressed_io import dump_json
+from extraction_profiles import produces
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 INPUT_DIR = './input/'
 POSSIBLE_ADDRESSES_DIR = './possible_addresses/'
+# Packed store built by candidate_store.py; used instead of the directory when present
+POSSIBLE_ADDRESSES_STORE = './possible_addresses.sqlite'
 SEED_CSV = './seed.csv'
 OUTPUT_FILE = './owners/addresses_mapping.json'
 SCHEMA_FILE = './schemas/address.json'
+FUZZY_THRESHOLD = 0.85
+# Opt-in vectorized fuzzy matching (needs numpy); parcels are resolved in chunks either way
+BATCH_MATCHING = os.environ.get('BATCH_MATCHING') == '1'
+BATCH_CHUNK_SIZE = 2048
+# Without the address entity, data_extractor only needs each parcel's source_http_request
+REQUEST_FIELDS = ['source_http_request', 'request_identifier']
 
 # Helper: Parse address string (e.g., '1605 S US HIGHWAY 1 3E')
 def parse_address(address_str):
@@ -66,119 +88,327 @@ def load_seed():
             mapping[row['parcel_id']] = row
     return mapping
 
+# Load possible addresses for one parcel from the packed store or the per-parcel file
+def load_possible_addresses(parcel_id, store=None, prefetched=None):
+    if store is not None:
+        return store.get(parcel_id)
+    if prefetched is not None:
+        return json.loads(prefetched)
+    pa_path = os.path.join(POSSIBLE_ADDRESSES_DIR, f'{parcel_id}.json')
+    if not os.path.exists(pa_path):
+        return None
+    with open(pa_path, 'r') as f:
+        return json.load(f)
+
+def exact_match(parsed, candidates):
+    for cand in candidates:
+        if (str(cand['number']) == parsed['number'] and
+            normalize_street(cand['street']) == normalize_street(parsed['street']) and
+            (not parsed['unit'] or (cand['unit'] or '').lower() == (parsed['unit'] or '').lower())):
+            return cand
+    return None
+
+def candidate_key(cand):
+    return f"{cand['number']} {cand['street']} {(cand['unit'] or '')}"
+
+def seed_key(parsed):
+    return f"{parsed['number']} {parsed['street']} {(parsed['unit'] or '')}"
+
+def fuzzy_best_match(parsed, candidates):
+    match = None
+    best_score = 0
+    target = seed_key(parsed)
+    for cand in candidates:
+        score = fuzzy_match(candidate_key(cand), target)
+        if score > best_score and score > FUZZY_THRESHOLD:
+            best_score = score
+            match = cand
+    return match
+
+# Batch fuzzy matching for a chunk of parcels. Character count vectors for all
+# seeds and candidates give SequenceMatcher.quick_ratio(), an exact upper bound
+# on ratio(), for every candidate in one vectorized pass. Only candidates whose
+# bound clears the threshold and can still beat the best score so far get a
+# real SequenceMatcher, so the pick is identical to fuzzy_best_match.
+def fuzzy_best_matches_batch(jobs):
+    if not jobs:
+        return []
+    seeds = [seed_key(parsed).lower() for parsed, _ in jobs]
+    cand_strs = []
+    owners = []
+    for i, (_, candidates) in enumerate(jobs):
+        for cand in candidates:
+            cand_strs.append(candidate_key(cand).lower())
+            owners.append(i)
+    if not cand_strs:
+        return [None] * len(jobs)
+    counts, lengths = _char_counts(seeds + cand_strs)
+    owners = np.asarray(owners)
+    inter = np.minimum(counts[len(seeds):], counts[owners]).sum(axis=1)
+    bounds = 2.0 * inter / (lengths[len(seeds):] + lengths[owners])
+    matches = []
+    start = 0
+    for i, (_, candidates) in enumerate(jobs):
+        end = start + len(candidates)
+        chunk = bounds[start:end]
+        viable = np.nonzero(chunk > FUZZY_THRESHOLD)[0]
+        # Highest bound first; stable sort keeps earlier candidates first on ties
+        order = viable[np.argsort(-chunk[viable], kind='stable')]
+        best_score = 0
+        best_idx = None
+        for idx in order:
+            if chunk[idx] < best_score:
+                break
+            score = SequenceMatcher(None, cand_strs[start + idx], seeds[i]).ratio()
+            if score > FUZZY_THRESHOLD and (score > best_score or (score == best_score and idx < best_idx)):
+                best_score = score
+                best_idx = idx
+        matches.append(candidates[best_idx] if best_idx is not None else None)
+        start = end
+    return matches
+
+# Character counts per text as a texts x vocabulary matrix, plus text lengths.
+# All texts are encoded as one array of code points and counted with a single
+# bincount over (row, character) cells. The vocabulary is only the characters
+# the chunk uses (a few dozen for addresses), so the dense matrix stays small.
+def _char_counts(texts):
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer(''.join(texts).encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    vocab, columns = np.unique(codes, return_inverse=True)
+    rows = np.repeat(np.arange(len(texts)), lengths)
+    cells = np.bincount(rows * len(vocab) + columns, minlength=len(texts) * len(vocab))
+    return cells.reshape(len(texts), len(vocab)).astype(np.int32), lengths
+
+def build_address(parcel_id, seed_row, cand):
+    county = seed_row['County']
+    # Build address object (fix: use candidate for street fields, clean up street_name)
+    # Extract directional and suffix from candidate street
+    street_parts = cand['street'].split()
+    pre_dir = None
+    post_dir = None
+    suffix = None
+    street_name_parts = []
+    # Directional abbreviations
+    dirs = {'N', 'S', 'E', 'W', 'NE', 'NW', 'SE', 'SW'}
+    suffixes = {'Rds','Blvd','Lk','Pike','Ky','Vw','Curv','Psge','Ldg','Mt','Un','Mdw','Via','Cor','Kys','Vl','Pr','Cv','Isle','Lgt','Hbr','Btm','Hl','Mews','Hls','Pnes','Lgts','Strm','Hwy','Trwy','Skwy','Is','Est','Vws','Ave','Exts','Cvs','Row','Rte','Fall','Gtwy','Wls','Clb','Frk','Cpe','Fwy','Knls','Rdg','Jct','Rst','Spgs','Cir','Crst','Expy','Smt','Trfy','Cors','Land','Uns','Jcts','Ways','Trl','Way','Trlr','Aly','Spg','Pkwy','Cmn','Dr','Grns','Oval','Cirs','Pt','Shls','Vly','Hts','Clf','Flt','Mall','Frds','Cyn','Lndg','Mdws','Rd','Xrds','Ter','Prt','Radl','Grvs','Rdgs','Inlt','Trak','Byu','Vlgs','Ctr','Ml','Cts','Arc','Bnd','Riv','Flds','Mtwy','Msn','Shrs','Rue','Crse','Cres','Anx','Drs','Sts','Holw','Vlg','Prts','Sta','Fld','Xrd','Wall','Tpke','Ft','Bg','Knl','Plz','St','Cswy','Bgs','Rnch','Frks','Ln','Mtn','Ctrs','Orch','Iss','Brks','Br','Fls','Trce','Park','Gdns','Rpds','Shl','Lf','Rpd','Lcks','Gln','Pl','Path','Vis','Lks','Run','Frg','Brg','Sqs','Xing','Pln','Glns','Blfs','Plns','Dl','Clfs','Ext','Pass','Gdn','Brk','Grn','Mnr','Cp','Pne','Spur','Opas','Upas','Tunl','Sq','Lck','Ests','Shr','Dm','Mls','Wl','Mnrs','Stra','Frgs','Frst','Flts','Ct','Mtns','Frd','Nck','Ramp','Vlys','Pts','Bch','Loop','Byp','Cmns','Fry','Walk','Hbrs','Dv','Hvn','Blf','Grv','Crk'}
+    # Pre-directional
+    if street_parts and street_parts[0].upper() in dirs:
+        pre_dir = street_parts[0].upper()
+        street_parts = street_parts[1:]
+    # Post-directional
+    if street_parts and street_parts[-1].upper() in dirs:
+        post_dir = street_parts[-1].upper()
+        street_parts = street_parts[:-1]
+    # Suffix
+    if street_parts and street_parts[-1].replace('.','').capitalize() in suffixes:
+        suffix = street_parts[-1].replace('.','').capitalize()
+        street_parts = street_parts[:-1]
+    # The rest is street name
+    street_name = ' '.join(street_parts).upper()
+    # Remove any unit or city name from street_name
+    if cand['unit'] and street_name.endswith(cand['unit'].upper()):
+        street_name = street_name[:-(len(cand['unit'])+1)].strip()
+    if cand['city'] and street_name.endswith(cand['city'].upper()):
+        street_name = street_name[:-(len(cand['city'])+1)].strip()
+    address_obj = {
+        'source_http_request': {
+            'method': seed_row['method'],
+            'url': seed_row['url'],
+            'multiValueQueryString': json.loads(seed_row['multiValueQueryString']) if seed_row['multiValueQueryString'] else {},
+        },
+        'request_identifier': parcel_id,
+        'city_name': (cand['city'] or '').upper(),
+        'country_code': 'US',
+        'county_name': county,
+        'latitude': cand['coordinates'][1],
+        'longitude': cand['coordinates'][0],
+        'plus_four_postal_code': None,  # Not available
+        'postal_code': cand['postcode'],
+        'state_code': 'FL',  # Assume FL for now
+        'street_name': street_name,
+        'street_post_directional_text': post_dir,
+        'street_pre_directional_text': pre_dir,
+        'street_number': cand['number'],
+        'street_suffix_type': suffix,
+        'unit_identifier': cand['unit'] if cand['unit'] else None,
+        'township': None,
+        'range': None,
+        'section': None,
+        'block': None
+    }
+    return address_obj
+
+# Settles a parcel that needs no matching and returns None, otherwise returns
+# its (parcel_id, parsed, candidates) for resolve_matches
+def prepare_parcel(parcel_id, seed_row, pa_data, schema, result, metrics):
+    if pa_data is None:
+        print(f'Warning: possible_addresses file missing for {parcel_id}')
+        metrics.error('possible_addresses_missing')
+        return None
+    # Support both formats: dict (already mapped) or list (raw candidates)
+    if isinstance(pa_data, dict) and f'property_{parcel_id}' in pa_data:
+        # Already mapped, just copy
+        result[f'property_{parcel_id}'] = pa_data[f'property_{parcel_id}']
+        return None
+    candidates = pa_data if isinstance(pa_data, list) else []
+    if not produces('address') and resolve_request_only(parcel_id, seed_row, candidates, schema, result, metrics):
+        return None
+    return parcel_id, parse_address(seed_row['Address']), candidates
+
+# Each parcel worker opens its own store; an SQLite connection can't cross a fork
+_worker_store = None
+
+def worker_store():
+    global _worker_store
+    if _worker_store is None or _worker_store[0] != os.getpid():
+        _worker_store = (os.getpid(), CandidateStore(POSSIBLE_ADDRESSES_STORE))
+    return _worker_store[1]
+
+# One parcel's addresses_mapping.json entries, matched on its own (PARCEL_WORKERS)
+def match_parcel(item, prefetched, context):
+    parcel_id, _ = item
+    seed, schema, batch, use_store, metrics = context
+    entries = {}
+    pa_data = load_possible_addresses(parcel_id, worker_store() if use_store else None,
+                                      prefetched[0] if prefetched else None)
+    job = prepare_parcel(parcel_id, seed[parcel_id], pa_data, schema, entries, metrics)
+    if job is not None:
+        resolve_matches([job], seed, schema, entries, batch, metrics)
+    return entries
+
 # Main processing
 def main():
     schema = load_schema()
     seed = load_seed()
+    store = None
+    if CANDIDATE_STORE:
+        if os.path.exists(POSSIBLE_ADDRESSES_STORE):
+            store = CandidateStore(POSSIBLE_ADDRESSES_STORE)
+        else:
+            print(f'Warning: {POSSIBLE_ADDRESSES_STORE} is missing, reading {POSSIBLE_ADDRESSES_DIR} instead')
+    batch = BATCH_MATCHING and np is not None
+    if BATCH_MATCHING and np is None:
+        print('Warning: numpy is not installed, falling back to per-parcel matching')
     result = {}
-    for fname in os.listdir(INPUT_DIR):
-        if not fname.endswith('.html'):
-            continue
-        parcel_id = fname.replace('.html', '')
-        if parcel_id not in seed:
-            continue
-        address_str = seed[parcel_id]['Address']
-        county = seed[parcel_id]['County']
-        parsed = parse_address(address_str)
-        # Load possible addresses
-        pa_path = os.path.join(POSSIBLE_ADDRESSES_DIR, f'{parcel_id}.json')
-        if not os.path.exists(pa_path):
-            print(f'Warning: possible_addresses file missing for {parcel_id}')
-            continue
-        with open(pa_path, 'r') as f:
-            pa_data = json.load(f)
-        # Support both formats: dict (already mapped) or list (raw candidates)
-        if isinstance(pa_data, dict) and f'property_{parcel_id}' in pa_data:
-            # Already mapped, just copy
-            result[f'property_{parcel_id}'] = pa_data[f'property_{parcel_id}']
-            continue
-        candidates = pa_data if isinstance(pa_data, list) else []
-        # Try exact match first
-        match = None
-        for cand in candidates:
-            if (str(cand['number']) == parsed['number'] and
-                cand['street'].replace('.', '').replace(',', '').replace('  ', ' ').strip().lower() == parsed['street'].replace('.', '').replace(',', '').replace('  ', ' ').strip().lower() and
-                (not parsed['unit'] or (cand['unit'] or '').lower() == (parsed['unit'] or '').lower())):
-                match = cand
-                break
-        # Fuzzy match if needed
-        if not match:
-            best_score = 0
-            for cand in candidates:
-                score = fuzzy_match(f"{cand['number']} {cand['street']} {(cand['unit'] or '')}",
-                                   f"{parsed['number']} {parsed['street']} {(parsed['unit'] or '')}")
-                if score > best_score and score > 0.85:
-                    best_score = score
-                    match = cand
+    pending = []
+    # Only parcels listed in seed.csv are processed
+    metrics = RunMetrics('address_extraction').start(INPUT_DIR, seed.__contains__)
+    slow_parcels = SlowParcelCapture('address_extraction').start()
+    chunk_start = time.perf_counter()
+    parcels = ((parcel_id, path) for parcel_id, path in iter_input_files(INPUT_DIR) if parcel_id in seed)
+    # Read candidate files ahead in the background unless they come from the packed store
+    if store is not None:
+        pa_paths = lambda item: ()
+    else:
+        pa_paths = lambda item: (os.path.join(POSSIBLE_ADDRESSES_DIR, f'{item[0]}.json'),)
+    if PARCEL_WORKERS > 1:
+        # Parcels are matched one by one on the workers, costliest first;
+        # matching time follows the candidate count, which payload size stands in for
+        sizes = store.sizes() if store is not None else None
+        cost = (lambda item: sizes.get(item[0], 0)) if sizes is not None else None
+        context = (seed, schema, batch, store is not None, metrics)
+        for _, entries in process_parcels(parcels, match_parcel, metrics, slow_parcels, context, pa_paths, cost):
+            result.update(entries)
+    else:
+        # Capturing slow parcels needs every parcel timed on its own, so matching isn't chunked then
+        chunk_size = 1 if slow_parcels.enabled else BATCH_CHUNK_SIZE
+        for (parcel_id, path), prefetched in prefetch(parcels, pa_paths):
+            with slow_parcels.parcel(parcel_id, path):
+                if not pending:
+                    chunk_start = time.perf_counter()
+                # Load possible addresses
+                with slow_parcels.phase('load'):
+                    pa_data = load_possible_addresses(parcel_id, store, prefetched[0] if prefetched else None)
+                job = prepare_parcel(parcel_id, seed[parcel_id], pa_data, schema, result, metrics)
+                if job is None:
+                    metrics.observe(0.0)
+                    continue
+                pending.append(job)
+                if len(pending) >= chunk_size:
+                    with slow_parcels.phase('match'):
+                        resolve_matches(pending, seed, schema, result, batch, metrics)
+                    metrics.observe((time.perf_counter() - chunk_start) / len(pending), parcels=len(pending))
+                    pending = []
+        if pending:
+            resolve_matches(pending, seed, schema, result, batch, metrics)
+            metrics.observe((time.perf_counter() - chunk_start) / len(pending), parcels=len(pending))
+    if store is not None:
+        store.close()
+    # Write output
+    _, nbytes = dump_json(result, OUTPUT_FILE)
+    metrics.wrote(nbytes)
+    slow_parcels.close()
+    metrics.close()
+
+def resolve_matches(pending, seed, schema, result, batch, metrics=None):
+    # Try exact match first, then fuzzy match if needed
+    matches = [exact_match(parsed, candidates) for _, parsed, candidates in pending]
+    fuzzy_jobs = [i for i, match in enumerate(matches) if not match]
+    if batch:
+        fuzzy = fuzzy_best_matches_batch([(pending[i][1], pending[i][2]) for i in fuzzy_jobs])
+    else:
+        fuzzy = [fuzzy_best_match(pending[i][1], pending[i][2]) for i in fuzzy_jobs]
+    for i, match in zip(fuzzy_jobs, fuzzy):
+        matches[i] = match
+    for (parcel_id, parsed, candidates), match in zip(pending, matches):
         if not match and candidates:
             match = candidates[0]  # fallback: pick first candidate if only one
         if not match:
             print(f'No match found for {parcel_id}')
+            if metrics is not None:
+                metrics.error('no_match')
             continue  # skip if no match
-        # Build address object (fix: use candidate for street fields, clean up street_name)
-        # Extract directional and suffix from candidate street
-        street_parts = cand['street'].split()
-        pre_dir = None
-        post_dir = None
-        suffix = None
-        street_name_parts = []
-        # Directional abbreviations
-        dirs = {'N', 'S', 'E', 'W', 'NE', 'NW', 'SE', 'SW'}
-        suffixes = {'Rds','Blvd','Lk','Pike','Ky','Vw','Curv','Psge','Ldg','Mt','Un','Mdw','Via','Cor','Kys','Vl','Pr','Cv','Isle','Lgt','Hbr','Btm','Hl','Mews','Hls','Pnes','Lgts','Strm','Hwy','Trwy','Skwy','Is','Est','Vws','Ave','Exts','Cvs','Row','Rte','Fall','Gtwy','Wls','Clb','Frk','Cpe','Fwy','Knls','Rdg','Jct','Rst','Spgs','Cir','Crst','Expy','Smt','Trfy','Cors','Land','Uns','Jcts','Ways','Trl','Way','Trlr','Aly','Spg','Pkwy','Cmn','Dr','Grns','Oval','Cirs','Pt','Shls','Vly','Hts','Clf','Flt','Mall','Frds','Cyn','Lndg','Mdws','Rd','Xrds','Ter','Prt','Radl','Grvs','Rdgs','Inlt','Trak','Byu','Vlgs','Ctr','Ml','Cts','Arc','Bnd','Riv','Flds','Mtwy','Msn','Shrs','Rue','Crse','Cres','Anx','Drs','Sts','Holw','Vlg','Prts','Sta','Fld','Xrd','Wall','Tpke','Ft','Bg','Knl','Plz','St','Cswy','Bgs','Rnch','Frks','Ln','Mtn','Ctrs','Orch','Iss','Brks','Br','Fls','Trce','Park','Gdns','Rpds','Shl','Lf','Rpd','Lcks','Gln','Pl','Path','Vis','Lks','Run','Frg','Brg','Sqs','Xing','Pln','Glns','Blfs','Plns','Dl','Clfs','Ext','Pass','Gdn','Brk','Grn','Mnr','Cp','Pne','Spur','Opas','Upas','Tunl','Sq','Lck','Ests','Shr','Dm','Mls','Wl','Mnrs','Stra','Frgs','Frst','Flts','Ct','Mtns','Frd','Nck','Ramp','Vlys','Pts','Bch','Loop','Byp','Cmns','Fry','Walk','Hbrs','Dv','Hvn','Blf','Grv','Crk'}
-        # Pre-directional
-        if street_parts and street_parts[0].upper() in dirs:
-            pre_dir = street_parts[0].upper()
-            street_parts = street_parts[1:]
-        # Post-directional
-        if street_parts and street_parts[-1].upper() in dirs:
-            post_dir = street_parts[-1].upper()
-            street_parts = street_parts[:-1]
-        # Suffix
-        if street_parts and street_parts[-1].replace('.','').capitalize() in suffixes:
-            suffix = street_parts[-1].replace('.','').capitalize()
-            street_parts = street_parts[:-1]
-        # The rest is street name
-        street_name = ' '.join(street_parts).upper()
-        # Remove any unit or city name from street_name
-        if cand['unit'] and street_name.endswith(cand['unit'].upper()):
-            street_name = street_name[:-(len(cand['unit'])+1)].strip()
-        if cand['city'] and street_name.endswith(cand['city'].upper()):
-            street_name = street_name[:-(len(cand['city'])+1)].strip()
-        address_obj = {
-            'source_http_request': {
-                'method': seed[parcel_id]['method'],
-                'url': seed[parcel_id]['url'],
-                'multiValueQueryString': json.loads(seed[parcel_id]['multiValueQueryString']) if seed[parcel_id]['multiValueQueryString'] else {},
-            },
-            'request_identifier': parcel_id,
-            'city_name': (cand['city'] or '').upper(),
-            'country_code': 'US',
-            'county_name': county,
-            'latitude': cand['coordinates'][1],
-            'longitude': cand['coordinates'][0],
-            'plus_four_postal_code': None,  # Not available
-            'postal_code': cand['postcode'],
-            'state_code': 'FL',  # Assume FL for now
-            'street_name': street_name,
-            'street_post_directional_text': post_dir,
-            'street_pre_directional_text': pre_dir,
-            'street_number': cand['number'],
-            'street_suffix_type': suffix,
-            'unit_identifier': cand['unit'] if cand['unit'] else None,
-            'township': None,
-            'range': None,
-            'section': None,
-            'block': None
-        }
+        address_obj = build_address(parcel_id, seed[parcel_id], match)
         # Validate
         valid, msg = validate_address(address_obj, schema)
         if not valid:
             print(f'Validation failed for {parcel_id}: {msg}')
+            if metrics is not None:
+                metrics.error('validation_failed')
             continue
+        if not produces('address'):
+            address_obj = {k: address_obj[k] for k in REQUEST_FIELDS}
         result[f'property_{parcel_id}'] = {'address': address_obj}
-    # Write output
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(result, f, indent=2)
+
+# One parcel's addresses_mapping.json entry from its possible_addresses
+# payload, or None when nothing matches or validates
+def resolve_address(parcel_id, seed_row, pa_data, schema):
+    key = f'property_{parcel_id}'
+    if isinstance(pa_data, dict) and key in pa_data:
+        return pa_data[key]
+    candidates = pa_data if isinstance(pa_data, list) else []
+    result = {}
+    if produces('address') or not resolve_request_only(parcel_id, seed_row, candidates, schema, result):
+        resolve_matches([(parcel_id, parse_address(seed_row['Address']), candidates)], {parcel_id: seed_row}, schema, result, False)
+    return result.get(key)
+
+# Whether a parcel gets an entry at all depends only on its picked candidate
+# passing validation. When every candidate agrees on that, the pick can't
+# change what is written and matching is skipped; returns False when the
+# candidates disagree and the parcel has to be matched after all.
+def resolve_request_only(parcel_id, seed_row, candidates, schema, result, metrics=None):
+    if not candidates:
+        print(f'No match found for {parcel_id}')
+        if metrics is not None:
+            metrics.error('no_match')
+        return True
+    outcomes = set()
+    for cand in candidates:
+        try:
+            address_obj = build_address(parcel_id, seed_row, cand)
+        except Exception:
+            return False
+        valid, msg = validate_address(address_obj, schema)
+        outcomes.add(valid)
+        if len(outcomes) > 1:
+            return False
+    if valid:
+        result[f'property_{parcel_id}'] = {'address': {k: address_obj[k] for k in REQUEST_FIELDS}}
+    else:
+        print(f'Validation failed for {parcel_id}: {msg}')
+        if metrics is not None:
+            metrics.error('validation_failed')
+    return True
 
 if __name__ == '__main__':
     main()
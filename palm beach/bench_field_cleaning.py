@@ -0,0 +1,72 @@
+import re
+import timeit
+import random
+
+import field_cleaning
+
+# Helpers as they were written inline in data_extractor / owner_processor /
+# address_extraction before field_cleaning existed; kept as the reference.
+def legacy_clean_money(val):
+    if val is None:
+        return None
+    if isinstance(val, (int, float)):
+        return round(float(val), 2)
+    try:
+        return round(float(re.sub(r'[^\d.]', '', val)), 2) if val else None
+    except Exception:
+        return None
+
+def legacy_parse_date(val):
+    if not val:
+        return None
+    m = re.match(r"(\d{2})/(\d{2})/(\d{4})", val)
+    if m:
+        return f"{m.group(3)}-{m.group(1)}-{m.group(2)}"
+    return val
+
+def legacy_split_owner_names(name):
+    names = []
+    for n in re.split(r'\s*&\s*', name):
+        n = n.strip()
+        if n:
+            names.append(n)
+    return tuple(names)
+
+def legacy_normalize_street(street):
+    return street.replace('.', '').replace(',', '').replace('  ', ' ').strip().lower()
+
+def sample_values(n=20000, seed=0):
+    rng = random.Random(seed)
+    money = [rng.choice([f'${rng.randint(0, 2000) * 1000:,}', f'${rng.randint(0, 99999)}.{rng.randint(0, 99):02d}',
+                         '$0', '', ' $1,234 ', '(1,250)', 'N/A', '$-', '1.2.3'])
+             for _ in range(n)]
+    dates = [rng.choice([f'{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(1950, 2024)}',
+                         '', '2020-01-01', '1/2/2003', '01/15/2015 12:00 AM'])
+             for _ in range(n)]
+    names = [rng.choice(['SMITH JOHN & SMITH MARY', 'PALM HOLDINGS LLC', 'DOE JANE &', ' & ', 'A&B'])
+             for _ in range(n)]
+    streets = [rng.choice(['S. Ocean Blvd.', 'NE 5th  Ave', 'Palm Way, ', 'US HIGHWAY 1']) for _ in range(n)]
+    return {'money': money, 'dates': dates, 'names': names, 'streets': streets}
+
+CASES = [
+    ('clean_money', legacy_clean_money, field_cleaning.clean_money, 'money'),
+    ('parse_date', legacy_parse_date, field_cleaning.parse_date, 'dates'),
+    ('split_owner_names', legacy_split_owner_names, field_cleaning.split_owner_names, 'names'),
+    ('normalize_street', legacy_normalize_street, field_cleaning.normalize_street, 'streets'),
+]
+
+def main():
+    values = sample_values()
+    for name, legacy, new, kind in CASES:
+        data = values[kind]
+        mismatches = [v for v in data if legacy(v) != new(v)]
+        if mismatches:
+            raise AssertionError(f'{name} differs from the legacy helper for {mismatches[0]!r}')
+        legacy_time = min(timeit.repeat(lambda: [legacy(v) for v in data], number=3, repeat=3))
+        new_time = min(timeit.repeat(lambda: [new(v) for v in data], number=3, repeat=3))
+        per_call = 1e9 / (3 * len(data))
+        print(f'{name:<18} legacy {legacy_time * per_call:8.0f} ns/call  new {new_time * per_call:8.0f} ns/call  '
+              f'x{legacy_time / new_time:.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import os
+import json
+import sqlite3
+
+POSSIBLE_ADDRESSES_DIR = './possible_addresses/'
+STORE_FILE = './possible_addresses.sqlite'
+# Opt-in: read candidates from the packed store instead of possible_addresses/.
+# The store is a snapshot; repack after the directory changes.
+CANDIDATE_STORE = os.environ.get('CANDIDATE_STORE') == '1'
+BATCH_SIZE = 5000
+
+# Packs every possible_addresses/<parcel_id>.json into one SQLite file keyed by
+# parcel id. Payloads are stored as compact JSON exactly as found, so both the
+# already-mapped dict format and the raw candidate list survive unchanged.
+# The store is built from scratch in a temporary file that then replaces the
+# old one, so files removed from the directory drop out of it too.
+def pack_directory(src_dir=POSSIBLE_ADDRESSES_DIR, store_path=STORE_FILE):
+    tmp_path = f'{store_path}.{os.getpid()}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute('PRAGMA journal_mode=OFF')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('CREATE TABLE candidates (parcel_id TEXT PRIMARY KEY, data TEXT NOT NULL) WITHOUT ROWID')
+            count = 0
+            batch = []
+            with os.scandir(src_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.json') or not entry.is_file():
+                        continue
+                    with open(entry.path, 'r') as f:
+                        data = json.load(f)
+                    batch.append((entry.name[:-len('.json')], json.dumps(data, separators=(',', ':'))))
+                    if len(batch) >= BATCH_SIZE:
+                        count += _insert(conn, batch)
+                        batch = []
+            if batch:
+                count += _insert(conn, batch)
+        finally:
+            conn.close()
+        os.replace(tmp_path, store_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+def _insert(conn, batch):
+    with conn:
+        conn.executemany('INSERT INTO candidates (parcel_id, data) VALUES (?, ?)', batch)
+    return len(batch)
+
+class CandidateStore:
+    def __init__(self, path=STORE_FILE):
+        self.conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+
+    # Returns the parsed payload for one parcel, or None if it wasn't packed
+    def get(self, parcel_id):
+        row = self.conn.execute('SELECT data FROM candidates WHERE parcel_id = ?', (parcel_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # Sequential scan in primary-key order: (parcel_id, payload)
+    def __iter__(self):
+        for parcel_id, data in self.conn.execute('SELECT parcel_id, data FROM candidates ORDER BY parcel_id'):
+            yield parcel_id, json.loads(data)
+
+    # {parcel_id: payload length}, a stand-in for each parcel's candidate count
+    def sizes(self):
+        return dict(self.conn.execute('SELECT parcel_id, length(data) FROM candidates'))
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM candidates').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+def main():
+    count = pack_directory()
+    print(f'Packed {count} possible_addresses files into {STORE_FILE}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import os
+import json
+from array import array
+from page_facts import load_facts
+from prefetch_reader import prefetch
+from input_discovery import iter_input_files
+from parcel_extraction import extract_sale_rows, extract_tax_rows
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+INPUT_DIR = './input/'
+EXPORT_DIR = './export/'
+
+TAX_COLUMNS = ['assessed', 'market', 'building', 'land', 'taxable', 'total_tax']
+
+# Accumulates tax and sales rows for a whole run in compact typed buffers and
+# writes them as one column per file (.npy), plus Parquet when pyarrow is installed.
+class ColumnarExport:
+    def __init__(self, export_dir=EXPORT_DIR):
+        self.export_dir = export_dir
+        self.tax_parcel_id = []
+        self.tax_year = array('i')
+        self.tax_values = {col: array('d') for col in TAX_COLUMNS}
+        self.sale_parcel_id = []
+        self.sale_date = []
+        self.sale_price = array('d')
+
+    # Takes the output of parcel_extraction.extract_sale_rows / extract_tax_rows
+    def add(self, parcel_id, sale_rows, tax_rows):
+        for row in tax_rows:
+            self.tax_parcel_id.append(parcel_id)
+            self.tax_year.append(row['tax_year'])
+            for col in TAX_COLUMNS:
+                val = row[col]
+                self.tax_values[col].append(float('nan') if val is None else val)
+        for _, date, price in sale_rows:
+            self.sale_parcel_id.append(parcel_id)
+            self.sale_date.append(date)
+            self.sale_price.append(float('nan') if price is None else price)
+
+    # Rows added since the last take(), for a parcel worker to send back
+    def take(self):
+        rows = (self.tax_parcel_id, self.tax_year, self.tax_values, self.sale_parcel_id, self.sale_date, self.sale_price)
+        self.__init__(self.export_dir)
+        return rows
+
+    def merge(self, rows):
+        tax_parcel_id, tax_year, tax_values, sale_parcel_id, sale_date, sale_price = rows
+        self.tax_parcel_id.extend(tax_parcel_id)
+        self.tax_year.extend(tax_year)
+        for col in TAX_COLUMNS:
+            self.tax_values[col].extend(tax_values[col])
+        self.sale_parcel_id.extend(sale_parcel_id)
+        self.sale_date.extend(sale_date)
+        self.sale_price.extend(sale_price)
+
+    def _tax_arrays(self):
+        arrays = {
+            'parcel_id': np.array(self.tax_parcel_id, dtype=str),
+            'tax_year': np.frombuffer(self.tax_year, dtype=np.int32).copy(),
+        }
+        for col in TAX_COLUMNS:
+            arrays[col] = np.frombuffer(self.tax_values[col], dtype=np.float64).copy()
+        return arrays
+
+    def _sale_arrays(self):
+        return {
+            'parcel_id': np.array(self.sale_parcel_id, dtype=str),
+            'sale_date': np.array([_to_datetime64(d) for d in self.sale_date], dtype='datetime64[D]'),
+            'sale_price': np.frombuffer(self.sale_price, dtype=np.float64).copy(),
+        }
+
+    def write(self):
+        if np is None:
+            raise RuntimeError('numpy is required for the columnar export')
+        tables = {'tax': self._tax_arrays(), 'sales': self._sale_arrays()}
+        for name, arrays in tables.items():
+            table_dir = os.path.join(self.export_dir, name)
+            os.makedirs(table_dir, exist_ok=True)
+            for col, values in arrays.items():
+                np.save(os.path.join(table_dir, f'{col}.npy'), values)
+            if pa is not None:
+                pq.write_table(pa.table({col: pa.array(values) for col, values in arrays.items()}),
+                               os.path.join(self.export_dir, f'{name}.parquet'))
+        with open(os.path.join(self.export_dir, 'manifest.json'), 'w') as f:
+            json.dump({name: {'rows': len(arrays['parcel_id']), 'columns': list(arrays)}
+                       for name, arrays in tables.items()}, f, indent=2)
+
+# parse_date leaves unrecognized dates as the raw text; those become NaT
+def _to_datetime64(date):
+    if not date:
+        return np.datetime64('NaT')
+    try:
+        return np.datetime64(date, 'D')
+    except ValueError:
+        return np.datetime64('NaT')
+
+def main():
+    export = ColumnarExport()
+    for (parcel_id, path), (html,) in prefetch(iter_input_files(INPUT_DIR), lambda item: (item[1],)):
+        facts = load_facts(html)
+        export.add(parcel_id, extract_sale_rows(facts), extract_tax_rows(facts))
+    export.write()
+
+if __name__ == '__main__':
+    main()
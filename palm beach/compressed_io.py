@@ -0,0 +1,90 @@
+import os
+import gzip
+import json
+import lzma
+import threading
+
+# Opt-in: 'gzip' or 'lzma' compresses owners/*.json and everything under data/.
+# Readers detect compression from the file itself, whatever the setting.
+OUTPUT_COMPRESSION = os.environ.get('OUTPUT_COMPRESSION') or None
+SUFFIXES = {'gzip': '.gz', 'lzma': '.xz'}
+GZIP_MAGIC = b'\x1f\x8b'
+XZ_MAGIC = b'\xfd7zXZ\x00'
+
+if OUTPUT_COMPRESSION and OUTPUT_COMPRESSION not in SUFFIXES:
+    raise ValueError(f'OUTPUT_COMPRESSION must be one of {sorted(SUFFIXES)}, got {OUTPUT_COMPRESSION!r}')
+
+# 'x.json' -> 'x.json.gz' when compressing
+def stored_name(name, compression=None):
+    compression = compression or OUTPUT_COMPRESSION
+    return name + SUFFIXES[compression] if compression else name
+
+# 'x.json.gz' / 'x.json.xz' -> 'x.json'
+def logical_name(name):
+    for suffix in SUFFIXES.values():
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+def is_json_output(name):
+    return logical_name(name).endswith('.json')
+
+def compress(payload, compression=None):
+    compression = compression or OUTPUT_COMPRESSION
+    if compression == 'gzip':
+        # mtime=0 keeps the bytes reproducible run to run
+        return gzip.compress(payload, compresslevel=6, mtime=0)
+    if compression == 'lzma':
+        return lzma.compress(payload, preset=6)
+    return payload
+
+def decompress(data):
+    if data.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+    if data.startswith(XZ_MAGIC):
+        return lzma.decompress(data)
+    return data
+
+# The path a logical file was actually stored under: plain first, then any
+# compressed variant, so a run can read what an earlier run wrote
+def resolve_path(path):
+    if os.path.exists(path):
+        return path
+    for suffix in SUFFIXES.values():
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return path
+
+def read_bytes(path):
+    with open(resolve_path(path), 'rb') as f:
+        return decompress(f.read())
+
+def load_json(path):
+    return json.loads(read_bytes(path).decode('utf-8'))
+
+# Readers see the old file or the new one, never a partial write. The temp
+# name is unique per process and thread, so concurrent writers can't collide.
+def replace_atomically(path, data):
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# Writes atomically under the stored name and returns (path, bytes written).
+# Plain or differently-compressed copies of the same file are removed.
+def write_bytes(path, payload, compression=None):
+    target = stored_name(path, compression)
+    data = compress(payload, compression)
+    replace_atomically(target, data)
+    for other in [path] + [path + suffix for suffix in SUFFIXES.values()]:
+        if other != target and os.path.exists(other):
+            os.remove(other)
+    return target, len(data)
+
+def dump_json(obj, path, indent=2, compression=None):
+    return write_bytes(path, json.dumps(obj, indent=indent).encode('utf-8'), compression)
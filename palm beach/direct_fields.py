@@ -0,0 +1,81 @@
+import re
+import html as html_lib
+from html.entities import name2codepoint
+from functools import lru_cache
+
+# Fields the Palm Beach template puts at fixed element ids, as plain text
+DIRECT_IDS = ['MainContent_lblPCN', 'MainContent_lblLegalDesc', 'MainContent_lblSubdiv']
+
+# Entity forms html.unescape and the html.parser tree builder decode the same
+# way; the tree builder treats unknown names differently, so only HTML 4 names
+_ENTITY_RE = re.compile(r'&(?:([A-Za-z][A-Za-z0-9]*)|#[0-9]+|#[xX][0-9A-Fa-f]+);')
+# A '&' that can't start a reference is kept as is, as in 'SMITH & JONES'
+_BARE_AMP_RE = re.compile(r'&(?![A-Za-z#])')
+# html.parser reads script and style bodies as raw text, up to the matching end tag
+_RAW_OPEN_RE = re.compile(r'<(script|style)(?=[\s/>])', re.I)
+_RAW_CLOSE_RES = {name: re.compile(r'</\s*%s\s*>' % name, re.I) for name in ('script', 'style')}
+# Text under these is its own string class that the tree leaves out of .text;
+# when one may still be open the fast path defers to the tree
+_CONTAINER_OPEN_RE = re.compile(r'<(?:rt|rp|template)(?=[\s/>])', re.I)
+
+@lru_cache(maxsize=None)
+def _id_pattern(element_id):
+    # The whole element: opening tag carrying the id, text-only content, matching close tag
+    # Tag and attribute names are case-insensitive, the id value is not
+    return re.compile(
+        r'<([A-Za-z][A-Za-z0-9]*)\b[^<>]*?\s[iI][dD]\s*=\s*(["\']?)' + re.escape(element_id) +
+        r'\2(?=[\s/>])[^<>]*(?<!/)>([^<]*)</(?i:\1)\s*>')
+
+@lru_cache(maxsize=None)
+def _id_attr_pattern(element_id):
+    return re.compile(r'\s[iI][dD]\s*=\s*(["\']?)' + re.escape(element_id) + r'\1(?=[\s/>])')
+
+# True when pos sits inside an unclosed <!-- comment -->, <script> or <style> block
+def _in_raw_section(html, pos):
+    comment = html.rfind('<!--', 0, pos)
+    if comment != -1 and html.find('-->', comment + 4, pos) == -1:
+        return True
+    start = 0
+    while True:
+        opened = _RAW_OPEN_RE.search(html, start, pos)
+        if opened is None:
+            return False
+        # Anything up to the end tag is raw, other start tags included
+        closed = _RAW_CLOSE_RES[opened.group(1).lower()].search(html, opened.end())
+        if closed is None or closed.end() > pos:
+            return True
+        start = closed.end()
+
+# Raw text between two tags as the tree builder decodes it, or None when it
+# holds entities the tree builder might read differently
+def decode_text(text):
+    if '&' not in text:
+        return text
+    entities = _ENTITY_RE.findall(text)
+    if text.count('&') != len(entities) + len(_BARE_AMP_RE.findall(text)) or any(name and name not in name2codepoint for name in entities):
+        return None
+    return html_lib.unescape(text)
+
+# Text of the first element with this id, read straight from the raw HTML.
+# None means the fast path can't vouch for the answer (missing element,
+# nested markup, unusual entities) and the caller should use the DOM.
+def direct_field(html, element_id):
+    attr = _id_attr_pattern(element_id).search(html)
+    if not attr:
+        return None
+    tag_start = html.rfind('<', 0, attr.start())
+    if tag_start == -1 or _in_raw_section(html, tag_start) or _CONTAINER_OPEN_RE.search(html, 0, tag_start):
+        return None
+    m = _id_pattern(element_id).match(html, tag_start)
+    if not m:
+        return None
+    text = decode_text(m.group(3))
+    if text is None:
+        return None
+    # The tree builder collapses whitespace-only strings depending on context
+    if text and not text.strip(' \t\n\r\f'):
+        return None
+    return text
+
+def direct_fields(html, ids=DIRECT_IDS):
+    return {element_id: direct_field(html, element_id) for element_id in ids}
@@ -0,0 +1,230 @@
+import os
+import re
+import sys
+import json
+import time
+import math
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from synthetic_corpus import generate_corpus
+from input_discovery import iter_input_files
+from compressed_io import is_json_output, logical_name, load_json as load_stored_json
+from extraction_profiles import resolve_profile, entity_type
+
+STAGES = ['owner_processor', 'layout_extractor', 'structure_extractor', 'utility_extractor', 'address_extraction', 'data_extractor']
+CORPUS_ENTRIES = ['input', 'possible_addresses', 'possible_addresses.sqlite', 'seed.csv', 'schemas']
+OUTPUT_DIRS = ['owners', 'data']
+REPORT_FILE = './logs/equivalence_report.json'
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_VAR_RE = re.compile(r'''os\.environ\.get\(['"]([A-Z0-9_]+)['"]''')
+
+# Every setting the scripts read from the environment; the reference run gets
+# none of them so it always means "the plain pipeline".
+def config_vars(scripts_dir):
+    names = set()
+    for name in os.listdir(scripts_dir):
+        if name.endswith('.py'):
+            with open(os.path.join(scripts_dir, name), 'r', encoding='utf-8') as f:
+                names.update(CONFIG_VAR_RE.findall(f.read()))
+    return names
+
+def parse_env(pairs):
+    env = {}
+    for pair in pairs:
+        key, sep, value = pair.partition('=')
+        if not sep:
+            raise SystemExit(f'--env expects KEY=VALUE, got {pair!r}')
+        env[key] = value
+    return env
+
+# Links the corpus into a fresh working directory and runs the stages there
+def run_pipeline(corpus, scripts_dir, env_overrides, stages):
+    workdir = tempfile.mkdtemp(prefix='pb_equiv_')
+    for entry in CORPUS_ENTRIES:
+        if os.path.exists(os.path.join(corpus, entry)):
+            os.symlink(os.path.abspath(os.path.join(corpus, entry)), os.path.join(workdir, entry))
+    os.makedirs(os.path.join(workdir, 'owners'))
+    env = {k: v for k, v in os.environ.items() if k not in config_vars(scripts_dir)}
+    env.update(env_overrides)
+    timings = {}
+    for stage in stages:
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, os.path.join(scripts_dir, f'{stage}.py')], cwd=workdir, env=env,
+                              capture_output=True, text=True)
+        timings[stage] = {'seconds': round(time.perf_counter() - start, 3)}
+        if proc.returncode != 0:
+            lines = proc.stderr.strip().splitlines()
+            timings[stage]['error'] = lines[-1] if lines else f'exit {proc.returncode}'
+            break
+    return workdir, timings
+
+# owners/<file> and <parcel>/<file> for data/, so hashed output fanout doesn't matter.
+# With entity_types only those data/ files count; owners/ then holds a profile's
+# trimmed intermediates, which aren't comparable and are left out.
+def collect_outputs(workdir, entity_types=None):
+    files = {}
+    for out_dir in OUTPUT_DIRS:
+        if entity_types is not None and out_dir != 'data':
+            continue
+        root = os.path.join(workdir, out_dir)
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if not is_json_output(name) or (entity_types is not None and entity_type(name) not in entity_types):
+                    continue
+                path = os.path.join(dirpath, name)
+                if out_dir == 'data':
+                    key = f'data/{os.path.basename(dirpath)}/{logical_name(name)}'
+                else:
+                    key = logical_name(f'{out_dir}/{os.path.relpath(path, root)}')
+                files[key] = path
+    return files
+
+# Compressed or not; links ({"/": "./sales_1.json.gz"}) compare by logical file name
+def load_json(path):
+    return _normalize_links(load_stored_json(path))
+
+def _normalize_links(value):
+    if isinstance(value, dict):
+        if len(value) == 1 and isinstance(value.get('/'), str):
+            return {'/': logical_name(value['/'])}
+        return {k: _normalize_links(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize_links(v) for v in value]
+    return value
+
+# First point where two decoded JSON values differ, as (json path, reference, optimized)
+def first_difference(a, b, rel_tol, path='$'):
+    if isinstance(a, bool) or isinstance(b, bool) or not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+        if type(a) is not type(b):
+            return path, a, b
+    else:
+        if not math.isclose(a, b, rel_tol=rel_tol, abs_tol=0):
+            return path, a, b
+        return None
+    if isinstance(a, dict):
+        for key in sorted(set(a) | set(b)):
+            child = f'{path}.{key}' if key.isidentifier() else f'{path}[{json.dumps(key)}]'
+            if key not in a or key not in b:
+                return child, a.get(key, '<missing>'), b.get(key, '<missing>')
+            diff = first_difference(a[key], b[key], rel_tol, child)
+            if diff:
+                return diff
+        return None
+    if isinstance(a, list):
+        for i, (x, y) in enumerate(zip(a, b)):
+            diff = first_difference(x, y, rel_tol, f'{path}[{i}]')
+            if diff:
+                return diff
+        if len(a) != len(b):
+            return f'{path}.length', len(a), len(b)
+        return None
+    return None if a == b else (path, a, b)
+
+def compare_outputs(reference_dir, optimized_dir, rel_tol, max_diffs, entity_types=None):
+    reference = collect_outputs(reference_dir, entity_types)
+    optimized = collect_outputs(optimized_dir, entity_types)
+    missing = sorted(set(reference) - set(optimized))
+    extra = sorted(set(optimized) - set(reference))
+    differing = []
+    for key in sorted(set(reference) & set(optimized)):
+        diff = first_difference(load_json(reference[key]), load_json(optimized[key]), rel_tol)
+        if diff:
+            differing.append({'file': key, 'path': diff[0], 'reference': diff[1], 'optimized': diff[2]})
+    return {
+        'files_compared': len(set(reference) & set(optimized)),
+        'missing_in_optimized': len(missing),
+        'extra_in_optimized': len(extra),
+        'differing': len(differing),
+        'examples': {'missing': missing[:max_diffs], 'extra': extra[:max_diffs], 'differing': differing[:max_diffs]},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the reference pipeline and an optimized configuration '
+                                                 'over one corpus and diff their outputs')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--corpus', help='directory holding input/, possible_addresses/, seed.csv and schemas/')
+    source.add_argument('--synthetic', type=int, metavar='N', help='generate a synthetic corpus of N parcels')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='setting for the optimized run, e.g. BATCH_MATCHING=1; repeatable')
+    parser.add_argument('--reference-env', action='append', default=[], metavar='KEY=VALUE',
+                        help='setting for the reference run; by default it runs with no opt-in settings')
+    parser.add_argument('--scripts', default=SCRIPTS_DIR, help='scripts for the optimized run (e.g. another checkout)')
+    parser.add_argument('--reference-scripts', default=SCRIPTS_DIR, help='scripts for the reference run')
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--rel-tol', type=float, default=0.0, help='relative tolerance for numeric values')
+    parser.add_argument('--max-diffs', type=int, default=20, help='examples kept per kind of difference')
+    parser.add_argument('--output', default=REPORT_FILE)
+    parser.add_argument('--keep', action='store_true', help='keep the working directories')
+    args = parser.parse_args()
+
+    corpus = args.corpus
+    if args.synthetic:
+        corpus = tempfile.mkdtemp(prefix='pb_equiv_corpus_')
+        generate_corpus(corpus, args.synthetic)
+    stages = args.stages.split(',')
+    parcels = sum(1 for _ in iter_input_files(os.path.join(corpus, 'input')))
+
+    runs = {}
+    workdirs = {}
+    for name, scripts, env in [('reference', args.reference_scripts, parse_env(args.reference_env)),
+                               ('optimized', args.scripts, parse_env(args.env))]:
+        workdirs[name], runs[name] = run_pipeline(corpus, os.path.abspath(scripts), env, stages)
+    failed_stages = {name: [s for s, t in timings.items() if 'error' in t] for name, timings in runs.items()}
+    # A profile run is held to the reference only for the entity types it produces
+    profile = parse_env(args.env).get('EXTRACTION_PROFILE')
+    entity_types = resolve_profile(profile) if profile else None
+    diff = compare_outputs(workdirs['reference'], workdirs['optimized'], args.rel_tol, args.max_diffs, entity_types)
+    equivalent = not any(failed_stages.values()) and not (diff['missing_in_optimized'] or
+                                                           diff['extra_in_optimized'] or diff['differing'])
+
+    print(f"{'stage':<20} {'reference':>10} {'optimized':>10} {'speedup':>8}")
+    for stage in stages:
+        ref = runs['reference'].get(stage, {})
+        opt = runs['optimized'].get(stage, {})
+        speedup = f"x{ref['seconds'] / opt['seconds']:.2f}" if ref.get('seconds') and opt.get('seconds') else ''
+        print(f"{stage:<20} {ref.get('error') and 'error' or ref.get('seconds', '-'):>10} "
+              f"{opt.get('error') and 'error' or opt.get('seconds', '-'):>10} {speedup:>8}")
+    totals = {name: round(sum(t['seconds'] for t in timings.values()), 3) for name, timings in runs.items()}
+    throughput = {name: round(parcels / seconds, 2) if seconds else None for name, seconds in totals.items()}
+    print(f"{'total':<20} {totals['reference']:>10} {totals['optimized']:>10}   "
+          f"({throughput['reference']} vs {throughput['optimized']} parcels/s)")
+    print(f"{diff['files_compared']} files compared: {diff['missing_in_optimized']} missing, "
+          f"{diff['extra_in_optimized']} extra, {diff['differing']} differing")
+    for example in diff['examples']['differing'][:5]:
+        print(f"  {example['file']} {example['path']}: {example['reference']!r} != {example['optimized']!r}")
+    for name, stages_failed in failed_stages.items():
+        for stage in stages_failed:
+            print(f"{name} run failed in {stage}: {runs[name][stage]['error']}")
+    print('EQUIVALENT' if equivalent else 'NOT EQUIVALENT')
+
+    report = {
+        'corpus': os.path.abspath(corpus),
+        'parcels': parcels,
+        'reference': {'scripts': os.path.abspath(args.reference_scripts), 'env': parse_env(args.reference_env),
+                      'stages': runs['reference'], 'total_seconds': totals['reference'],
+                      'parcels_per_second': throughput['reference']},
+        'optimized': {'scripts': os.path.abspath(args.scripts), 'env': parse_env(args.env),
+                      'stages': runs['optimized'], 'total_seconds': totals['optimized'],
+                      'parcels_per_second': throughput['optimized']},
+        'entity_types': sorted(entity_types) if entity_types else None,
+        'diff': diff,
+        'equivalent': equivalent,
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    if args.keep:
+        print(f"Working directories kept at {workdirs['reference']} and {workdirs['optimized']}")
+    else:
+        for workdir in workdirs.values():
+            shutil.rmtree(workdir, ignore_errors=True)
+        if args.synthetic:
+            shutil.rmtree(corpus, ignore_errors=True)
+    if not equivalent:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
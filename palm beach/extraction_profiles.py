@@ -0,0 +1,68 @@
+import os
+import re
+from compressed_io import logical_name
+
+# Entity types data_extractor writes, named by their file prefix
+ENTITY_TYPES = ['address', 'property', 'sales', 'tax', 'person', 'company', 'relationship',
+                'structure', 'utility', 'layout', 'lot']
+PROFILES = {
+    'full': ENTITY_TYPES,
+    'valuation': ['sales', 'tax'],
+    'geocoding': ['address', 'property'],
+    'ownership': ['sales', 'person', 'company', 'relationship'],
+    'building': ['property', 'structure', 'utility', 'layout', 'lot'],
+}
+# Relationship files link a sale to its buyers, so they bring both along
+IMPLIES = {'relationship': ['sales', 'person', 'company']}
+# Entity types each preprocessor's output feeds. address_extraction is always
+# needed: every entity carries the source_http_request it supplies.
+STAGE_ENTITIES = {
+    'owner_processor': ['person', 'company', 'relationship'],
+    'structure_extractor': ['structure', 'property'],
+    'utility_extractor': ['utility'],
+    'layout_extractor': ['layout'],
+    'address_extraction': ENTITY_TYPES,
+}
+# Entity types data_extractor reads from the page itself
+PAGE_ENTITIES = ['property', 'sales', 'tax', 'layout']
+ENTITY_FILE_RE = re.compile(r'^([a-z]+)')
+
+# Opt-in: a profile name above, or a comma-separated list of entity types
+EXTRACTION_PROFILE = os.environ.get('EXTRACTION_PROFILE') or 'full'
+
+def resolve_profile(spec):
+    names = PROFILES.get(spec) or [name.strip() for name in spec.split(',') if name.strip()]
+    unknown = sorted(set(names) - set(ENTITY_TYPES))
+    if unknown:
+        raise ValueError(f'EXTRACTION_PROFILE: unknown entity types {unknown}; '
+                         f'use one of the profiles {sorted(PROFILES)} or of {ENTITY_TYPES}')
+    selected = set(names)
+    for name in names:
+        selected.update(IMPLIES.get(name, []))
+    return frozenset(selected)
+
+SELECTED = resolve_profile(EXTRACTION_PROFILE)
+FULL_PROFILE = SELECTED == frozenset(ENTITY_TYPES)
+
+def produces(*entity_types):
+    return any(t in SELECTED for t in entity_types)
+
+def stage_needed(stage):
+    return produces(*STAGE_ENTITIES[stage])
+
+# True when a skipped preprocessor's main() should return straight away
+def skip_stage(stage):
+    if stage_needed(stage):
+        return False
+    print(f'Skipping {stage}: profile {EXTRACTION_PROFILE!r} needs none of its output')
+    return True
+
+# 'relationship_sales_person_1_1.json.gz' -> 'relationship'
+def entity_type(filename):
+    m = ENTITY_FILE_RE.match(logical_name(filename))
+    return m.group(1) if m else None
+
+# Whether this run is responsible for a file in a parcel directory; files of
+# entity types outside the profile are left as an earlier run wrote them
+def owns_file(filename):
+    return FULL_PROFILE or entity_type(filename) in SELECTED
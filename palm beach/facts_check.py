@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+from bs4 import BeautifulSoup
+
+import page_facts
+import page_templates
+from direct_fields import direct_field, DIRECT_IDS
+from stream_facts import stream_facts
+from synthetic_corpus import generate_corpus
+from input_discovery import iter_input_files
+
+REPORT_FILE = './logs/facts_check.json'
+# direct: direct_field() against the tree's element text (direct_fields.py)
+# stream: the streaming backend against facts_from_soup (stream_facts.py)
+# templates: template-filled facts against the full parse, both backends (page_templates.py)
+CHECKS = ['direct', 'stream', 'templates']
+BACKENDS = ['soup', 'stream']
+# Pages of one fuzzed layout, each with its own texts
+LAYOUT_VARIANTS = 4
+
+# Tag soup: stray and unclosed tags, raw-text elements, entities, comments and
+# the ids the direct fast path reads, in every case and quoting
+SOUP_TAGS = ['table', 'tr', 'td', 'th', 'span', 'div class="table_scroll"', 'div', 'h2', 'b', 'p', 'pre', 'script',
+             'style', 'template', 'br', 'img', 'table class="structural_elements x"', 'textarea', 'ruby', 'rt',
+             'tbody', 'hr', 'span id="MainContent_lblPCN"', 'td id="MainContent_lblSubdiv"',
+             "SPAN ID='MainContent_lblLegalDesc'", 'b id=MainContent_lblPCN', 'span id="MainContent_lblPCNx"']
+SOUP_TEXTS = ['Sales INFORMATION', 'Owner Name', 'Year Built', ' ', '\n', '  \n ', 'x', '&amp;', '&foo;', '&#65;',
+              '&#x41z;', '&#150;', '&nbsp;', '<!-- c -->', '<!---->', '<!-- <span id="MainContent_lblPCN">c</span> -->',
+              '<![CDATA[cd]]>', '<?pi?>', '<!DOCTYPE html>', '</br>', '<br/>', '<p/>', '1,234', '$5', 'a < b', '&',
+              'SMITH & JONES', '\t', 'Bed Rooms', '<span>Owner A &amp; B</span>']
+# Well-formed-ish pages whose layout repeats with different texts
+LAYOUT_TAGS = ['td', 'th', 'tr', 'table', 'div', 'span', 'h2', 'p', 'b', 'br', 'pre', 'script', 'td', 'tr', 'span']
+LAYOUT_TEXTS = ['Year Built', ' 1990 ', 'A &amp; B', 'X & Y', '&nbsp;', '\n  ', ' ', '\xa0', 'Taxes', 'Sales INFORMATION',
+                '< 10', 'a&lt;b', '  pad  ', 'Owner Name', '\t', 'R', '&#39;q&#39;']
+VARIANT_TEXTS = ['Year Built', 'ZZ', 'Taxes', 'Owner Name', 'q  ', ' Sales INFORMATION x']
+
+def tag_soup(rng):
+    parts = []
+    for _ in range(rng.randint(1, 40)):
+        r = rng.random()
+        if r < 0.4:
+            parts.append(f'<{rng.choice(SOUP_TAGS)}>')
+        elif r < 0.65:
+            parts.append(f'</{rng.choice(SOUP_TAGS).split()[0]}>')
+        else:
+            parts.append(rng.choice(SOUP_TEXTS))
+    return ''.join(parts)
+
+def _layout_text(rng):
+    return rng.choice(LAYOUT_TEXTS) if rng.random() < 0.8 else ''
+
+def _layout_element(rng, depth):
+    tag = rng.choice(LAYOUT_TAGS)
+    attrs = ''
+    if rng.random() < 0.3:
+        attrs += rng.choice([' id="MainContent_lblPCN"', ' id="MainContent_lblSubdiv"', ' id=other'])
+    if rng.random() < 0.3:
+        attrs += rng.choice([' class="table_scroll"', " class='structural_elements x'", ' class=a'])
+    if rng.random() < 0.3:
+        attrs += f' style="w:{rng.randint(1, 9)}" data-x={rng.randint(1, 9)}'
+    if tag == 'br':
+        return f'<br{attrs}>' if rng.random() < 0.5 else f'<br{attrs}/>'
+    if tag == 'script':
+        return f'<script{attrs}>{rng.choice(["", "var a = 1 < 2;", " x "])}</script>'
+    inner = _layout_text(rng)
+    if depth < 4:
+        for _ in range(rng.randint(0, 3)):
+            inner += _layout_element(rng, depth + 1) + _layout_text(rng)
+    close = f'</{tag}>' if rng.random() < 0.9 else ''
+    return f'<{tag}{attrs}>{inner}{close}'
+
+# LAYOUT_VARIANTS pages sharing one random layout
+def layout_pages(seed):
+    rng = random.Random(seed)
+    base = ''.join(_layout_element(rng, 0) for _ in range(rng.randint(1, 4)))
+    pages = []
+    for variant in range(LAYOUT_VARIANTS):
+        rv = random.Random(f'{seed}:{variant}')
+        page = base
+        for text in LAYOUT_TEXTS:
+            if text.strip() and '&' not in text and '<' not in text:
+                page = page.replace(text, rv.choice(VARIANT_TEXTS))
+        pages.append(page)
+    return pages
+
+def _soup_facts(soup):
+    facts = page_facts.facts_from_soup(soup)
+    facts.pop('version')
+    return facts
+
+class Check:
+    def __init__(self, max_examples):
+        self.max_examples = max_examples
+        self.documents = 0
+        self.compared = 0
+        self.mismatches = 0
+        self.examples = []
+
+    def record(self, html, equal, detail=None):
+        self.compared += 1
+        if not equal:
+            self.mismatches += 1
+            if len(self.examples) < self.max_examples:
+                self.examples.append({'html': html[:2000], 'detail': detail})
+
+    def report(self):
+        return {'documents': self.documents, 'compared': self.compared, 'mismatches': self.mismatches,
+                'examples': self.examples}
+
+# Wherever direct_field() answers, the answer is the element text the tree gives
+def check_direct(html, soup, check):
+    check.documents += 1
+    for element_id in DIRECT_IDS:
+        fast = direct_field(html, element_id)
+        if fast is None:
+            continue
+        element = soup.find(id=element_id)
+        expected = element.text if element is not None else None
+        check.record(html, fast == expected, {'id': element_id, 'direct': fast, 'tree': expected})
+
+def check_stream(html, soup, check):
+    check.documents += 1
+    facts = stream_facts(html)
+    facts.pop('version', None)
+    expected = _soup_facts(soup)
+    check.record(html, facts == expected, [key for key in expected if facts.get(key) != expected[key]])
+
+# Pages are fed in order, so the first page of a layout teaches the template
+# and the later ones are filled from it
+def check_templates(pages, check):
+    for backend in BACKENDS:
+        page_facts.FACTS_BACKEND = backend
+        for html in pages:
+            check.documents += 1
+            expected = page_facts._parse(html)
+            facts = page_templates.template_facts(html, page_facts._parse, page_facts.FACTS_VERSION, backend)
+            if facts is not None:
+                check.record(html, facts == expected, {'backend': backend})
+    page_facts.FACTS_BACKEND = 'soup'
+
+def corpus_pages(corpus):
+    pages = []
+    for _, path in sorted(iter_input_files(os.path.join(corpus, 'input'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the page fast paths (direct id fields, the streaming '
+                                                 'backend, layout templates) against a full parse on fuzzed '
+                                                 'documents and, optionally, corpus pages')
+    parser.add_argument('--checks', default=','.join(CHECKS), help='comma-separated subset of the checks')
+    parser.add_argument('--fuzz', type=int, default=3000,
+                        help=f'tag-soup documents for direct/stream, and layouts of {LAYOUT_VARIANTS} pages for templates')
+    parser.add_argument('--seed', type=int, default=0)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--corpus', help='also check the pages under this corpus\'s input/')
+    source.add_argument('--synthetic', type=int, metavar='N', help='also check a synthetic corpus of N parcels')
+    parser.add_argument('--max-examples', type=int, default=5, help='mismatching documents kept per check')
+    parser.add_argument('--output', default=REPORT_FILE)
+    args = parser.parse_args()
+
+    checks = args.checks.split(',')
+    unknown = [c for c in checks if c not in CHECKS]
+    if unknown:
+        raise SystemExit(f'unknown checks: {", ".join(unknown)}; expected some of {", ".join(CHECKS)}')
+    # Templates are learned in this process only, so a stored one can't hide a learning bug
+    page_templates.PAGE_TEMPLATES_DIR = None
+    results = {name: Check(args.max_examples) for name in checks}
+
+    corpus = args.corpus
+    if args.synthetic:
+        corpus = tempfile.mkdtemp(prefix='pb_facts_corpus_')
+        generate_corpus(corpus, args.synthetic)
+    start = time.perf_counter()
+    rng = random.Random(args.seed)
+    documents = [tag_soup(rng) for _ in range(args.fuzz)]
+    if corpus:
+        documents += corpus_pages(corpus)
+    if 'direct' in checks or 'stream' in checks:
+        for html in documents:
+            soup = BeautifulSoup(html, 'html.parser')
+            if 'direct' in checks:
+                check_direct(html, soup, results['direct'])
+            if 'stream' in checks:
+                check_stream(html, soup, results['stream'])
+            soup.decompose()
+    if 'templates' in checks:
+        for layout in range(args.fuzz):
+            # One layout at a time keeps the cache under PAGE_TEMPLATES_MAX
+            page_templates.templates.clear()
+            check_templates(layout_pages(f'{args.seed}:{layout}'), results['templates'])
+        if corpus:
+            page_templates.templates.clear()
+            check_templates(corpus_pages(corpus), results['templates'])
+    seconds = round(time.perf_counter() - start, 3)
+    if args.synthetic:
+        shutil.rmtree(corpus, ignore_errors=True)
+
+    print(f"{'check':<10} {'documents':>10} {'compared':>10} {'mismatches':>10}")
+    for name, check in results.items():
+        print(f'{name:<10} {check.documents:>10} {check.compared:>10} {check.mismatches:>10}')
+        for example in check.examples[:3]:
+            print(f"  {example['html'][:120]!r} {example['detail']}")
+    consistent = not any(check.mismatches for check in results.values())
+    print('CONSISTENT' if consistent else 'NOT CONSISTENT')
+
+    report = {'seed': args.seed, 'fuzz': args.fuzz, 'corpus': os.path.abspath(corpus) if corpus else None,
+              'seconds': seconds, 'checks': {name: check.report() for name, check in results.items()},
+              'consistent': consistent}
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if not consistent:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import re
+from functools import lru_cache
+
+# Assessor pages repeat the same few thousand money, date and name strings
+# across a county, so the string cleaners memoize their results.
+CACHE_SIZE = 65536
+
+_MONEY_STRIP_RE = re.compile(r'[^\d.]')
+_MONEY_FAST_TABLE = str.maketrans('', '', '$, ')
+_DATE_RE = re.compile(r'(\d{2})/(\d{2})/(\d{4})')
+_AMP_SPLIT_RE = re.compile(r'\s*&\s*')
+
+def clean_money(val):
+    if val is None:
+        return None
+    if isinstance(val, (int, float)):
+        return round(float(val), 2)
+    if not val:
+        return None
+    if not isinstance(val, str):
+        return None
+    return _clean_money_text(val)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _clean_money_text(val):
+    # Fast path for '$1,234,567' and '$1,234.56': once '$', ',' and spaces are
+    # gone only ASCII digits and at most one dot may remain, which is exactly
+    # what the general pattern would have kept.
+    fast = val.translate(_MONEY_FAST_TABLE)
+    if fast.isascii() and fast.replace('.', '', 1).isdigit():
+        return round(float(fast), 2)
+    try:
+        return round(float(_MONEY_STRIP_RE.sub('', val)), 2)
+    except ValueError:
+        return None
+
+def clean_int(val):
+    if val is None:
+        return None
+    try:
+        return int(val)
+    except Exception:
+        return None
+
+def clean_str(val):
+    if val is None:
+        return None
+    return str(val).strip()
+
+# MM/DD/YYYY -> YYYY-MM-DD; anything else is returned unchanged
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date(val):
+    if not val:
+        return None
+    head = val[:10]
+    if len(head) == 10 and head[2] == '/' and head[5] == '/' and head.isascii() and \
+            head[:2].isdigit() and head[3:5].isdigit() and head[6:].isdigit():
+        return f'{head[6:]}-{head[:2]}-{head[3:5]}'
+    m = _DATE_RE.match(val)
+    if m:
+        return f'{m.group(3)}-{m.group(1)}-{m.group(2)}'
+    return val
+
+# Rounds to cents; zero and unparseable values become None
+def safe_val(val):
+    try:
+        if val is None:
+            return None
+        v = float(val)
+        if v == 0:
+            return None
+        return round(v, 2)
+    except Exception:
+        return None
+
+# 'SMITH JOHN & SMITH MARY' -> ['SMITH JOHN', 'SMITH MARY']; empty parts dropped
+@lru_cache(maxsize=CACHE_SIZE)
+def split_owner_names(name):
+    return tuple(n.strip() for n in _AMP_SPLIT_RE.split(name) if n.strip())
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_street(street):
+    return street.replace('.', '').replace(',', '').replace('  ', ' ').strip().lower()
@@ -0,0 +1,52 @@
+import os
+import hashlib
+
+# Optional file listing the parcel ids to process, one per line
+INPUT_MANIFEST = os.environ.get('INPUT_MANIFEST') or None
+# Hashed directory levels used by input/ (for manifest lookups) and written under data/
+INPUT_FANOUT = int(os.environ.get('INPUT_FANOUT') or 0)
+OUTPUT_FANOUT = int(os.environ.get('OUTPUT_FANOUT') or 0)
+FANOUT_WIDTH = 2
+
+# <root>/<h0h1>/<h2h3>/.../<name>, hashing the parcel id so siblings spread evenly
+def fanout_path(root, parcel_id, name=None, levels=0):
+    name = name or parcel_id
+    if not levels:
+        return os.path.join(root, name)
+    digest = hashlib.md5(parcel_id.encode('utf-8')).hexdigest()
+    parts = [digest[i * FANOUT_WIDTH:(i + 1) * FANOUT_WIDTH] for i in range(levels)]
+    return os.path.join(root, *parts, name)
+
+def parcel_output_dir(parcel_id, data_dir='./data'):
+    return fanout_path(data_dir, parcel_id, levels=OUTPUT_FANOUT)
+
+def _scan(directory, suffix):
+    # Iterative scandir walk: entries stream out without building a listing,
+    # and any level of fanout subdirectories is followed.
+    stack = [directory]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(suffix):
+                    yield entry.name[:-len(suffix)], entry.path
+
+def _from_manifest(manifest, directory, suffix):
+    with open(manifest, 'r') as f:
+        for line in f:
+            parcel_id = line.strip()
+            if not parcel_id or parcel_id.startswith('#'):
+                continue
+            path = fanout_path(directory, parcel_id, f'{parcel_id}{suffix}', INPUT_FANOUT)
+            if os.path.exists(path):
+                yield parcel_id, path
+            else:
+                print(f'Warning: {parcel_id} is in the manifest but {path} is missing')
+
+# Yields (parcel_id, path) for every input file, lazily
+def iter_input_files(directory='./input/', suffix='.html', manifest=None):
+    manifest = manifest or INPUT_MANIFEST
+    if manifest:
+        return _from_manifest(manifest, directory, suffix)
+    return _scan(directory, suffix)
@@ -1,7 +1,12 @@
-import os
-import json
 import re
-from bs4 import BeautifulSoup
+from page_facts import load_facts
+from parcel_scheduler import process_parcels
+from input_discovery import iter_input_files
+from parcel_budget import parcel_budget, ParcelBudgetExceeded, RetryList
+from run_metrics import RunMetrics
+from slow_parcels import SlowParcelCapture
+from compressed_io import dump_json
+from extraction_profiles import skip_stage
 
 INPUT_DIR = './input/'
 OUTPUT_FILE = './owners/layout_data.json'
@@ -14,12 +19,13 @@ HALF_BATH_ENUM = 'Half Bathroom / Powder Room'
 # For this schema, use 'Bedroom', 'Full Bathroom', 'Half Bathroom / Powder Room' as space_type
 
 def extract_layout_from_html(html, file_id):
-    soup = BeautifulSoup(html, 'html.parser')
+    return extract_layout_from_facts(load_facts(html), file_id)
+
+def extract_layout_from_facts(facts, file_id):
     layouts = []
     # Bedrooms
-    bed = soup.find(text=re.compile(r'Bed ?Rooms|No of Bedroom'))
-    if bed:
-        val = bed.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Bed ?Rooms|No of Bedroom'))
+    if val is not None:
         try:
             n_bed = int(val)
         except:
@@ -61,9 +67,8 @@ def extract_layout_from_html(html, file_id):
                 'pool_water_quality': None
             })
     # Full Baths
-    full_bath = soup.find(text=re.compile(r'Full Bath|No of Bath'))
-    if full_bath:
-        val = full_bath.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Full Bath|No of Bath'))
+    if val is not None:
         try:
             n_full = int(val)
         except:
@@ -105,9 +110,8 @@ def extract_layout_from_html(html, file_id):
                 'pool_water_quality': None
             })
     # Half Baths
-    half_bath = soup.find(text=re.compile(r'Half Bath'))
-    if half_bath:
-        val = half_bath.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Half Bath'))
+    if val is not None:
         try:
             n_half = int(val)
         except:
@@ -150,18 +154,34 @@ def extract_layout_from_html(html, file_id):
             })
     return layouts
 
+# One parcel's entry, or the ParcelBudgetExceeded that cut it short
+def layout_entry(item, pages, context):
+    file_id, _ = item
+    html, = pages
+    try:
+        with parcel_budget():
+            return {'layouts': extract_layout_from_html(html, file_id)}
+    except ParcelBudgetExceeded as e:
+        return e
+
 def main():
+    if skip_stage('layout_extractor'):
+        return
     result = {}
-    for fname in os.listdir(INPUT_DIR):
-        if not fname.endswith('.html'):
+    retry_list = RetryList('layout_extractor')
+    metrics = RunMetrics('layout_extractor').start(INPUT_DIR)
+    slow_parcels = SlowParcelCapture('layout_extractor').start()
+    for (file_id, _), entry in process_parcels(iter_input_files(INPUT_DIR), layout_entry, metrics, slow_parcels):
+        if isinstance(entry, ParcelBudgetExceeded):
+            retry_list.add(file_id, str(entry))
+            metrics.error('budget_exceeded')
             continue
-        file_id = fname.replace('.html', '')
-        with open(os.path.join(INPUT_DIR, fname), 'r', encoding='utf-8') as f:
-            html = f.read()
-        layouts = extract_layout_from_html(html, file_id)
-        result[f'property_{file_id}'] = {'layouts': layouts}
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(result, f, indent=2)
+        result[f'property_{file_id}'] = entry
+    retry_list.write()
+    _, nbytes = dump_json(result, OUTPUT_FILE)
+    metrics.wrote(nbytes)
+    slow_parcels.close()
+    metrics.close()
 
 if __name__ == '__main__':
     main()
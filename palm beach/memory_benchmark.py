@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+import importlib
+
+from synthetic_corpus import generate_corpus
+
+STAGES = ['owner_processor', 'layout_extractor', 'structure_extractor', 'utility_extractor', 'address_extraction', 'data_extractor']
+REPORT_FILE = './logs/memory_benchmark.json'
+SNAPSHOT_INTERVAL_SECONDS = 0.05
+
+# Keeps a tracemalloc snapshot taken close to the traced-memory peak, so the
+# top allocators reflect what was alive at the high-water mark, not at exit.
+class PeakSampler(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.snapshot = None
+        self.snapshot_size = 0
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(SNAPSHOT_INTERVAL_SECONDS):
+            self.sample()
+
+    def sample(self):
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.snapshot_size * 1.1:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = current
+
+# Runs one stage in this process (cwd is the corpus root) and prints its measurements as JSON
+def run_worker(stage, top, trace):
+    # Import first so module and dependency loading isn't counted against the stage
+    module = importlib.import_module(stage)
+    if trace:
+        tracemalloc.start()
+        sampler = PeakSampler()
+        sampler.start()
+    start = time.perf_counter()
+    module.main()
+    seconds = time.perf_counter() - start
+    result = {
+        'seconds': round(seconds, 3),
+        # ru_maxrss is in KB on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    if trace:
+        sampler.done.set()
+        sampler.join()
+        sampler.sample()
+        _, peak = tracemalloc.get_traced_memory()
+        result['tracemalloc_peak_mb'] = round(peak / (1024 * 1024), 2)
+        stats = sampler.snapshot.statistics('lineno') if sampler.snapshot else []
+        result['top_allocators'] = [{
+            'location': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+            'size_mb': round(stat.size / (1024 * 1024), 3),
+            'count': stat.count,
+        } for stat in stats[:top]]
+        tracemalloc.stop()
+    print(json.dumps(result))
+
+def run_stage(stage, workdir, top, trace):
+    cmd = [sys.executable, os.path.abspath(__file__), '--worker', stage, '--top', str(top)]
+    if not trace:
+        cmd.append('--no-tracemalloc')
+    proc = subprocess.run(cmd, cwd=workdir, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f'exit {proc.returncode}'}
+    # Stages print warnings of their own; the measurement is the last line
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+# MB added per 1,000 parcels between the smallest and largest corpus
+def growth_per_1k(runs, stage, sizes):
+    lo, hi = sizes[0], sizes[-1]
+    a = runs[str(lo)].get(stage, {}).get('peak_rss_mb')
+    b = runs[str(hi)].get(stage, {}).get('peak_rss_mb')
+    if a is None or b is None or hi == lo:
+        return None
+    return round((b - a) / (hi - lo) * 1000, 2)
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak memory per stage on synthetic corpora of growing size')
+    parser.add_argument('--sizes', default='100,1000,5000', help='comma-separated parcel counts')
+    parser.add_argument('--stages', default=','.join(STAGES), help='data_extractor needs the preprocessor stages before it')
+    parser.add_argument('--top', type=int, default=10, help='top allocators to keep per stage')
+    parser.add_argument('--no-tracemalloc', action='store_true', help='measure RSS only, without tracing overhead')
+    parser.add_argument('--target', action='append', default=[], metavar='STAGE=MB',
+                        help='fail if a stage\'s peak RSS exceeds MB at any size')
+    parser.add_argument('--output', default=REPORT_FILE)
+    parser.add_argument('--keep', action='store_true', help='keep the generated corpora')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    trace = not args.no_tracemalloc
+    if args.worker:
+        run_worker(args.worker, args.top, trace)
+        return
+
+    sizes = sorted(int(s) for s in args.sizes.split(','))
+    stages = args.stages.split(',')
+    targets = {stage: float(mb) for stage, mb in (t.split('=') for t in args.target)}
+    runs = {}
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix=f'pb_mem_{size}_')
+        generate_corpus(workdir, size)
+        runs[str(size)] = {}
+        for stage in stages:
+            runs[str(size)][stage] = run_stage(stage, workdir, args.top, trace)
+            print(f"{size:>8} parcels  {stage:<20} {runs[str(size)][stage].get('peak_rss_mb', 'error'):>8} MB RSS  "
+                  f"{runs[str(size)][stage].get('seconds', '')}s")
+        if args.keep:
+            print(f'Corpus kept at {workdir}')
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = {}
+    failed = False
+    for stage in stages:
+        peak = max((runs[str(s)][stage].get('peak_rss_mb') or 0) for s in sizes)
+        summary[stage] = {'max_peak_rss_mb': peak, 'rss_mb_per_1k_parcels': growth_per_1k(runs, stage, sizes)}
+        if stage in targets:
+            summary[stage]['target_mb'] = targets[stage]
+            summary[stage]['within_target'] = peak <= targets[stage]
+            failed = failed or peak > targets[stage]
+    report = {'sizes': sizes, 'tracemalloc': trace, 'runs': runs, 'summary': summary}
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    for stage, row in summary.items():
+        print(f"{stage:<20} peak {row['max_peak_rss_mb']:>8} MB  growth {row['rss_mb_per_1k_parcels']} MB/1k parcels")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import os
+import sys
+import json
+import time
+import zlib
+import errno
+import ctypes
+import shutil
+from compressed_io import OUTPUT_COMPRESSION, stored_name, is_json_output, compress, read_bytes
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CHANGEFEED_DIR = './logs/'
+# Parcels hash onto this many lock files, so the lock directory stays small
+# however many parcels there are. It sits beside the output tree rather than in
+# it, so whatever lists or ships ./data only sees parcels; every run writing
+# the same ./data has to use the same lock directory.
+LOCK_DIR = os.environ.get('PARCEL_LOCK_DIR') or './data.locks'
+LOCK_STRIPES = 4096
+# Siblings of a parcel directory, only ever touched under the parcel's lock
+STAGING_SUFFIX = '.staging'
+PREVIOUS_SUFFIX = '.previous'
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+# Linux can swap two directories in one step (renameat2, glibc 2.28+)
+_renameat2 = None
+if sys.platform.startswith('linux'):
+    try:
+        _renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+        _renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    except (OSError, AttributeError):
+        _renameat2 = None
+
+def is_null_record(data):
+    return isinstance(data, dict) and all(v in (None, '', [], {}) for v in data.values())
+
+# Exclusive cross-process lock on one parcel directory, held until release().
+# Without fcntl (Windows) runs are not protected from each other.
+class ParcelLock:
+    def __init__(self, property_dir, lock_dir=LOCK_DIR):
+        key = os.path.realpath(property_dir).encode('utf-8', 'surrogatepass')
+        os.makedirs(lock_dir, exist_ok=True)
+        self.f = open(os.path.join(lock_dir, f'{zlib.crc32(key) % LOCK_STRIPES:04d}.lock'), 'a')
+        if fcntl is not None:
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+
+    def release(self):
+        if self.f is not None:
+            # Closing drops the flock
+            self.f.close()
+            self.f = None
+
+def _sibling(property_dir, suffix):
+    parent, name = os.path.split(os.path.normpath(property_dir))
+    return os.path.join(parent, f'.{name}{suffix}')
+
+# Undoes whatever a run that died mid-publish left behind. Called under the lock.
+def recover_parcel_dir(property_dir):
+    previous = _sibling(property_dir, PREVIOUS_SUFFIX)
+    if os.path.isdir(previous):
+        if os.path.isdir(property_dir):
+            shutil.rmtree(previous)
+        else:
+            # Died between moving the old directory aside and moving the new one in
+            os.rename(previous, property_dir)
+    shutil.rmtree(_sibling(property_dir, STAGING_SUFFIX), ignore_errors=True)
+
+# Swaps two existing paths in one step; False where the platform or the
+# filesystem can't
+def _exchange(a, b):
+    if _renameat2 is None:
+        return False
+    if _renameat2(AT_FDCWD, os.fsencode(a), AT_FDCWD, os.fsencode(b), RENAME_EXCHANGE) == 0:
+        return True
+    err = ctypes.get_errno()
+    if err in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+        return False
+    raise OSError(err, os.strerror(err), a)
+
+# Swaps a fully written staging directory in for the parcel directory. Where
+# _exchange() works the parcel path never goes missing, even for readers that
+# don't take the ParcelLock: looking it up finds the old directory or the new
+# one. The old copy is deleted straight after, so such a reader still walking
+# it can see its files disappear. Elsewhere the parcel directory is briefly
+# missing between two renames. Only readers holding the lock are guaranteed a
+# complete directory.
+def _publish(staging, property_dir):
+    if not os.path.isdir(property_dir):
+        os.rename(staging, property_dir)
+        return
+    if _exchange(staging, property_dir):
+        # The old files are now under the staging name, which recovery clears
+        shutil.rmtree(staging)
+        return
+    previous = _sibling(property_dir, PREVIOUS_SUFFIX)
+    os.rename(property_dir, previous)
+    os.rename(staging, property_dir)
+    shutil.rmtree(previous)
+
+def _link_or_copy(src, dst):
+    # A hard link keeps the file's mtime, so unchanged files still look unchanged
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+# Writes one parcel's entity files, leaving byte-identical files untouched so
+# their mtimes don't change, and removing files the current run no longer produces.
+# owns(filename) limits that removal to the files this run is responsible for.
+# The parcel is locked from construction until finish()/discard()/abort(), and
+# new files are staged in a sibling directory that is swapped in by _publish(),
+# so a crash or a concurrent run never exposes a truncated file or a
+# half-updated parcel to anyone holding the parcel's lock.
+class ParcelWriter:
+    def __init__(self, property_dir, metrics=None, owns=None, lock_dir=LOCK_DIR):
+        self.property_dir = property_dir
+        self.metrics = metrics
+        self.owns = owns
+        self.lock = ParcelLock(property_dir, lock_dir)
+        recover_parcel_dir(property_dir)
+        self.existing = {f for f in os.listdir(property_dir) if is_json_output(f)} if os.path.isdir(property_dir) else set()
+        self.written = set()
+        self.added = []
+        self.changed = []
+        self.staging = None
+
+    def write(self, filename, data):
+        # All-null records are never kept, same as the old remove_null_files pass
+        if is_null_record(data):
+            return
+        payload = json.dumps(data, indent=2).encode('utf-8')
+        # Under OUTPUT_COMPRESSION the file is stored as e.g. sales_1.json.gz
+        filename = stored_name(filename)
+        path = os.path.join(self.property_dir, filename)
+        self.written.add(filename)
+        if filename in self.existing:
+            if OUTPUT_COMPRESSION:
+                if read_bytes(path) == payload:
+                    return
+            # Compare the bytes directly; a size mismatch settles most changes without a read
+            elif os.path.getsize(path) == len(payload):
+                with open(path, 'rb') as f:
+                    if f.read() == payload:
+                        return
+            self.changed.append(filename)
+        else:
+            self.added.append(filename)
+        self._open_staging()
+        stored = compress(payload)
+        with open(os.path.join(self.staging, filename), 'wb') as f:
+            f.write(stored)
+        if self.metrics is not None:
+            self.metrics.wrote(len(stored))
+
+    def finish(self):
+        removed = sorted(f for f in self.existing - self.written if self.owns is None or self.owns(f))
+        try:
+            if self.staging is None and not removed:
+                # Nothing changed; the directory is left exactly as it was
+                os.makedirs(self.property_dir, exist_ok=True)
+            else:
+                self._open_staging()
+                self._stage_unchanged(removed)
+                _publish(self.staging, self.property_dir)
+                self.staging = None
+        finally:
+            self.abort()
+        return {'added': sorted(self.added), 'changed': sorted(self.changed), 'removed': removed}
+
+    # Gives the parcel up, e.g. after its budget ran out: what this run staged
+    # is dropped and the last published files stay as they were, so nothing
+    # is reported changed
+    def discard(self):
+        self.abort()
+        return {'added': [], 'changed': [], 'removed': []}
+
+    # Drops anything staged and releases the lock; the parcel directory keeps
+    # whatever the last successful run published
+    def abort(self):
+        self._drop_staging()
+        self.lock.release()
+
+    def _open_staging(self):
+        if self.staging is None:
+            self.staging = _sibling(self.property_dir, STAGING_SUFFIX)
+            os.makedirs(self.staging)
+
+    def _drop_staging(self):
+        if self.staging is not None:
+            shutil.rmtree(self.staging, ignore_errors=True)
+            self.staging = None
+
+    # Every current entry that isn't rewritten or removed goes into the staging directory as is
+    def _stage_unchanged(self, removed):
+        if not os.path.isdir(self.property_dir):
+            return
+        skip = set(removed) | set(os.listdir(self.staging))
+        for name in os.listdir(self.property_dir):
+            if name not in skip:
+                _link_or_copy(os.path.join(self.property_dir, name), os.path.join(self.staging, name))
+
+# One JSON line per parcel whose outputs changed in this run
+class ChangeFeed:
+    def __init__(self, directory=CHANGEFEED_DIR):
+        os.makedirs(directory, exist_ok=True)
+        # The pid keeps runs started in the same second from sharing a file
+        self.path = os.path.join(directory, f"changefeed_{time.strftime('%Y%m%dT%H%M%S')}_{os.getpid()}.jsonl")
+        self.f = open(self.path, 'w', encoding='utf-8')
+
+    def record(self, parcel_id, changes):
+        if not (changes['added'] or changes['changed'] or changes['removed']):
+            return
+        self.f.write(json.dumps(dict(parcel_id=parcel_id, **changes)) + '\n')
+
+    def close(self):
+        self.f.close()
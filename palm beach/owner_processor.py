@@ -1,7 +1,14 @@
 import os
 import re
-import json
-from bs4 import BeautifulSoup
+from page_facts import load_facts
+from field_cleaning import split_owner_names
+from parcel_scheduler import process_parcels
+from input_discovery import iter_input_files
+from parcel_budget import parcel_budget, ParcelBudgetExceeded, RetryList
+from run_metrics import RunMetrics
+from slow_parcels import SlowParcelCapture
+from compressed_io import dump_json
+from extraction_profiles import skip_stage
 
 INPUT_DIR = './input/'
 OUTPUT_RAW = 'owners/owners_extracted.json'
@@ -41,88 +48,81 @@ def parse_person_name(name):
         'middle_name': ' '.join([p.title() for p in parts[2:]])
     }
 
-def extract_owners_from_html(filepath):
-    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-        html = f.read()
-    soup = BeautifulSoup(html, 'html.parser')
+def extract_owners_from_html(filepath, html=None):
+    if html is None:
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            html = f.read()
     property_id = os.path.splitext(os.path.basename(filepath))[0]
+    return extract_owners_from_facts(load_facts(html), property_id)
+
+def extract_owners_from_facts(facts, property_id):
     owners_by_date = {}
     raw_owners = []
 
     # --- Owner(s) Table ---
-    owner_info = soup.find('h2', string=re.compile(r'Owner INFORMATION', re.I))
+    owner_info = facts.heading(re.compile(r'Owner INFORMATION', re.I))
     if owner_info:
-        table = owner_info.find_next('table')
+        table = facts.next_table(owner_info)
         if table:
-            for row in table.find_all('tr'):
-                tds = row.find_all('td')
+            for row in table.rows():
+                tds = row.tds()
                 if tds:
                     # All <span> in first <td>
-                    spans = tds[0].find_all('span')
-                    for span in spans:
-                        name = span.get_text(strip=True)
+                    for name in tds[0].spans:
                         if name:
                             # Split by & if present
-                            for n in re.split(r'\s*&\s*', name):
-                                n = n.strip()
-                                if n:
-                                    raw_owners.append({'type': 'current', 'name': n})
+                            for n in split_owner_names(name):
+                                raw_owners.append({'type': 'current', 'name': n})
     # --- Sales Table (for previous owners) ---
-    sales_info = soup.find('h2', string=re.compile(r'Sales INFORMATION', re.I))
+    sales_info = facts.heading(re.compile(r'Sales INFORMATION', re.I))
     if sales_info:
-        table = sales_info.find_next('table')
+        table = facts.next_table(sales_info)
         if table:
-            rows = table.find_all('tr')
+            rows = table.rows()
             for row in rows[1:]:
-                cols = row.find_all('td')
+                cols = row.tds()
                 if len(cols) >= 5:
-                    date = cols[0].get_text(strip=True)
-                    owner = cols[4].get_text(strip=True)
+                    date = cols[0].strip_text()
+                    owner = cols[4].strip_text()
                     if owner:
                         # Split by & if present
-                        for n in re.split(r'\s*&\s*', owner):
-                            n = n.strip()
-                            if n:
-                                raw_owners.append({'type': 'historical', 'date': date, 'name': n})
-                                if date not in owners_by_date:
-                                    owners_by_date[date] = []
-                                owners_by_date[date].append(n)
+                        for n in split_owner_names(owner):
+                            raw_owners.append({'type': 'historical', 'date': date, 'name': n})
+                            if date not in owners_by_date:
+                                owners_by_date[date] = []
+                            owners_by_date[date].append(n)
     # Portability Calculator
-    port_calc = soup.find('td', string=re.compile(r'Owner Name', re.I))
+    port_calc = facts.td_with_string(re.compile(r'Owner Name', re.I))
     if port_calc:
-        val_td = port_calc.find_next('td')
+        val_td = facts.next_td(port_calc)
         if val_td:
-            name = val_td.get_text(strip=True)
+            name = val_td.strip_text()
             if name and not any(name == o['name'] for o in raw_owners):
-                for n in re.split(r'\s*&\s*', name):
-                    n = n.strip()
-                    if n:
-                        raw_owners.append({'type': 'current', 'name': n})
+                for n in split_owner_names(name):
+                    raw_owners.append({'type': 'current', 'name': n})
     # Exemption Table
-    exemp_info = soup.find('h2', string=re.compile(r'Exemption INFORMATION', re.I))
+    exemp_info = facts.heading(re.compile(r'Exemption INFORMATION', re.I))
     if exemp_info:
-        table = exemp_info.find_next('table')
+        table = facts.next_table(exemp_info)
         if table:
-            rows = table.find_all('tr')
+            rows = table.rows()
             for row in rows[1:]:
-                cols = row.find_all('td')
+                cols = row.tds()
                 if cols:
-                    name = cols[0].get_text(strip=True)
+                    name = cols[0].strip_text()
                     if name and not any(name == o['name'] for o in raw_owners):
-                        for n in re.split(r'\s*&\s*', name):
-                            n = n.strip()
-                            if n:
-                                raw_owners.append({'type': 'exemption', 'name': n})
+                        for n in split_owner_names(name):
+                            raw_owners.append({'type': 'exemption', 'name': n})
     # Build owners_by_date for current owner (from Owner(s) table)
-    prop_detail = soup.find('h2', string=re.compile(r'Property detail', re.I))
+    prop_detail = facts.heading(re.compile(r'Property detail', re.I))
     sale_date = None
     if prop_detail:
-        table = prop_detail.find_next('table')
+        table = facts.next_table(prop_detail)
         if table:
-            for row in table.find_all('tr'):
-                tds = row.find_all('td')
-                if len(tds) >= 2 and 'Sale Date' in tds[0].get_text():
-                    sale_date = tds[1].get_text(strip=True)
+            for row in table.rows():
+                tds = row.tds()
+                if len(tds) >= 2 and 'Sale Date' in tds[0].text:
+                    sale_date = tds[1].strip_text()
                     break
     current_owners = [o['name'] for o in raw_owners if o['type'] == 'current']
     if sale_date and current_owners:
@@ -134,40 +134,66 @@ def extract_owners_from_html(filepath):
             del owners_by_date[k]
     return property_id, owners_by_date, raw_owners
 
+# owners_schema.json entry for one parcel: every name typed as a person or company
+def owners_schema_entry(owners_by_date):
+    entry = {'owners_by_date': {}}
+    for date, owners in owners_by_date.items():
+        owner_objs = []
+        for name in owners:
+            if is_company(name):
+                owner_objs.append({
+                    'type': 'company',
+                    'name': name.title()
+                })
+            else:
+                parsed = parse_person_name(name)
+                owner_objs.append({
+                    'type': 'person',
+                    'first_name': parsed['first_name'],
+                    'last_name': parsed['last_name'],
+                    'middle_name': parsed['middle_name']
+                })
+        entry['owners_by_date'][date] = owner_objs
+    return entry
+
+# (property_id, owners_by_date, raw_owners), or the ParcelBudgetExceeded that cut the parcel short
+def parcel_owners(item, pages, context):
+    _, path = item
+    html, = pages
+    try:
+        with parcel_budget():
+            return extract_owners_from_html(path, html)
+    except ParcelBudgetExceeded as e:
+        return e
+
 def main():
+    if skip_stage('owner_processor'):
+        return
     os.makedirs('owners', exist_ok=True)
     extracted = {}
     schema = {}
     raw_extracted = {}
-    for file in os.listdir(INPUT_DIR):
-        if file.endswith('.html'):
-            path = os.path.join(INPUT_DIR, file)
-            property_id, owners_by_date, raw_owners = extract_owners_from_html(path)
-            extracted[property_id] = owners_by_date
-            raw_extracted[property_id] = raw_owners
-    with open(OUTPUT_RAW, 'w', encoding='utf-8') as f:
-        json.dump(raw_extracted, f, indent=2)
+    retry_list = RetryList('owner_processor')
+    metrics = RunMetrics('owner_processor').start(INPUT_DIR)
+    slow_parcels = SlowParcelCapture('owner_processor').start()
+    for (file_id, _), owners in process_parcels(iter_input_files(INPUT_DIR), parcel_owners, metrics, slow_parcels,
+                                                errors='ignore'):
+        if isinstance(owners, ParcelBudgetExceeded):
+            retry_list.add(file_id, str(owners))
+            metrics.error('budget_exceeded')
+            continue
+        property_id, owners_by_date, raw_owners = owners
+        extracted[property_id] = owners_by_date
+        raw_extracted[property_id] = raw_owners
+    retry_list.write()
+    _, nbytes = dump_json(raw_extracted, OUTPUT_RAW)
+    metrics.wrote(nbytes)
     for property_id, owners_by_date in extracted.items():
-        schema[property_id] = {'owners_by_date': {}}
-        for date, owners in owners_by_date.items():
-            owner_objs = []
-            for name in owners:
-                if is_company(name):
-                    owner_objs.append({
-                        'type': 'company',
-                        'name': name.title()
-                    })
-                else:
-                    parsed = parse_person_name(name)
-                    owner_objs.append({
-                        'type': 'person',
-                        'first_name': parsed['first_name'],
-                        'last_name': parsed['last_name'],
-                        'middle_name': parsed['middle_name']
-                    })
-            schema[property_id]['owners_by_date'][date] = owner_objs
-    with open(OUTPUT_SCHEMA, 'w', encoding='utf-8') as f:
-        json.dump(schema, f, indent=2)
+        schema[property_id] = owners_schema_entry(owners_by_date)
+    _, nbytes = dump_json(schema, OUTPUT_SCHEMA)
+    metrics.wrote(nbytes)
+    slow_parcels.close()
+    metrics.close()
 
 if __name__ == '__main__':
     main()
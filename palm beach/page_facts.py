@@ -0,0 +1,247 @@
+import os
+import json
+import hashlib
+from bs4 import BeautifulSoup, NavigableString, Tag
+from direct_fields import direct_field
+from stream_facts import stream_facts
+from page_templates import template_facts, PAGE_TEMPLATES
+
+# Bump whenever the facts layout changes so stale cache entries are ignored
+FACTS_VERSION = 1
+# Opt-in cache of parsed facts keyed by page content; unset disables it
+FACTS_CACHE_DIR = os.environ.get('FACTS_CACHE_DIR') or None
+ID_PREFIX = 'MainContent_lbl'
+# 'soup' builds a BeautifulSoup tree per page; 'stream' derives the same facts
+# from tokenizer events without a tree (stream_facts.py)
+FACTS_BACKEND = os.environ.get('FACTS_BACKEND') or 'soup'
+
+# A parser-independent record of everything the extractors read from a page:
+#   ids        MainContent_lbl* element id -> element text
+#   texts      [string, row] for every non-blank text node, row = nearest <tr> or -1
+#   cells      [tag, strings, string, seq, spans] for every <td>/<th>; `string`
+#              is bs4's .string (True when it equals the only entry of strings)
+#   rows       [seq, first_cell, end_cell] for every <tr>
+#   containers [kind, classes, seq, first_row, end_row, first_cell, end_cell]
+#              for every <table> and <div class="table_scroll">
+#   headings   [string, seq] for every <h2>
+# seq numbers are document (pre-)order, which is what find_next() and
+# find_all_next() walk; descendants of an element always form a contiguous
+# range of cells/rows, which is what find_all() returns.
+def facts_from_soup(soup):
+    facts = {'version': FACTS_VERSION, 'ids': {}, 'texts': [], 'cells': [], 'rows': [], 'containers': [], 'headings': []}
+    seq = [0]
+
+    def walk(tag, row):
+        for child in tag.children:
+            if isinstance(child, NavigableString):
+                if child.strip():
+                    facts['texts'].append([str(child), row])
+                continue
+            if not isinstance(child, Tag):
+                continue
+            seq[0] += 1
+            name = child.name
+            element_id = child.get('id')
+            if element_id and element_id.startswith(ID_PREFIX) and element_id not in facts['ids']:
+                facts['ids'][element_id] = child.text
+            if name == 'h2':
+                facts['headings'].append([_string(child), seq[0]])
+            if name in ('td', 'th'):
+                strings = [str(s) for s in child.strings]
+                string = _string(child)
+                if string is not None and strings == [string]:
+                    string = True
+                spans = [span.get_text(strip=True) for span in child.find_all('span')]
+                facts['cells'].append([name, strings, string, seq[0], spans])
+                walk(child, row)
+            elif name == 'tr':
+                entry = [seq[0], len(facts['cells']), None]
+                facts['rows'].append(entry)
+                walk(child, len(facts['rows']) - 1)
+                entry[2] = len(facts['cells'])
+            elif name == 'table' or (name == 'div' and 'table_scroll' in (child.get('class') or [])):
+                entry = ['table' if name == 'table' else 'scroll', child.get('class') or [], seq[0], len(facts['rows']), None,
+                         len(facts['cells']), None]
+                facts['containers'].append(entry)
+                walk(child, row)
+                entry[4] = len(facts['rows'])
+                entry[6] = len(facts['cells'])
+            else:
+                walk(child, row)
+
+    walk(soup, -1)
+    return facts
+
+def _string(tag):
+    string = tag.string
+    return None if string is None else str(string)
+
+# Pages matching a learned layout template (PAGE_TEMPLATES=1) skip the parse
+def parse_facts(html):
+    if PAGE_TEMPLATES:
+        facts = template_facts(html, _parse, FACTS_VERSION, FACTS_BACKEND)
+        if facts is not None:
+            return facts
+    return _parse(html)
+
+def _parse(html):
+    if FACTS_BACKEND == 'stream':
+        facts = stream_facts(html)
+        facts['version'] = FACTS_VERSION
+        return facts
+    soup = BeautifulSoup(html, 'html.parser')
+    facts = facts_from_soup(soup)
+    soup.decompose()
+    return facts
+
+def _cache_path(key):
+    return os.path.join(FACTS_CACHE_DIR, key[:2], f'{key}.json')
+
+# Facts for a page, from the cache when it has them. Entries are kept per
+# backend, so a cache filled by one is never served to a run using the other.
+def facts_for_html(html):
+    if not FACTS_CACHE_DIR:
+        return parse_facts(html)
+    key = hashlib.sha256(f'{FACTS_VERSION}:{FACTS_BACKEND}:{html}'.encode('utf-8', 'surrogatepass')).hexdigest()
+    path = _cache_path(key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    facts = parse_facts(html)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(facts, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    return facts
+
+# Nothing is parsed until a query needs the tree
+def load_facts(html):
+    return PageFacts(html=html)
+
+class Cell:
+    __slots__ = ('tag', 'strings', 'string', 'seq', 'spans')
+
+    def __init__(self, raw):
+        self.tag, self.strings, string, self.seq, self.spans = raw
+        self.string = self.strings[0] if string is True else string
+
+    # Same as bs4's .text
+    @property
+    def text(self):
+        return ''.join(self.strings)
+
+    # Same as bs4's .get_text(strip=True)
+    def strip_text(self):
+        return ''.join(s.strip() for s in self.strings if s.strip())
+
+class Row:
+    __slots__ = ('facts', 'seq', 'start', 'end')
+
+    def __init__(self, facts, raw):
+        self.facts = facts
+        self.seq, self.start, self.end = raw
+
+    def cells(self, tag=None):
+        cells = [Cell(raw) for raw in self.facts.data['cells'][self.start:self.end]]
+        return cells if tag is None else [c for c in cells if c.tag == tag]
+
+    # Equivalent to tr.find_all('td')
+    def tds(self):
+        return self.cells('td')
+
+class Container:
+    __slots__ = ('facts', 'kind', 'classes', 'seq', 'start', 'end', 'cell_start', 'cell_end')
+
+    def __init__(self, facts, raw):
+        self.facts = facts
+        self.kind, self.classes, self.seq, self.start, self.end, self.cell_start, self.cell_end = raw
+
+    # Equivalent to table.find_all('tr')
+    def rows(self):
+        return [Row(self.facts, raw) for raw in self.facts.data['rows'][self.start:self.end]]
+
+    # Equivalent to table.find_all('th')
+    def ths(self):
+        return [Cell(raw) for raw in self.facts.data['cells'][self.cell_start:self.cell_end] if raw[0] == 'th']
+
+class Heading:
+    __slots__ = ('string', 'seq')
+
+    def __init__(self, raw):
+        self.string, self.seq = raw
+
+# Query helpers mirroring the BeautifulSoup calls the extractors used to make
+class PageFacts:
+    def __init__(self, data=None, html=None):
+        self._data = data
+        self.html = html
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = facts_for_html(self.html)
+            self.html = None
+        return self._data
+
+    # soup.find(id=element_id).text; read straight from the raw page while
+    # the tree hasn't been needed yet, when the fast path can vouch for it
+    def by_id(self, element_id):
+        if self._data is None:
+            value = direct_field(self.html, element_id)
+            if value is not None:
+                return value
+        return self.data['ids'].get(element_id)
+
+    # soup.find(string=pattern).find_parent('tr').find_all('td')[-1].get_text(strip=True),
+    # or None where that chain would have hit a missing element
+    def row_value(self, pattern):
+        for text, row in self.data['texts']:
+            if pattern.search(text):
+                if row < 0:
+                    return None
+                tds = Row(self, self.data['rows'][row]).tds()
+                return tds[-1].strip_text() if tds else None
+        return None
+
+    # soup.find_all('h2', string=pattern)
+    def headings(self, pattern):
+        return [Heading(raw) for raw in self.data['headings'] if raw[0] is not None and pattern.search(raw[0])]
+
+    # soup.find('h2', string=pattern)
+    def heading(self, pattern):
+        headings = self.headings(pattern)
+        return headings[0] if headings else None
+
+    # element.find_next('table')
+    def next_table(self, after):
+        for raw in self.data['containers']:
+            if raw[0] == 'table' and raw[2] > after.seq:
+                return Container(self, raw)
+        return None
+
+    # element.find_all_next('div', class_='table_scroll')
+    def scroll_tables_after(self, after):
+        return [Container(self, raw) for raw in self.data['containers'] if raw[0] == 'scroll' and raw[2] > after.seq]
+
+    # soup.find_all('table', class_=cls)
+    def tables_with_class(self, cls):
+        return [Container(self, raw) for raw in self.data['containers'] if raw[0] == 'table' and cls in raw[1]]
+
+    # soup.find('td', string=pattern)
+    def td_with_string(self, pattern):
+        for raw in self.data['cells']:
+            if raw[0] == 'td':
+                cell = Cell(raw)
+                if cell.string is not None and pattern.search(cell.string):
+                    return cell
+        return None
+
+    # element.find_next('td')
+    def next_td(self, after):
+        for raw in self.data['cells']:
+            if raw[0] == 'td' and raw[3] > after.seq:
+                return Cell(raw)
+        return None
@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import hashlib
+from json.encoder import encode_basestring
+from direct_fields import decode_text
+from compressed_io import replace_atomically
+
+# Nearly every page comes from one server template: the markup is the same and
+# only the text between tags changes, plus row counts, which give a handful of
+# layouts. A page's skeleton is its markup with every non-blank text run cut
+# out and attribute values other than id/class blanked, since the facts don't
+# depend on those. The first page with a new skeleton is parsed once more with
+# each text run swapped for a numbered placeholder; the resulting facts record,
+# placeholders and all, is the layout's template, i.e. the position every text
+# run ends up at. A later page with the same skeleton gets its facts by putting
+# its own text runs into those positions, without being parsed.
+#
+# The tokenizer only accepts markup whose extent html.parser agrees on
+# (well-formed tags, simple comments, a doctype, script/style bodies without
+# '</'), so two pages with the same skeleton parse alike apart from their text.
+# On anything else skeleton() returns None and the page is parsed as usual.
+
+# Opt-in: use learned templates in place of a full parse where a page's skeleton matches
+PAGE_TEMPLATES = os.environ.get('PAGE_TEMPLATES') == '1'
+# Optional directory where learned templates are kept for later stages and runs
+PAGE_TEMPLATES_DIR = os.environ.get('PAGE_TEMPLATES_DIR') or None
+# Layouts learned per process; pages of further new layouts are just parsed
+PAGE_TEMPLATES_MAX = int(os.environ.get('PAGE_TEMPLATES_MAX') or 256)
+# Bump whenever the skeleton or template format changes
+TEMPLATE_VERSION = 1
+
+_TOKEN_RE = re.compile(r'''(
+    <[a-zA-Z][-.a-zA-Z0-9:_]*(?:\s+[^\s"'<>/=]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'=<>`]+))?)*\s*/?>
+  | </[a-zA-Z][-.a-zA-Z0-9:_]*\s*>
+  | <!--(?!>|->)(?:[^-]|-(?!-))*-->
+  | <!(?i:doctype)[^<>]*>
+)''', re.X)
+_START_NAME_RE = re.compile(r'<([a-zA-Z][-.a-zA-Z0-9:_]*)')
+_ATTR_VALUE_RE = re.compile(r'''(\s+([^\s"'<>/=]+)\s*=\s*)(?:"[^"]*"|'[^']*'|[^\s"'=<>`]+)''')
+# A '<' html.parser would read as the start of markup; any other '<' is text
+_MARKUP_OPEN_RE = re.compile(r'<(?:[a-zA-Z/!?]|$)')
+_RAW_CLOSE_RE = re.compile(r'</(script|style)\s*>', re.I)
+# Elements whose body html.parser passes through as raw text
+RAW_TEXT_ELEMENTS = ('script', 'style')
+KEPT_ATTRIBUTES = ('id', 'class')
+# Placeholder for text run n: OPEN n CLOSE, or STRIP n CLOSE where the facts
+# hold the run stripped (span texts). Private-use characters; pages that
+# contain them are never templated.
+OPEN, STRIP, CLOSE = '\ue000', '\ue002', '\ue001'
+_PLACEHOLDER_RE = re.compile(f'[{OPEN}{STRIP}][0-9a-f]+{CLOSE}')
+TEXT_SLOT = '\x01'
+# Tags repeat from page to page, so their skeleton form is looked up rather
+# than recomputed; long tags (view state and the like) are never kept
+TAG_CACHE_MAX = 50000
+TAG_CACHE_TOKEN_MAX = 256
+
+templates = {}
+_tag_shapes = {}
+
+# (skeleton form of a start tag, lowercased tag name)
+def _tag_shape(token):
+    shape = _tag_shapes.get(token)
+    if shape is not None:
+        return shape
+    name = _START_NAME_RE.match(token).group(1).lower()
+    normalized = _ATTR_VALUE_RE.sub(lambda m: m.group(0) if m.group(2).lower() in KEPT_ATTRIBUTES else m.group(1), token)
+    shape = (normalized, name)
+    if len(token) <= TAG_CACHE_TOKEN_MAX:
+        if len(_tag_shapes) >= TAG_CACHE_MAX:
+            _tag_shapes.clear()
+        _tag_shapes[token] = shape
+    return shape
+
+# (fingerprint, pieces, texts): pieces is the page cut into markup strings and
+# text run indexes, texts the decoded text runs. None when the tokenizer can't
+# vouch that html.parser sees the same markup.
+def skeleton(html):
+    if OPEN in html or STRIP in html or CLOSE in html:
+        return None
+    # Even entries are text, odd entries markup
+    parts = _TOKEN_RE.split(html)
+    shape = []
+    pieces = []
+    texts = []
+    raw_element = None
+    for i, part in enumerate(parts):
+        if i % 2:
+            if raw_element is not None:
+                # The raw body ended at its first '</', which has to close the element
+                m = _RAW_CLOSE_RE.fullmatch(part)
+                if not m or m.group(1).lower() != raw_element:
+                    return None
+                raw_element = None
+                shape.append(part)
+            elif part[1] in '/!':
+                shape.append(part)
+            else:
+                tag, name = _tag_shape(part)
+                if name in RAW_TEXT_ELEMENTS:
+                    # Parser versions disagree on whether <script/> has a body
+                    if part.endswith('/>'):
+                        return None
+                    raw_element = name
+                shape.append(tag)
+            pieces.append(part)
+            continue
+        if raw_element is not None:
+            # html.parser passes a script/style body through undecoded
+            if '</' in part or '<!--' in part:
+                return None
+            text = part
+        else:
+            if not part:
+                continue
+            if '<' in part and _MARKUP_OPEN_RE.search(part):
+                return None
+            text = decode_text(part)
+            if text is None:
+                return None
+        if text.strip():
+            pieces.append(len(texts))
+            texts.append(text)
+            shape.append(TEXT_SLOT)
+        elif part:
+            # Blank runs are formatting; the tree builder treats them by their exact content
+            pieces.append(part)
+            shape.append(part)
+    if raw_element is not None:
+        return None
+    digest = hashlib.blake2b('\x00'.join(shape).encode('utf-8', 'surrogatepass'), digest_size=16)
+    digest.update(f':{TEMPLATE_VERSION}'.encode('ascii'))
+    return digest.hexdigest(), pieces, texts
+
+# Facts with a placeholder in place of each text run, serialized; None when
+# the placeholders didn't come through the parse intact
+def learn(pieces, texts, parse):
+    page = ''.join(f'{OPEN}{p:x}{CLOSE}' if isinstance(p, int) else p for p in pieces)
+    facts = parse(page)
+    for cell in facts['cells']:
+        # Span texts are the runs stripped and joined
+        cell[4] = [span.replace(OPEN, STRIP) for span in cell[4]]
+    template = json.dumps(facts, ensure_ascii=False, separators=(',', ':'))
+    found = _PLACEHOLDER_RE.findall(template)
+    if template.count(CLOSE) != len(found) or {int(p[1:-1], 16) for p in found} != set(range(len(texts))):
+        return None
+    return template
+
+# The template as alternating JSON text and run references: n for run n,
+# ~n for run n stripped
+def compile_template(template):
+    segments = []
+    last = 0
+    for m in _PLACEHOLDER_RE.finditer(template):
+        n = int(m.group(0)[1:-1], 16)
+        segments.append(template[last:m.start()])
+        segments.append(n if m.group(0)[0] == OPEN else ~n)
+        last = m.end()
+    segments.append(template[last:])
+    return segments
+
+def fill(segments, texts):
+    encoded = [encode_basestring(text)[1:-1] for text in texts]
+    out = segments[:]
+    for i in range(1, len(out), 2):
+        n = out[i]
+        out[i] = encoded[n] if n >= 0 else encode_basestring(texts[~n].strip())[1:-1]
+    return json.loads(''.join(out))
+
+def _template_path(key):
+    return os.path.join(PAGE_TEMPLATES_DIR, key[-2:], f'{key}.json')
+
+def _stored_template(key):
+    if not PAGE_TEMPLATES_DIR:
+        return None
+    try:
+        with open(_template_path(key), 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _store_template(key, template):
+    if not PAGE_TEMPLATES_DIR:
+        return
+    path = _template_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    replace_atomically(path, template.encode('utf-8'))
+
+# Facts for a page from its layout's template, learning the template from
+# this page when the layout is new. None means the caller parses the page.
+# parse is the full parser, facts_version the facts layout it produces and
+# backend the parser's name; templates are never shared between backends.
+def template_facts(html, parse, facts_version, backend):
+    shape = skeleton(html)
+    if shape is None:
+        return None
+    fingerprint, pieces, texts = shape
+    key = f'{facts_version}_{backend}_{fingerprint}'
+    if key in templates:
+        segments = templates[key]
+        return fill(segments, texts) if segments is not None else None
+    if len(templates) >= PAGE_TEMPLATES_MAX:
+        return None
+    template = _stored_template(key)
+    if template is not None:
+        templates[key] = compile_template(template)
+        return fill(templates[key], texts)
+    template = learn(pieces, texts, parse)
+    segments = compile_template(template) if template is not None else None
+    facts = parse(html)
+    # The page that taught the template has to come out of it exactly as the
+    # full parse did; a layout where it doesn't is parsed from then on
+    if segments is not None and fill(segments, texts) != facts:
+        segments = None
+    templates[key] = segments
+    if segments is not None:
+        _store_template(key, template)
+    return facts
@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import signal
+from contextlib import contextmanager
+from compressed_io import replace_atomically
+
+# Per-parcel limits; 0 disables a limit. The memory limit is the RSS growth
+# allowed while one parcel is processed, not the absolute process size.
+PARCEL_TIMEOUT_SECONDS = float(os.environ.get('PARCEL_TIMEOUT_SECONDS') or 0)
+PARCEL_MEMORY_LIMIT_MB = float(os.environ.get('PARCEL_MEMORY_LIMIT_MB') or 0)
+CHECK_INTERVAL_SECONDS = 0.25
+RETRY_DIR = './logs/'
+
+# Derives from BaseException so the broad `except Exception` blocks in the
+# cleaning helpers can't swallow it and silently continue the parcel.
+class ParcelBudgetExceeded(BaseException):
+    pass
+
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is a peak in KB on Linux; the best we have without /proc
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+@contextmanager
+def parcel_budget(max_seconds=None, max_memory_mb=None):
+    if max_seconds is None:
+        max_seconds = PARCEL_TIMEOUT_SECONDS
+    if max_memory_mb is None:
+        max_memory_mb = PARCEL_MEMORY_LIMIT_MB
+    # SIGALRM only exists on Unix and only fires in the main thread
+    if (not max_seconds and not max_memory_mb) or not hasattr(signal, 'setitimer'):
+        yield
+        return
+    start = time.monotonic()
+    start_rss = current_rss_mb() if max_memory_mb else 0
+    # Only the body can be interrupted, and only once: a tick that lands while
+    # the timer is being set up or torn down does nothing, so the budget can
+    # never fire in the caller's own cleanup
+    armed = [False]
+
+    def on_tick(signum, frame):
+        if not armed[0]:
+            return
+        elapsed = time.monotonic() - start
+        if max_seconds and elapsed > max_seconds:
+            armed[0] = False
+            raise ParcelBudgetExceeded(f'wall-clock {elapsed:.1f}s exceeded limit of {max_seconds}s')
+        if max_memory_mb:
+            grown = current_rss_mb() - start_rss
+            if grown > max_memory_mb:
+                armed[0] = False
+                raise ParcelBudgetExceeded(f'memory grew {grown:.0f}MB, limit is {max_memory_mb}MB')
+
+    previous = signal.signal(signal.SIGALRM, on_tick)
+    interval = min(CHECK_INTERVAL_SECONDS, max_seconds) if max_seconds else CHECK_INTERVAL_SECONDS
+    signal.setitimer(signal.ITIMER_REAL, interval, interval)
+    try:
+        armed[0] = True
+        yield
+    finally:
+        armed[0] = False
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+class RetryList:
+    def __init__(self, stage):
+        self.stage = stage
+        self.entries = []
+
+    def add(self, parcel_id, reason):
+        self.entries.append({'parcel_id': parcel_id, 'reason': reason})
+        print(f'Abandoned {parcel_id} in {self.stage}: {reason}')
+
+    def write(self):
+        # One file per stage so stages running side by side don't clobber each other
+        path = os.path.join(RETRY_DIR, f'retry_{self.stage}.json')
+        if not self.entries:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        os.makedirs(RETRY_DIR, exist_ok=True)
+        replace_atomically(path, json.dumps(self.entries, indent=2).encode('utf-8'))
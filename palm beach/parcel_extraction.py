@@ -0,0 +1,549 @@
+import re
+from functools import lru_cache
+from page_facts import load_facts
+from field_cleaning import clean_money, clean_str, parse_date, safe_val
+from output_writer import is_null_record
+from compressed_io import stored_name
+from extraction_profiles import produces, stage_needed
+from owner_processor import extract_owners_from_facts, owners_schema_entry
+from structure_extractor import extract_structure_from_facts
+from utility_extractor import extract_utility_from_facts
+from address_extraction import load_schema, resolve_address
+
+# The per-parcel extraction as plain functions over in-memory data. The
+# scripts are file-based wrappers around these: the preprocessors keep their
+# per-parcel results in owners/*.json and data_extractor writes what
+# build_entities returns. extract_parcel runs the lot for one parcel.
+
+SALES_H2_RE = re.compile('Sales INFORMATION', re.I)
+ASSESSED_H2_RE = re.compile('Assessed & taxable values', re.I)
+APPRAISALS_H2_RE = re.compile('Appraisals', re.I)
+TAXES_H2_RE = re.compile('Taxes', re.I)
+
+# Sales table rows as (sale number, ISO date, price); the sale number counts
+# skipped short rows too, matching the sales_<n>.json file names.
+def extract_sale_rows(facts):
+    sale_rows = []
+    sales_tables = facts.headings(SALES_H2_RE)
+    if sales_tables:
+        sales_table = facts.next_table(sales_tables[0])
+        if sales_table:
+            rows = sales_table.rows()[1:]
+            for i, row in enumerate(rows):
+                cols = row.tds()
+                if len(cols) < 5:
+                    continue
+                date = parse_date(cols[0].text.strip())
+                price = clean_money(cols[1].text.strip())
+                if price == 0:
+                    price = None
+                sale_rows.append((i + 1, date, price))
+    return sale_rows
+
+# One dict per tax year, in year order, with the cleaned value columns
+def extract_tax_rows(facts):
+    tax_years = set()
+    assessed = {}
+    taxable = {}
+    market = {}
+    building = {}
+    land = {}
+    monthly_tax = {}
+    for h2 in facts.headings(ASSESSED_H2_RE):
+        for tab in facts.scroll_tables_after(h2):
+            ths = tab.ths()
+            if len(ths) > 1:
+                years = [th.text.strip() for th in ths[1:]]
+                trs = tab.rows()
+                for tr in trs:
+                    tds = tr.tds()
+                    if not tds:
+                        continue
+                    label = tds[0].text.strip().lower()
+                    for j, year in enumerate(years):
+                        tax_years.add(year)
+                        val = clean_money(tds[j+1].text) if j+1 < len(tds) else None
+                        if val == 0:
+                            val = None
+                        if 'assessed value' in label:
+                            assessed[year] = val
+                        elif 'taxable value' in label:
+                            taxable[year] = val
+    for h2 in facts.headings(APPRAISALS_H2_RE):
+        for tab in facts.scroll_tables_after(h2):
+            ths = tab.ths()
+            if len(ths) > 1:
+                years = [th.text.strip() for th in ths[1:]]
+                trs = tab.rows()
+                for tr in trs:
+                    tds = tr.tds()
+                    if not tds:
+                        continue
+                    label = tds[0].text.strip().lower()
+                    for j, year in enumerate(years):
+                        tax_years.add(year)
+                        val = clean_money(tds[j+1].text) if j+1 < len(tds) else None
+                        if val == 0:
+                            val = None
+                        if 'total market value' in label:
+                            market[year] = val
+                        elif 'improvement value' in label:
+                            building[year] = val
+                        elif 'land value' in label:
+                            land[year] = val
+    for h2 in facts.headings(TAXES_H2_RE):
+        for tab in facts.scroll_tables_after(h2):
+            ths = tab.ths()
+            if len(ths) > 1:
+                years = [th.text.strip() for th in ths[1:]]
+                trs = tab.rows()
+                for tr in trs:
+                    tds = tr.tds()
+                    if not tds:
+                        continue
+                    label = tds[0].text.strip().lower()
+                    for j, year in enumerate(years):
+                        if 'total tax' in label:
+                            val = clean_money(tds[j+1].text) if j+1 < len(tds) else None
+                            if val == 0:
+                                val = None
+                            monthly_tax[year] = val
+    tax_rows = []
+    for year in sorted(tax_years):
+        # Column headers that aren't a year get no row
+        try:
+            tax_year = int(year)
+        except Exception:
+            continue
+        tax_rows.append({
+            "year": year,
+            "tax_year": tax_year,
+            "assessed": safe_val(assessed.get(year)),
+            "market": safe_val(market.get(year)),
+            "building": safe_val(building.get(year)),
+            "land": safe_val(land.get(year)),
+            "taxable": safe_val(taxable.get(year)),
+            "total_tax": monthly_tax.get(year)
+        })
+    return tax_rows
+
+# One parcel's entities as {file name: record}, in the order data_extractor
+# writes them. The maps are keyed like the preprocessor outputs
+# (property_<id>, or the bare id for owners) and are not modified. facts may be
+# None when the profile needs nothing from the page. export_rows, when given,
+# is a list that receives the parcel's sale and tax rows for the columnar
+# export. share_owner(kind, record), when given, stores a person/company
+# elsewhere and returns the link to it.
+def build_entities(parcel_id, facts, address_map, owners_schema, structure_data, utility_data, export_rows=None, share_owner=None):
+    entities = {}
+    addr_key = f"property_{parcel_id}"
+    address = dict(address_map.get(addr_key, {}).get("address", {}))
+    # --- ADDRESS ---
+    address_schema_fields = [
+        "source_http_request", "request_identifier", "city_name", "country_code", "county_name", "latitude", "longitude", "plus_four_postal_code", "postal_code", "state_code", "street_name", "street_post_directional_text", "street_pre_directional_text", "street_number", "street_suffix_type", "unit_identifier", "township", "range", "section", "block"
+    ]
+    if address and produces("address"):
+        for k in address_schema_fields:
+            if k not in address:
+                address[k] = None
+        entities["address.json"] = address
+    # --- PROPERTY ---
+    if produces("property"):
+        property_json = {
+            "source_http_request": address.get("source_http_request", {}),
+            "request_identifier": parcel_id,
+            "livable_floor_area": None,
+            "number_of_units_type": None,
+            "parcel_identifier": None,
+            "property_legal_description_text": None,
+            "property_structure_built_year": None,
+            "property_type": None
+        }
+        pcn = facts.by_id("MainContent_lblPCN")
+        if pcn is not None:
+            property_json["parcel_identifier"] = clean_str(pcn)
+        legal = facts.by_id("MainContent_lblLegalDesc")
+        if legal is not None:
+            property_json["property_legal_description_text"] = clean_str(legal)
+        if addr_key in structure_data and structure_data[addr_key].get("year_built"):
+            property_json["property_structure_built_year"] = structure_data[addr_key]["year_built"]
+        # Extract number_of_units_type and lot_area_sqft from structural details
+        number_of_units = None
+        lot_area_sqft = None
+        struct_tables = facts.tables_with_class("structural_elements")
+        for struct_table in struct_tables:
+            rows = struct_table.rows()
+            for row in rows:
+                tds = row.tds()
+                if len(tds) == 2:
+                    label = tds[0].text.strip().lower()
+                    val = tds[1].text.strip()
+                    if ("number of units" in label or "units" in label) and val.isdigit():
+                        number_of_units = int(val)
+                    if ("total square feet" in label or "area" == label) and val.isdigit():
+                        lot_area_sqft = int(val)
+        # Set number_of_units_type
+        if number_of_units == 1:
+            property_json["number_of_units_type"] = "One"
+        elif number_of_units == 2:
+            property_json["number_of_units_type"] = "Two"
+        elif number_of_units == 3:
+            property_json["number_of_units_type"] = "Three"
+        elif number_of_units == 4:
+            property_json["number_of_units_type"] = "Four"
+        elif number_of_units and 2 <= number_of_units <= 4:
+            property_json["number_of_units_type"] = "TwoToFour"
+        # Set lot_area_sqft as string for property (schema allows string or null)
+        if lot_area_sqft:
+            property_json["livable_floor_area"] = str(lot_area_sqft)
+        # Set property_type
+        property_type_set = False
+        # Try to extract from Subdivision
+        subdiv = facts.by_id("MainContent_lblSubdiv")
+        if subdiv is not None:
+            val = subdiv.strip().lower()
+            if "condo" in val:
+                property_json["property_type"] = "Condominium"
+                property_type_set = True
+            elif "townhouse" in val:
+                property_json["property_type"] = "Townhouse"
+                property_type_set = True
+            elif "single family" in val:
+                property_json["property_type"] = "SingleFamily"
+                property_type_set = True
+            elif "duplex" in val:
+                property_json["property_type"] = "Duplex"
+                property_type_set = True
+            elif "cooperative" in val:
+                property_json["property_type"] = "Cooperative"
+                property_type_set = True
+        # If not set, try to extract from Property Use Code
+        if not property_type_set:
+            # Find "Property Use Code" in structural_elements tables
+            for struct_table in facts.tables_with_class("structural_elements"):
+                rows = struct_table.rows()
+                for row in rows:
+                    tds = row.tds()
+                    if len(tds) == 2:
+                        label = tds[0].text.strip().lower()
+                        val = tds[1].text.strip().lower()
+                        if "property use code" in label:
+                            # Map code or text to property_type
+                            if "condo" in val:
+                                property_json["property_type"] = "Condominium"
+                            elif "townhouse" in val:
+                                property_json["property_type"] = "Townhouse"
+                            elif "single family" in val:
+                                property_json["property_type"] = "SingleFamily"
+                            elif "duplex" in val:
+                                property_json["property_type"] = "Duplex"
+                            elif "cooperative" in val:
+                                property_json["property_type"] = "Cooperative"
+                            elif "0400" in val:
+                                property_json["property_type"] = "Condominium"
+                            elif "0100" in val:
+                                property_json["property_type"] = "SingleFamily"
+                            elif "0200" in val:
+                                property_json["property_type"] = "Duplex"
+                            elif "0300" in val:
+                                property_json["property_type"] = "Triplex"
+                            elif "0500" in val:
+                                property_json["property_type"] = "Townhouse"
+                            else:
+                                property_json["property_type"] = None
+                            property_type_set = True
+                            break
+                if property_type_set:
+                    break
+        entities["property.json"] = property_json
+
+    # --- SALES ---
+    sales_jsons = []
+    sales_years = []
+    # Sale and tax rows are parsed when their entities or the columnar export need them
+    sale_rows = extract_sale_rows(facts) if produces("sales") or export_rows is not None else []
+    if produces("sales"):
+        for i, date, price in sale_rows:
+            sales_json = {
+                "source_http_request": address.get("source_http_request", {}),
+                "request_identifier": f"{parcel_id}_sale_{i}",
+                "ownership_transfer_date": date,
+                "purchase_price_amount": price
+            }
+            sales_jsons.append(sales_json)
+            sales_years.append(date[:4] if date else None)
+            entities[f"sales_{i}.json"] = sales_json
+    # --- TAXES ---
+    tax_rows = extract_tax_rows(facts) if produces("tax") or export_rows is not None else []
+    if produces("tax"):
+        for row in tax_rows:
+            year = row["year"]
+            tax_json = {
+                "source_http_request": address.get("source_http_request", {}),
+                "request_identifier": f"{parcel_id}_tax_{year}",
+                "tax_year": row["tax_year"],
+                "property_assessed_value_amount": row["assessed"],
+                "property_market_value_amount": row["market"],
+                "property_building_amount": row["building"],
+                "property_land_amount": row["land"],
+                "property_taxable_value_amount": row["taxable"],
+                "monthly_tax_amount": row["total_tax"],
+                "period_end_date": None,
+                "period_start_date": None
+            }
+            entities[f"tax_{year}.json"] = tax_json
+    if export_rows is not None:
+        export_rows.extend([sale_rows, tax_rows])
+    # --- OWNERS (PERSON/COMPANY) ---
+    owner_refs = {}
+    if parcel_id in owners_schema:
+        owners_by_date = owners_schema[parcel_id]["owners_by_date"]
+        for i, (date, owners) in enumerate(owners_by_date.items()):
+            for j, owner in enumerate(owners):
+                if owner["type"] == "person" and produces("person"):
+                    person_json = {
+                        "source_http_request": address.get("source_http_request", {}),
+                        "request_identifier": f"{parcel_id}_person_{i+1}_{j+1}",
+                        "birth_date": None,
+                        "first_name": owner.get("first_name"),
+                        "last_name": owner.get("last_name"),
+                        "middle_name": owner.get("middle_name"),
+                        "prefix_name": None,
+                        "suffix_name": None,
+                        "us_citizenship_status": None,
+                        "veteran_status": None
+                    }
+                    if share_owner is not None:
+                        owner_refs[(i, j)] = share_owner("person", person_json)
+                    else:
+                        entities[f"person_{i+1}_{j+1}.json"] = person_json
+                        owner_refs[(i, j)] = f"./{stored_name(f'person_{i+1}_{j+1}.json')}"
+                elif owner["type"] == "company" and produces("company"):
+                    company_json = {
+                        "source_http_request": address.get("source_http_request", {}),
+                        "request_identifier": f"{parcel_id}_company_{i+1}_{j+1}",
+                        "name": owner.get("name")
+                    }
+                    if share_owner is not None:
+                        owner_refs[(i, j)] = share_owner("company", company_json)
+                    else:
+                        entities[f"company_{i+1}_{j+1}.json"] = company_json
+                        owner_refs[(i, j)] = f"./{stored_name(f'company_{i+1}_{j+1}.json')}"
+    # --- RELATIONSHIP FILES ---
+    if parcel_id in owners_schema and produces("relationship"):
+        owners_by_date = owners_schema[parcel_id]["owners_by_date"]
+        for i, (date, owners) in enumerate(owners_by_date.items()):
+            sales_file = stored_name(f"sales_{i+1}.json")
+            for j, owner in enumerate(owners):
+                if owner["type"] == "person":
+                    rel = {
+                        "to": {"/": owner_refs[(i, j)]},
+                        "from": {"/": f"./{sales_file}"}
+                    }
+                    entities[f"relationship_sales_person_{i+1}_{j+1}.json"] = rel
+                elif owner["type"] == "company":
+                    rel = {
+                        "to": {"/": owner_refs[(i, j)]},
+                        "from": {"/": f"./{sales_file}"}
+                    }
+                    entities[f"relationship_sales_company_{i+1}_{j+1}.json"] = rel
+    # --- STRUCTURE ---
+    if addr_key in structure_data and produces("structure"):
+        struct = structure_data[addr_key].copy()
+        if 'year_built' in struct:
+            del struct['year_built']
+        required_structure_fields = [
+            "source_http_request", "request_identifier", "architectural_style_type", "attachment_type", "exterior_wall_material_primary", "exterior_wall_material_secondary", "exterior_wall_condition", "exterior_wall_insulation_type", "flooring_material_primary", "flooring_material_secondary", "subfloor_material", "flooring_condition", "interior_wall_structure_material", "interior_wall_surface_material_primary", "interior_wall_surface_material_secondary", "interior_wall_finish_primary", "interior_wall_finish_secondary", "interior_wall_condition", "roof_covering_material", "roof_underlayment_type", "roof_structure_material", "roof_design_type", "roof_condition", "roof_age_years", "gutters_material", "gutters_condition", "roof_material_type", "foundation_type", "foundation_material", "foundation_waterproofing", "foundation_condition", "ceiling_structure_material", "ceiling_surface_material", "ceiling_insulation_type", "ceiling_height_average", "ceiling_condition", "exterior_door_material", "interior_door_material", "window_frame_material", "window_glazing_type", "window_operation_type", "window_screen_material", "primary_framing_material", "secondary_framing_material", "structural_damage_indicators"
+        ]
+        for k in required_structure_fields:
+            if k not in struct:
+                struct[k] = None
+        struct["source_http_request"] = address.get("source_http_request", {})
+        struct["request_identifier"] = parcel_id
+        entities["structure.json"] = struct
+    # --- UTILITY ---
+    if addr_key in utility_data and produces("utility"):
+        util = dict(utility_data[addr_key])
+        util["source_http_request"] = address.get("source_http_request", {})
+        util["request_identifier"] = parcel_id
+        entities["utility.json"] = util
+    # --- LAYOUT ---
+    bedroom_count = 0
+    bathroom_count = 0
+    half_bath_count = 0
+    # Room counts stay 0, and no layout files are written, outside the profile
+    struct_tables = facts.tables_with_class("structural_elements") if produces("layout") else []
+    for struct_table in struct_tables:
+        rows = struct_table.rows()
+        for row in rows:
+            tds = row.tds()
+            if len(tds) == 2:
+                label = tds[0].text.strip().lower()
+                val = tds[1].text.strip()
+                if ("bedroom" in label or "bed room" in label) and val.isdigit():
+                    bedroom_count = int(val)
+                if ("full bath" in label or ("bath" in label and "half" not in label)) and val.isdigit():
+                    bathroom_count = int(val)
+                if ("half bath" in label or ("half" in label and "bath" in label)) and val.isdigit():
+                    half_bath_count = int(val)
+    layout_idx = 1
+    for i in range(bedroom_count):
+        layout = {
+            "source_http_request": address.get("source_http_request", {}),
+            "request_identifier": f"{parcel_id}_layout_bedroom_{i+1}",
+            "space_type": "Bedroom",
+            "flooring_material_type": None,
+            "size_square_feet": None,
+            "floor_level": None,
+            "has_windows": None,
+            "window_design_type": None,
+            "window_material_type": None,
+            "window_treatment_type": None,
+            "is_finished": True,
+            "furnished": None,
+            "paint_condition": None,
+            "flooring_wear": None,
+            "clutter_level": None,
+            "visible_damage": None,
+            "countertop_material": None,
+            "cabinet_style": None,
+            "fixture_finish_quality": None,
+            "design_style": None,
+            "natural_light_quality": None,
+            "decor_elements": None,
+            "pool_type": None,
+            "pool_equipment": None,
+            "spa_type": None,
+            "safety_features": None,
+            "view_type": None,
+            "lighting_features": None,
+            "condition_issues": None,
+            "is_exterior": False,
+            "pool_condition": None,
+            "pool_surface_type": None,
+            "pool_water_quality": None
+        }
+        entities[f"layout_{layout_idx}.json"] = layout
+        layout_idx += 1
+    for i in range(bathroom_count):
+        layout = {
+            "source_http_request": address.get("source_http_request", {}),
+            "request_identifier": f"{parcel_id}_layout_bathroom_{i+1}",
+            "space_type": "Full Bathroom",
+            "flooring_material_type": None,
+            "size_square_feet": None,
+            "floor_level": None,
+            "has_windows": None,
+            "window_design_type": None,
+            "window_material_type": None,
+            "window_treatment_type": None,
+            "is_finished": True,
+            "furnished": None,
+            "paint_condition": None,
+            "flooring_wear": None,
+            "clutter_level": None,
+            "visible_damage": None,
+            "countertop_material": None,
+            "cabinet_style": None,
+            "fixture_finish_quality": None,
+            "design_style": None,
+            "natural_light_quality": None,
+            "decor_elements": None,
+            "pool_type": None,
+            "pool_equipment": None,
+            "spa_type": None,
+            "safety_features": None,
+            "view_type": None,
+            "lighting_features": None,
+            "condition_issues": None,
+            "is_exterior": False,
+            "pool_condition": None,
+            "pool_surface_type": None,
+            "pool_water_quality": None
+        }
+        entities[f"layout_{layout_idx}.json"] = layout
+        layout_idx += 1
+    for i in range(half_bath_count):
+        layout = {
+            "source_http_request": address.get("source_http_request", {}),
+            "request_identifier": f"{parcel_id}_layout_halfbath_{i+1}",
+            "space_type": "Half Bathroom / Powder Room",
+            "flooring_material_type": None,
+            "size_square_feet": None,
+            "floor_level": None,
+            "has_windows": None,
+            "window_design_type": None,
+            "window_material_type": None,
+            "window_treatment_type": None,
+            "is_finished": True,
+            "furnished": None,
+            "paint_condition": None,
+            "flooring_wear": None,
+            "clutter_level": None,
+            "visible_damage": None,
+            "countertop_material": None,
+            "cabinet_style": None,
+            "fixture_finish_quality": None,
+            "design_style": None,
+            "natural_light_quality": None,
+            "decor_elements": None,
+            "pool_type": None,
+            "pool_equipment": None,
+            "spa_type": None,
+            "safety_features": None,
+            "view_type": None,
+            "lighting_features": None,
+            "condition_issues": None,
+            "is_exterior": False,
+            "pool_condition": None,
+            "pool_surface_type": None,
+            "pool_water_quality": None
+        }
+        entities[f"layout_{layout_idx}.json"] = layout
+        layout_idx += 1
+    # --- LOT ---
+    lot_json = None
+    lot_schema_fields = [
+        "source_http_request", "request_identifier", "lot_type", "lot_length_feet", "lot_width_feet", "lot_area_sqft", "landscaping_features", "view", "fencing_type", "fence_height", "fence_length", "driveway_material", "driveway_condition", "lot_condition_issues"
+    ]
+    lot_json = {k: None for k in lot_schema_fields}
+    lot_json["source_http_request"] = address.get("source_http_request", {})
+    lot_json["request_identifier"] = parcel_id
+
+    if produces("lot"):
+        entities["lot.json"] = lot_json
+    return entities
+
+
+@lru_cache(maxsize=None)
+def default_address_schema():
+    return load_schema()
+
+# Every entity of one parcel, as data_extractor would write them: {file name:
+# record}, all-null records left out. html may be bytes or text; seed_row is
+# the parcel's seed.csv row and candidates its possible_addresses payload (or
+# None when there is none). Nothing touches the file system apart from the
+# address schema, read once from ./schemas when address_schema isn't passed.
+def extract_parcel(html_bytes, seed_row, candidates, address_schema=None):
+    html = html_bytes.decode('utf-8') if isinstance(html_bytes, bytes) else html_bytes
+    parcel_id = seed_row['parcel_id']
+    addr_key = f'property_{parcel_id}'
+    # Parsed once, lazily, and shared by every extractor below
+    facts = load_facts(html)
+    owners_schema = {}
+    structure_data = {}
+    utility_data = {}
+    if stage_needed('owner_processor'):
+        _, owners_by_date, _ = extract_owners_from_facts(facts, parcel_id)
+        owners_schema[parcel_id] = owners_schema_entry(owners_by_date)
+    if stage_needed('structure_extractor'):
+        structure_data[addr_key] = extract_structure_from_facts(facts, parcel_id)
+    if stage_needed('utility_extractor'):
+        utility_data[addr_key] = extract_utility_from_facts(facts, parcel_id)
+    address_map = {}
+    if candidates is not None:
+        entry = resolve_address(parcel_id, seed_row, candidates, address_schema or default_address_schema())
+        if entry is not None:
+            address_map[addr_key] = entry
+    entities = build_entities(parcel_id, facts, address_map, owners_schema, structure_data, utility_data)
+    return {name: record for name, record in entities.items() if not is_null_record(record)}
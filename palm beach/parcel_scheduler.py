@@ -0,0 +1,118 @@
+import os
+import sys
+import multiprocessing
+from prefetch_reader import prefetch, read_files
+
+# Opt-in: process parcels on this many worker processes. Page sizes vary by
+# orders of magnitude, so work is handed out largest first, in chunks that
+# shrink as the run nears its end: a big parcel never starts last, and no
+# worker waits long on another's chunk. Results still come back in input
+# order, so outputs are the same as with one process.
+PARCEL_WORKERS = int(os.environ.get('PARCEL_WORKERS') or 1)
+# Each chunk carries about 1/(CHUNK_SHARE * workers) of the work not yet handed out
+CHUNK_SHARE = 4
+MAX_CHUNK_PARCELS = 256
+# Fixed per-parcel cost, in bytes of input, so empty and missing files still count
+PARCEL_OVERHEAD_BYTES = 1024
+
+# What workers run, set before the pool forks so they inherit it as is
+_job = None
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+# Chunks of indexes into costs: costliest first, each chunk's cost a share of
+# what is left, so chunks are large early on and single parcels at the end
+def plan_chunks(costs, workers):
+    order = sorted(range(len(costs)), key=lambda i: -costs[i])
+    remaining = sum(costs)
+    chunks = []
+    chunk = []
+    chunk_cost = 0
+    for i in order:
+        chunk.append(i)
+        chunk_cost += costs[i]
+        if chunk_cost >= remaining / (CHUNK_SHARE * workers) or len(chunk) >= MAX_CHUNK_PARCELS:
+            chunks.append(chunk)
+            remaining -= chunk_cost
+            chunk = []
+            chunk_cost = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def _run_chunk(chunk):
+    work, context, paths_for, errors, slow_parcels, shared = _job
+    results = []
+    for index, item in chunk:
+        contents = read_files(paths_for(item), errors=errors)
+        entry = {}
+        with slow_parcels.measure(entry):
+            value = work(item, contents, context)
+        results.append((index, value, entry, [obj.take() for obj in shared]))
+    return results
+
+# Runs work(item, contents, context) for every (parcel_id, path) item, where
+# contents are the texts of paths_for(item), and yields (item, value) in input
+# order. Each call is timed into metrics and slow_parcels. On workers, shared
+# holds the objects work() updates besides its return value (metrics always
+# among them); each has take(), run in the worker after every parcel, and
+# merge(), run here when that parcel is yielded. cost(item) estimates a
+# parcel's work, by default the size of its files.
+def process_parcels(items, work, metrics, slow_parcels, context=None, paths_for=lambda item: (item[1],),
+                    cost=None, shared=(), errors='strict', workers=None):
+    workers = workers or PARCEL_WORKERS
+    if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+        print('Warning: parcel workers need fork(), processing parcels in this process')
+        workers = 1
+    if workers <= 1:
+        for item, contents in prefetch(items, paths_for, errors=errors):
+            with metrics.parcel(), slow_parcels.parcel(item[0], item[1]):
+                value = work(item, contents, context)
+            yield item, value
+        return
+    yield from _process_on_workers(items, work, metrics, slow_parcels, context, paths_for, cost, shared, errors, workers)
+
+def _process_on_workers(items, work, metrics, slow_parcels, context, paths_for, cost, shared, errors, workers):
+    global _job
+    # Ordering by cost needs the whole listing up front
+    items = list(items)
+    cost = cost or (lambda item: sum(file_size(path) for path in paths_for(item)))
+    chunks = plan_chunks([cost(item) + PARCEL_OVERHEAD_BYTES for item in items], workers)
+    shared = [metrics] + [obj for obj in shared if obj is not None]
+    _job = (work, context, paths_for, errors, slow_parcels, shared)
+    # Workers would print whatever is still buffered here a second time
+    sys.stdout.flush()
+    done = {}
+    next_index = 0
+    try:
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            tasks = ([(i, items[i]) for i in chunk] for chunk in chunks)
+            for results in pool.imap_unordered(_run_chunk, tasks):
+                for index, value, entry, taken in results:
+                    metrics.observe(entry['seconds'])
+                    if slow_parcels.enabled:
+                        slow_parcels.record(items[index][0], entry, items[index][1])
+                    done[index] = (value, taken)
+                while next_index in done:
+                    value, taken = done.pop(next_index)
+                    for obj, delta in zip(shared, taken):
+                        obj.merge(delta)
+                    yield items[next_index], value
+                    next_index += 1
+    finally:
+        _job = None
+
+# A list parcel workers append to; take() and merge() carry each parcel's
+# additions back to the stage's list
+class WorkerList(list):
+    def take(self):
+        taken = self[:]
+        del self[:]
+        return taken
+
+    def merge(self, taken):
+        self.extend(taken)
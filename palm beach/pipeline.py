@@ -0,0 +1,284 @@
+import os
+import ast
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+
+from input_discovery import iter_input_files, INPUT_MANIFEST
+from compressed_io import resolve_path, replace_atomically
+from equivalence_check import CONFIG_VAR_RE
+
+# stage: (stages whose outputs it reads, corpus entries it reads, what it writes).
+# The five preprocessors only read the corpus, so they run side by side;
+# data_extractor starts once the four whose outputs it reads are done
+# (it builds layouts from the page itself, not from layout_data.json).
+STAGES = {
+    'owner_processor': ([], ['input'], ['owners/owners_extracted.json', 'owners/owners_schema.json']),
+    'layout_extractor': ([], ['input'], ['owners/layout_data.json']),
+    'structure_extractor': ([], ['input'], ['owners/structure_data.json']),
+    'utility_extractor': ([], ['input'], ['owners/utility_data.json']),
+    'address_extraction': ([], ['input', 'possible_addresses', 'possible_addresses.sqlite', 'seed.csv', 'schemas'],
+                           ['owners/addresses_mapping.json']),
+    'data_extractor': (['owner_processor', 'structure_extractor', 'utility_extractor', 'address_extraction'],
+                       ['input', 'schemas'], ['data', 'shared_entities']),
+}
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = './logs/pipeline_state.json'
+LOG_DIR = './logs/pipeline/'
+# Settings that only change how a run is observed or paced, never what it
+# writes, so changing them doesn't make a stage's output stale
+RUNTIME_ONLY_VARS = {'METRICS_DIR', 'METRICS_PORT', 'METRICS_INTERVAL', 'PREFETCH_AHEAD', 'PREFETCH_MAX_MB',
+                     'PREFETCH_WORKERS', 'PARCEL_WORKERS', 'SLOW_PARCEL_SECONDS', 'SLOW_PARCEL_MEMORY_MB', 'QUARANTINE_DIR',
+                     'PARCEL_LOCK_DIR'}
+POLL_SECONDS = 0.05
+
+# The stage script and every script it imports, directly or not
+def code_closure(stage, scripts_dir=SCRIPTS_DIR):
+    found = set()
+    todo = [stage]
+    while todo:
+        name = todo.pop()
+        path = os.path.join(scripts_dir, f'{name}.py')
+        if name in found or not os.path.exists(path):
+            continue
+        found.add(name)
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                todo.extend(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                todo.append(node.module.split('.')[0])
+    return sorted(os.path.join(scripts_dir, f'{name}.py') for name in found)
+
+def _stat_entry(path):
+    st = os.stat(path)
+    return f'{st.st_size}:{st.st_mtime_ns}'
+
+# (relative path, size:mtime) of every file under root; hidden=False leaves
+# out dot-named entries (parcel locks, staging siblings), which aren't output
+def _tree_listing(root, hidden=True):
+    listing = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if not hidden:
+            dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+            filenames = [name for name in filenames if not name.startswith('.')]
+        listing.extend((os.path.relpath(os.path.join(dirpath, name), root), _stat_entry(os.path.join(dirpath, name)))
+                       for name in filenames)
+    return sorted(listing)
+
+def _listing_digest(listing, digest=None):
+    digest = digest or hashlib.sha256()
+    for name, stat in listing:
+        digest.update(f'{name}\x00{stat}\n'.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+# Cheap fingerprint of a corpus entry: names, sizes and mtimes, not contents.
+# input/ is listed the way the stages list it, so INPUT_MANIFEST is honored.
+def corpus_fingerprint(entry):
+    digest = hashlib.sha256()
+    if entry == 'input':
+        if INPUT_MANIFEST:
+            digest.update(_stat_entry(INPUT_MANIFEST).encode())
+        listing = sorted((parcel_id, _stat_entry(path)) for parcel_id, path in iter_input_files('./input/'))
+    elif os.path.isdir(entry):
+        listing = _tree_listing(entry)
+    elif os.path.exists(entry):
+        listing = [('', _stat_entry(entry))]
+    else:
+        return None
+    return _listing_digest(listing, digest)
+
+# What a stage left behind: size, mtime and content digest of an output file
+# (stored under whatever compression the run used), the names, sizes and
+# mtimes of every file in an output directory, None when missing
+def output_state(path):
+    stored = resolve_path(path)
+    if os.path.isdir(stored):
+        return {'path': stored, 'fingerprint': _listing_digest(_tree_listing(stored, hidden=False))}
+    if not os.path.exists(stored):
+        return None
+    digest = hashlib.sha256()
+    with open(stored, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    st = os.stat(stored)
+    return {'path': stored, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'digest': digest.hexdigest()}
+
+# Whether outputs are still exactly what the recorded run wrote, by stat alone
+def outputs_intact(recorded):
+    for path, entry in recorded.items():
+        stored = resolve_path(path)
+        if entry is None:
+            if os.path.exists(stored):
+                return False
+        elif stored != entry['path'] or not os.path.exists(stored):
+            return False
+        elif 'digest' in entry:
+            st = os.stat(stored)
+            if (st.st_size, st.st_mtime_ns) != (entry['size'], entry['mtime_ns']):
+                return False
+        # A directory recorded before fingerprints were kept can't be vouched for
+        elif entry.get('fingerprint') != output_state(path).get('fingerprint'):
+            return False
+    return True
+
+class Pipeline:
+    def __init__(self, stages, jobs, force=False, scripts_dir=SCRIPTS_DIR):
+        self.stages = stages
+        self.jobs = jobs
+        self.force = force
+        self.scripts_dir = scripts_dir
+        self.state = {}
+        if os.path.exists(STATE_FILE):
+            with open(STATE_FILE, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        self.fingerprints = {}
+
+    # Everything a stage's output depends on: its code, the settings that code
+    # reads (EXTRACTION_PROFILE among them, since profile runs write trimmed
+    # intermediates), the corpus entries it reads and its upstream outputs
+    def stage_key(self, stage):
+        after, reads, _ = STAGES[stage]
+        digest = hashlib.sha256(f'{stage}\x00{sys.version}\n'.encode())
+        config = set()
+        for path in code_closure(stage, self.scripts_dir):
+            with open(path, 'rb') as f:
+                source = f.read()
+            digest.update(f'{os.path.basename(path)}\x00'.encode())
+            digest.update(hashlib.sha256(source).digest())
+            config.update(CONFIG_VAR_RE.findall(source.decode('utf-8')))
+        env = {name: os.environ.get(name) for name in sorted(config - RUNTIME_ONLY_VARS)}
+        digest.update(json.dumps(env, sort_keys=True).encode())
+        for entry in reads:
+            if entry not in self.fingerprints:
+                self.fingerprints[entry] = corpus_fingerprint(entry)
+            digest.update(f'{entry}\x00{self.fingerprints[entry]}\n'.encode())
+        for upstream in after:
+            for path in STAGES[upstream][2]:
+                entry = output_state(path)
+                digest.update(f"{path}\x00{entry and entry.get('digest')}\n".encode())
+        return digest.hexdigest()
+
+    def up_to_date(self, stage, key):
+        recorded = self.state.get(stage)
+        return (not self.force and recorded is not None and recorded['key'] == key and
+                outputs_intact(recorded['outputs']))
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+        replace_atomically(STATE_FILE, json.dumps(self.state, indent=2, sort_keys=True).encode('utf-8'))
+
+    def launch(self, stage):
+        os.makedirs(LOG_DIR, exist_ok=True)
+        # Only owner_processor creates owners/, and it may not be the first to write there
+        os.makedirs('owners', exist_ok=True)
+        env = dict(os.environ)
+        # Stages running side by side can't all serve metrics on one port
+        if env.get('METRICS_PORT'):
+            env['METRICS_PORT'] = str(int(env['METRICS_PORT']) + list(STAGES).index(stage))
+        log = open(os.path.join(LOG_DIR, f'{stage}.log'), 'w')
+        try:
+            proc = subprocess.Popen([sys.executable, os.path.join(self.scripts_dir, f'{stage}.py')],
+                                    stdout=log, stderr=subprocess.STDOUT, env=env)
+        finally:
+            log.close()
+        print(f'{stage}: started')
+        return proc
+
+    # Runs every stage once all the stages it reads from are done, at most
+    # jobs at a time. Returns {stage: (status, seconds)}.
+    def run(self):
+        results = {}
+        pending = [s for s in STAGES if s in self.stages]
+        running = {}
+        while pending or running:
+            for stage in list(pending):
+                # Upstream stages not selected for this run count as done
+                after = [s for s in STAGES[stage][0] if s in self.stages]
+                if any(results.get(s, ('',))[0] in ('failed', 'blocked') for s in after):
+                    pending.remove(stage)
+                    results[stage] = ('blocked', 0.0)
+                    print(f'{stage}: not run, an upstream stage failed')
+                    continue
+                if len(running) >= self.jobs or any(s not in results for s in after):
+                    continue
+                pending.remove(stage)
+                key = self.stage_key(stage)
+                if self.up_to_date(stage, key):
+                    results[stage] = ('skipped', 0.0)
+                    print(f'{stage}: unchanged since {self.state[stage]["finished"]}, skipped')
+                    continue
+                running[stage] = (self.launch(stage), key, time.perf_counter())
+            for stage, (proc, key, start) in list(running.items()):
+                if proc.poll() is None:
+                    continue
+                del running[stage]
+                seconds = round(time.perf_counter() - start, 3)
+                if proc.returncode == 0:
+                    results[stage] = ('ran', seconds)
+                    self.state[stage] = {'key': key, 'seconds': seconds,
+                                         'finished': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                                         'outputs': {path: output_state(path) for path in STAGES[stage][2]}}
+                    print(f'{stage}: done in {seconds}s')
+                else:
+                    results[stage] = ('failed', seconds)
+                    # Whatever it wrote before failing is never taken as current
+                    self.state.pop(stage, None)
+                    print(f'{stage}: failed with exit {proc.returncode}, see {os.path.join(LOG_DIR, stage + ".log")}')
+                self.save_state()
+            if running:
+                time.sleep(POLL_SECONDS)
+        return results
+
+    # What run() would do, without running anything: a stage runs if its key
+    # changed or anything upstream of it runs
+    def plan(self):
+        plan = {}
+        for stage in STAGES:
+            if stage not in self.stages:
+                continue
+            if any(plan.get(s) == 'run' for s in STAGES[stage][0]):
+                plan[stage] = 'run'
+            else:
+                plan[stage] = 'skip' if self.up_to_date(stage, self.stage_key(stage)) else 'run'
+        return plan
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the extraction stages in dependency order, independent '
+                                                 'stages side by side, skipping stages whose code, settings '
+                                                 'and inputs are unchanged since they last ran')
+    parser.add_argument('--stages', default=','.join(STAGES), help='comma-separated subset of the stages to run')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='stages run at the same time')
+    parser.add_argument('--force', action='store_true', help='run every selected stage even if it is up to date')
+    parser.add_argument('--dry-run', action='store_true', help='print which stages would run or be skipped')
+    args = parser.parse_args()
+
+    stages = args.stages.split(',')
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise SystemExit(f'unknown stages: {", ".join(unknown)}; expected some of {", ".join(STAGES)}')
+    pipeline = Pipeline(stages, max(1, args.jobs), args.force)
+    if args.dry_run:
+        for stage, action in pipeline.plan().items():
+            print(f'{stage:<20} {action}')
+        return
+
+    start = time.perf_counter()
+    results = pipeline.run()
+    wall = time.perf_counter() - start
+    print(f"{'stage':<20} {'status':>8} {'seconds':>8}")
+    for stage in STAGES:
+        if stage not in results:
+            continue
+        status, seconds = results[stage]
+        print(f'{stage:<20} {status:>8} {seconds:>8}')
+    print(f"wall {wall:.3f}s for {sum(seconds for _, seconds in results.values()):.3f}s of stage time")
+    if any(status in ('failed', 'blocked') for status, _ in results.values()):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
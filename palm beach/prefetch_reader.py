@@ -0,0 +1,54 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# How far the background readers may run ahead of the parser
+PREFETCH_AHEAD = int(os.environ.get('PREFETCH_AHEAD') or 8)
+PREFETCH_MAX_BYTES = int(float(os.environ.get('PREFETCH_MAX_MB') or 64) * 1024 * 1024)
+PREFETCH_WORKERS = int(os.environ.get('PREFETCH_WORKERS') or 4)
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def read_files(paths, encoding='utf-8', errors='strict'):
+    contents = []
+    for path in paths:
+        if not os.path.exists(path):
+            contents.append(None)
+            continue
+        with open(path, 'r', encoding=encoding, errors=errors) as f:
+            contents.append(f.read())
+    return contents
+
+# Yields (item, [text or None per path]) in input order while the next items'
+# files are read on background threads. At most `ahead` items and roughly
+# `max_bytes` of file content are in flight; one item is always allowed so a
+# single oversized file can't stall the reader.
+def prefetch(items, paths_for=lambda item: (item,), ahead=None, max_bytes=None,
+             workers=None, encoding='utf-8', errors='strict'):
+    ahead = ahead or PREFETCH_AHEAD
+    max_bytes = max_bytes or PREFETCH_MAX_BYTES
+    items = iter(items)
+    pending = deque()
+    pending_bytes = 0
+    exhausted = False
+    with ThreadPoolExecutor(max_workers=workers or PREFETCH_WORKERS) as pool:
+        while True:
+            while not exhausted and len(pending) < ahead and (not pending or pending_bytes < max_bytes):
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                paths = paths_for(item)
+                size = sum(_size(p) for p in paths)
+                pending.append((item, size, pool.submit(read_files, paths, encoding, errors)))
+                pending_bytes += size
+            if not pending:
+                return
+            item, size, future = pending.popleft()
+            pending_bytes -= size
+            yield item, future.result()
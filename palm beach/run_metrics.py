@@ -0,0 +1,192 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from input_discovery import iter_input_files
+
+# Opt-in: rewrite <METRICS_DIR>/<stage>.prom every METRICS_INTERVAL seconds
+# (Prometheus text format, as read by node_exporter's textfile collector)
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+# Opt-in: serve the same text at http://127.0.0.1:<METRICS_PORT>/metrics
+METRICS_PORT = int(os.environ.get('METRICS_PORT') or 0)
+METRICS_INTERVAL = float(os.environ.get('METRICS_INTERVAL') or 10)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Progress, throughput, latency and output counters for one stage run. Counting
+# is always on and cheap; nothing is published unless METRICS_DIR or
+# METRICS_PORT is set and start() has been called.
+class RunMetrics:
+    def __init__(self, stage):
+        self.stage = stage
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.last_progress = self.started
+        self.total = None
+        self.processed = 0
+        self.files_written = 0
+        self.bytes_written = 0
+        self.errors = {}
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.done = False
+        self._stop = threading.Event()
+        self._threads = []
+        self._server = None
+        # A parcel worker forked while a publishing thread holds the lock would never get it
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(before=self.lock.acquire, after_in_parent=self.lock.release,
+                                after_in_child=self.lock.release)
+
+    # keep(parcel_id), when given, limits the total to the parcels the stage processes
+    def start(self, input_dir=None, keep=None):
+        if not (METRICS_DIR or METRICS_PORT):
+            return self
+        if input_dir:
+            # Counting the inputs is a second directory walk, so it runs beside the stage
+            self._spawn(self._count_inputs, input_dir, keep)
+        if METRICS_DIR:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            self._spawn(self._write_periodically)
+        if METRICS_PORT:
+            self._server = ThreadingHTTPServer(('127.0.0.1', METRICS_PORT), _handler_for(self))
+            self._spawn(self._server.serve_forever)
+        return self
+
+    def _spawn(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _count_inputs(self, input_dir, keep):
+        count = 0
+        for parcel_id, _ in iter_input_files(input_dir):
+            if keep is None or keep(parcel_id):
+                count += 1
+        self.total = count
+
+    def _write_periodically(self):
+        while not self._stop.wait(METRICS_INTERVAL):
+            self.write_file()
+
+    # Times one parcel; the stage's own error handling stays inside the block
+    @contextmanager
+    def parcel(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    # seconds is per parcel; stages that work in chunks report the chunk's average
+    def observe(self, seconds, parcels=1):
+        with self.lock:
+            self.processed += parcels
+            self.latency_sum += seconds * parcels
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.bucket_counts[i] += parcels
+                    break
+            self.last_progress = time.time()
+
+    def wrote(self, nbytes, files=1):
+        with self.lock:
+            self.files_written += files
+            self.bytes_written += nbytes
+
+    def error(self, kind):
+        with self.lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    # Output and error counts since the last take(), for a parcel worker to
+    # send back; the stage observes the parcel's time itself
+    def take(self):
+        with self.lock:
+            counts = (self.files_written, self.bytes_written, self.errors)
+            self.files_written = 0
+            self.bytes_written = 0
+            self.errors = {}
+        return counts
+
+    def merge(self, counts):
+        files, nbytes, errors = counts
+        with self.lock:
+            self.files_written += files
+            self.bytes_written += nbytes
+            for kind, count in errors.items():
+                self.errors[kind] = self.errors.get(kind, 0) + count
+
+    def render(self):
+        with self.lock:
+            now = time.time()
+            elapsed = max(now - self.started, 1e-9)
+            rate = self.processed / elapsed
+            label = f'stage="{self.stage}"'
+            lines = []
+
+            def metric(name, kind, help_text, samples):
+                lines.append(f'# HELP extraction_{name} {help_text}')
+                lines.append(f'# TYPE extraction_{name} {kind}')
+                for suffix, labels, value in samples:
+                    lines.append(f'extraction_{name}{suffix}{{{labels}}} {value}')
+
+            metric('parcels_processed_total', 'counter', 'Parcels finished by the stage', [('', label, self.processed)])
+            if self.total is not None:
+                metric('parcels_total', 'gauge', 'Input parcels the stage processes', [('', label, self.total)])
+                if rate > 0:
+                    eta = max(self.total - self.processed, 0) / rate
+                    metric('eta_seconds', 'gauge', 'Estimated seconds until the stage finishes', [('', label, round(eta, 1))])
+            metric('parcels_per_second', 'gauge', 'Average throughput since the stage started', [('', label, round(rate, 3))])
+            metric('elapsed_seconds', 'gauge', 'Seconds since the stage started', [('', label, round(elapsed, 1))])
+            metric('last_progress_timestamp_seconds', 'gauge', 'Unix time the last parcel finished',
+                   [('', label, round(self.last_progress, 3))])
+            cumulative = 0
+            buckets = []
+            for bound, count in zip(LATENCY_BUCKETS, self.bucket_counts):
+                cumulative += count
+                buckets.append(('_bucket', f'{label},le="{bound}"', cumulative))
+            buckets.append(('_bucket', f'{label},le="+Inf"', self.processed))
+            buckets.append(('_sum', label, round(self.latency_sum, 6)))
+            buckets.append(('_count', label, self.processed))
+            metric('parcel_latency_seconds', 'histogram', 'Per-parcel processing time', buckets)
+            metric('files_written_total', 'counter', 'Output files written', [('', label, self.files_written)])
+            metric('bytes_written_total', 'counter', 'Output bytes written', [('', label, self.bytes_written)])
+            metric('errors_total', 'counter', 'Parcels that failed or were skipped, by reason',
+                   [('', f'{label},kind="{kind}"', count) for kind, count in sorted(self.errors.items())])
+            metric('done', 'gauge', '1 once the stage has finished', [('', label, int(self.done))])
+            return '\n'.join(lines) + '\n'
+
+    def write_file(self):
+        if not METRICS_DIR:
+            return
+        path = os.path.join(METRICS_DIR, f'{self.stage}.prom')
+        # The collector may read at any moment, so never expose a half-written file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def close(self):
+        self.done = True
+        self._stop.set()
+        self.write_file()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+def _handler_for(metrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+    return MetricsHandler
@@ -0,0 +1,153 @@
+import os
+import re
+import json
+from compressed_io import replace_atomically
+
+SCHEMAS_DIR = './schemas/'
+REPORT_FILE = './logs/validation_report.json'
+
+# Compiled validators keyed by schema name; a schema is loaded and compiled at
+# most once per process, missing schemas are cached as None.
+_validators = {}
+
+# sales_1 -> sales, tax_2024 -> tax, person_1_2 -> person, relationship_sales_person_1_2 -> relationship_sales_person
+_SUFFIX_RE = re.compile(r'(?:_\d+)+$')
+
+_JSON_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+    'null': type(None),
+}
+
+def schema_name_for(filename):
+    return _SUFFIX_RE.sub('', os.path.splitext(os.path.basename(filename))[0])
+
+# Helper: basic required/type check used when no JSON-schema library is installed
+def _basic_validator(schema):
+    required = schema.get('required', [])
+    properties = schema.get('properties', {})
+    field_types = {}
+    for field, spec in properties.items():
+        types = spec.get('type')
+        if types is None:
+            continue
+        if isinstance(types, str):
+            types = [types]
+        field_types[field] = [_JSON_TYPES[t] for t in types if t in _JSON_TYPES]
+
+    def check(data):
+        for field in required:
+            if field not in data:
+                return f'Missing field: {field}'
+        for field, value in data.items():
+            allowed = field_types.get(field)
+            if not allowed:
+                continue
+            # bool is an int subclass; only accept it where boolean is allowed
+            if isinstance(value, bool) and bool not in allowed:
+                return f'Field {field} has invalid type bool'
+            if not isinstance(value, tuple(allowed)):
+                if value is None:
+                    return f'Field {field} is null but not allowed.'
+                return f'Field {field} has invalid type {type(value).__name__}'
+        return None
+    return check
+
+def _compile(schema):
+    try:
+        import fastjsonschema
+    except ImportError:
+        fastjsonschema = None
+    if fastjsonschema is not None:
+        validate = fastjsonschema.compile(schema)
+
+        def check(data):
+            try:
+                validate(data)
+            except fastjsonschema.JsonSchemaException as e:
+                return e.message
+            return None
+        return check
+    try:
+        import jsonschema
+    except ImportError:
+        jsonschema = None
+    if jsonschema is not None:
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        validator = cls(schema)
+
+        def check(data):
+            error = jsonschema.exceptions.best_match(validator.iter_errors(data))
+            return error.message if error else None
+        return check
+    return _basic_validator(schema)
+
+def get_validator(name):
+    if name not in _validators:
+        path = os.path.join(SCHEMAS_DIR, f'{name}.json')
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                _validators[name] = _compile(json.load(f))
+        else:
+            _validators[name] = None
+    return _validators[name]
+
+# Returns an error message, or None when the record is valid or has no schema
+def validate_record(filename, data):
+    check = get_validator(schema_name_for(filename))
+    if check is None:
+        return None
+    return check(data)
+
+class ValidationReport:
+    def __init__(self):
+        self.failures = {}
+        self.checked = 0
+        # Records of each schema name no schema file exists for; never counted as checked
+        self.without_schema = {}
+
+    # schema_file names the schema when filename alone doesn't, e.g. a
+    # content-addressed person_<digest>.json
+    def check(self, parcel_id, filename, data, schema_file=None):
+        name = schema_name_for(schema_file or filename)
+        validator = get_validator(name)
+        if validator is None:
+            self.without_schema[name] = self.without_schema.get(name, 0) + 1
+            return True
+        self.checked += 1
+        msg = validator(data)
+        if msg:
+            self.failures.setdefault(parcel_id, []).append({'file': filename, 'error': msg})
+            print(f'Validation failed for {parcel_id}/{filename}: {msg}')
+        return msg is None
+
+    # What was checked since the last take(), for a parcel worker to send back
+    def take(self):
+        taken = (self.checked, self.failures, self.without_schema)
+        self.checked = 0
+        self.failures = {}
+        self.without_schema = {}
+        return taken
+
+    def merge(self, taken):
+        checked, failures, without_schema = taken
+        self.checked += checked
+        for parcel_id, errors in failures.items():
+            self.failures.setdefault(parcel_id, []).extend(errors)
+        for name, count in without_schema.items():
+            self.without_schema[name] = self.without_schema.get(name, 0) + count
+
+    def write(self, path=REPORT_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        report = {
+            'records_checked': self.checked,
+            'records_without_schema': dict(sorted(self.without_schema.items())),
+            'parcels_with_failures': len(self.failures),
+            'failures': self.failures,
+        }
+        replace_atomically(path, json.dumps(report, indent=2).encode('utf-8'))
@@ -0,0 +1,217 @@
+import os
+import csv
+import json
+import time
+import shutil
+from contextlib import contextmanager, nullcontext
+from parcel_budget import current_rss_mb
+from compressed_io import replace_atomically
+from candidate_store import CandidateStore, CANDIDATE_STORE
+from input_discovery import fanout_path, INPUT_FANOUT
+from output_writer import ParcelLock
+
+# Opt-in: time every parcel in every stage and capture the inputs of any parcel
+# slower than SLOW_PARCEL_SECONDS or growing RSS by more than SLOW_PARCEL_MEMORY_MB.
+# Each capture is a one-parcel corpus (input/, possible_addresses/, seed.csv,
+# schemas/) under QUARANTINE_DIR/<parcel_id>/, so the stages can be rerun on it
+# as is, plus breakdown.json saying where the parcel's time went in each stage.
+SLOW_PARCEL_SECONDS = float(os.environ.get('SLOW_PARCEL_SECONDS') or 0)
+SLOW_PARCEL_MEMORY_MB = float(os.environ.get('SLOW_PARCEL_MEMORY_MB') or 0)
+QUARANTINE_DIR = os.environ.get('QUARANTINE_DIR') or './quarantine/'
+# One JSON line per parcel per stage, rewritten by every run of the stage
+TIMINGS_DIR = './logs/parcel_timings/'
+BREAKDOWN_FILE = 'breakdown.json'
+INPUT_DIR = './input/'
+POSSIBLE_ADDRESSES_DIR = './possible_addresses/'
+POSSIBLE_ADDRESSES_STORE = './possible_addresses.sqlite'
+SEED_CSV = './seed.csv'
+SCHEMAS_DIR = './schemas/'
+
+class SlowParcelCapture:
+    def __init__(self, stage):
+        self.stage = stage
+        self.enabled = bool(SLOW_PARCEL_SECONDS or SLOW_PARCEL_MEMORY_MB)
+        self.timings = None
+        # Parcels captured by this run, and this stage's timing of every parcel
+        # that is already in quarantine, which is all close() needs to keep
+        self.slow = {}
+        self.quarantined = set()
+        self.kept = {}
+        self.html_paths = {}
+        self.phases = None
+
+    def start(self):
+        if not self.enabled:
+            return self
+        os.makedirs(TIMINGS_DIR, exist_ok=True)
+        self.timings = open(os.path.join(TIMINGS_DIR, f'{self.stage}.jsonl'), 'w', encoding='utf-8')
+        if os.path.isdir(QUARANTINE_DIR):
+            self.quarantined = {name for name in os.listdir(QUARANTINE_DIR) if not name.startswith('.')}
+        return self
+
+    # Times one parcel, including one abandoned by its budget, which is exactly
+    # the kind of parcel worth keeping
+    @contextmanager
+    def parcel(self, parcel_id, html_path=None):
+        if not self.enabled:
+            yield
+            return
+        entry = {}
+        try:
+            with self.measure(entry):
+                yield
+        finally:
+            self.record(parcel_id, entry, html_path)
+
+    # Fills entry with the block's time, RSS growth and phases, without
+    # recording it; parcel workers measure and the stage records
+    @contextmanager
+    def measure(self, entry):
+        self.phases = {}
+        start_rss = current_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry['seconds'] = round(time.perf_counter() - start, 6)
+            entry['rss_growth_mb'] = round(current_rss_mb() - start_rss, 1)
+            if self.phases:
+                entry['phases'] = {name: round(seconds, 6) for name, seconds in self.phases.items()}
+            self.phases = None
+
+    # Splits the current parcel's time into named parts in its breakdown
+    def phase(self, name):
+        if self.phases is None:
+            return nullcontext()
+        return self._phase(name)
+
+    @contextmanager
+    def _phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def record(self, parcel_id, entry, html_path=None):
+        self.timings.write(json.dumps(dict(parcel_id=parcel_id, **entry)) + '\n')
+        reasons = []
+        if SLOW_PARCEL_SECONDS and entry['seconds'] > SLOW_PARCEL_SECONDS:
+            reasons.append(f"took {entry['seconds']:.3f}s, threshold {SLOW_PARCEL_SECONDS}s")
+        if SLOW_PARCEL_MEMORY_MB and entry['rss_growth_mb'] > SLOW_PARCEL_MEMORY_MB:
+            reasons.append(f"RSS grew {entry['rss_growth_mb']}MB, threshold {SLOW_PARCEL_MEMORY_MB}MB")
+        if reasons:
+            self.slow[parcel_id] = dict(entry, reason='; '.join(reasons))
+            if html_path:
+                self.html_paths[parcel_id] = html_path
+        elif parcel_id in self.quarantined:
+            self.kept[parcel_id] = entry
+
+    # Copies the inputs of this run's slow parcels and adds this stage's timing
+    # to every breakdown in quarantine. Stages call it after writing their
+    # output, so a capture problem never costs them the output.
+    def close(self):
+        if not self.enabled:
+            return
+        self.timings.close()
+        if not (self.slow or self.kept):
+            return
+        new = [parcel_id for parcel_id in self.slow if parcel_id not in self.quarantined]
+        earlier = self._other_stage_timings(new)
+        seed = self._seed_rows(new)
+        store = CandidateStore(POSSIBLE_ADDRESSES_STORE) if new and CANDIDATE_STORE and os.path.exists(POSSIBLE_ADDRESSES_STORE) else None
+        for parcel_id in sorted(set(self.slow) | set(self.kept)):
+            case_dir = os.path.join(QUARANTINE_DIR, parcel_id)
+            # Stages running side by side may update the same breakdown
+            lock = ParcelLock(case_dir, lock_dir=os.path.join(QUARANTINE_DIR, '.locks'))
+            try:
+                if not os.path.isdir(case_dir):
+                    self._copy_inputs(parcel_id, case_dir, seed.get(parcel_id), store)
+                self._update_breakdown(parcel_id, case_dir, earlier.get(parcel_id, {}))
+            finally:
+                lock.release()
+        if store is not None:
+            store.close()
+        if new:
+            print(f'{self.stage}: captured {len(new)} slow parcels under {QUARANTINE_DIR}')
+
+    # Earlier stages' timings of newly captured parcels, from their timing logs.
+    # Stages running side by side may still be writing theirs, so a partly
+    # written last line is skipped.
+    def _other_stage_timings(self, parcel_ids):
+        wanted = set(parcel_ids)
+        found = {}
+        if not wanted or not os.path.isdir(TIMINGS_DIR):
+            return found
+        for name in sorted(os.listdir(TIMINGS_DIR)):
+            stage = name[:-len('.jsonl')]
+            if not name.endswith('.jsonl') or stage == self.stage:
+                continue
+            with open(os.path.join(TIMINGS_DIR, name), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry['parcel_id'] in wanted:
+                        found.setdefault(entry.pop('parcel_id'), {})[stage] = entry
+        return found
+
+    def _seed_rows(self, parcel_ids):
+        wanted = set(parcel_ids)
+        rows = {}
+        if not wanted or not os.path.exists(SEED_CSV):
+            return rows
+        with open(SEED_CSV, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                if row['parcel_id'] in wanted:
+                    rows[row['parcel_id']] = row
+        return rows
+
+    def _copy_inputs(self, parcel_id, case_dir, seed_row, store):
+        # Hidden until complete, so a crash never leaves a half-copied case behind
+        staging = os.path.join(QUARANTINE_DIR, f'.{parcel_id}.{os.getpid()}.tmp')
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(os.path.join(staging, 'input'))
+        html_path = self.html_paths.get(parcel_id) or fanout_path(INPUT_DIR, parcel_id, f'{parcel_id}.html', INPUT_FANOUT)
+        if os.path.exists(html_path):
+            shutil.copy2(html_path, os.path.join(staging, 'input', f'{parcel_id}.html'))
+        if seed_row is not None:
+            with open(os.path.join(staging, 'seed.csv'), 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(seed_row))
+                writer.writeheader()
+                writer.writerow(seed_row)
+        os.makedirs(os.path.join(staging, 'possible_addresses'))
+        pa_path = os.path.join(POSSIBLE_ADDRESSES_DIR, f'{parcel_id}.json')
+        if store is not None:
+            candidates = store.get(parcel_id)
+            if candidates is not None:
+                with open(os.path.join(staging, 'possible_addresses', f'{parcel_id}.json'), 'w') as f:
+                    json.dump(candidates, f, indent=2)
+        elif os.path.exists(pa_path):
+            shutil.copy2(pa_path, os.path.join(staging, 'possible_addresses', f'{parcel_id}.json'))
+        if os.path.isdir(SCHEMAS_DIR):
+            shutil.copytree(SCHEMAS_DIR, os.path.join(staging, 'schemas'))
+        os.rename(staging, case_dir)
+
+    def _update_breakdown(self, parcel_id, case_dir, earlier):
+        path = os.path.join(case_dir, BREAKDOWN_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                breakdown = json.load(f)
+        else:
+            breakdown = {'parcel_id': parcel_id, 'captured': [], 'stages': {}}
+        for stage, entry in earlier.items():
+            breakdown['stages'].setdefault(stage, entry)
+        if parcel_id in self.slow:
+            entry = dict(self.slow[parcel_id])
+            breakdown['captured'] = [c for c in breakdown['captured'] if c['stage'] != self.stage]
+            breakdown['captured'].append({'stage': self.stage, 'reason': entry.pop('reason'),
+                                          'at': time.strftime('%Y-%m-%dT%H:%M:%S')})
+        else:
+            entry = self.kept[parcel_id]
+        breakdown['stages'][self.stage] = entry
+        stages = breakdown['stages']
+        breakdown['total_seconds'] = round(sum(e['seconds'] for e in stages.values()), 6)
+        breakdown['slowest_stage'] = max(stages, key=lambda s: stages[s]['seconds'])
+        replace_atomically(path, json.dumps(breakdown, indent=2).encode('utf-8'))
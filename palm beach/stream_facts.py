@@ -0,0 +1,242 @@
+import re
+from html.parser import HTMLParser
+from bs4.builder import HTMLParserTreeBuilder
+from bs4.dammit import EntitySubstitution, UnicodeDammit
+
+# Builds the same facts record as page_facts.facts_from_soup straight from
+# tokenizer callbacks. Only the open-element stack and the strings of open
+# cells, labelled ids, spans and h2s are held; no tree is built. The rules
+# below are the html.parser tree builder's (which tags close which, void
+# elements, whitespace-only strings, string classes), so the two backends
+# agree on every page.
+
+ID_PREFIX = 'MainContent_lbl'
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+# Taken from the builder the soup backend uses, so the two can't drift apart
+_BUILDER = HTMLParserTreeBuilder()
+VOID_ELEMENTS = frozenset(_BUILDER.empty_element_tags)
+PRESERVE_WHITESPACE_TAGS = frozenset(_BUILDER.preserve_whitespace_tags)
+# Tags whose text is its own string class (script, style, template, rt, rp)
+STRING_CONTAINER_TAGS = frozenset(_BUILDER.string_containers)
+# What .strings / .text count for an ordinary element
+PLAIN_STRINGS = frozenset(['text', 'cdata'])
+_DECIMAL_REF_RE = re.compile('^([0-9]+)(.*)')
+_HEX_REF_RE = re.compile('^([0-9a-f]+)(.*)')
+_NOT_SPACE_RE = re.compile(r'\S+')
+
+class _Open:
+    __slots__ = ('name', 'children', 'only', 'collect', 'interesting', 'cell', 'row', 'container',
+                 'heading', 'element_id', 'span_slots')
+
+    def __init__(self, name):
+        self.name = name
+        self.children = 0
+        self.only = None
+        self.collect = None
+        self.interesting = frozenset([name]) if name in STRING_CONTAINER_TAGS else PLAIN_STRINGS
+        self.cell = self.row = self.container = self.heading = self.element_id = self.span_slots = None
+
+class StreamingFactsParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.facts = {'version': None, 'ids': {}, 'texts': [], 'cells': [], 'rows': [], 'containers': [], 'headings': []}
+        self.stack = [_Open('[document]')]
+        self.open_counts = {}
+        self.seq = 0
+        self.data = []
+        self.preserve_depth = 0
+        self.containers_open = []
+        self.rows_open = []
+        self.cells_open = []
+        self.collecting = []
+        self.already_closed_void = []
+
+    # --- tree-builder rules ---
+
+    def flush(self, kind=None):
+        if not self.data:
+            return
+        text = ''.join(self.data)
+        self.data = []
+        if not self.preserve_depth and all(c in ASCII_SPACES for c in text):
+            text = '\n' if '\n' in text else ' '
+        if kind is None:
+            kind = self.containers_open[-1] if self.containers_open else 'text'
+        parent = self.stack[-1]
+        parent.children += 1
+        parent.only = text
+        if text.strip():
+            self.facts['texts'].append([text, self.rows_open[-1] if self.rows_open else -1])
+        for frame in self.collecting:
+            if kind in frame.interesting:
+                frame.collect.append(text)
+
+    def push(self, name, attrs):
+        self.flush()
+        facts = self.facts
+        self.seq += 1
+        frame = _Open(name)
+        parent = self.stack[-1]
+        parent.children += 1
+        parent.only = frame
+        self.stack.append(frame)
+        self.open_counts[name] = self.open_counts.get(name, 0) + 1
+        if name in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth += 1
+        if name in STRING_CONTAINER_TAGS:
+            self.containers_open.append(name)
+        element_id = attrs.get('id')
+        if element_id and element_id.startswith(ID_PREFIX) and element_id not in facts['ids']:
+            facts['ids'][element_id] = None
+            frame.element_id = element_id
+        if name == 'h2':
+            frame.heading = len(facts['headings'])
+            facts['headings'].append([None, self.seq])
+        if name in ('td', 'th'):
+            frame.cell = len(facts['cells'])
+            facts['cells'].append([name, None, None, self.seq, []])
+            self.cells_open.append(frame.cell)
+        elif name == 'tr':
+            frame.row = len(facts['rows'])
+            facts['rows'].append([self.seq, len(facts['cells']), None])
+            self.rows_open.append(frame.row)
+        elif name == 'table' or (name == 'div' and 'table_scroll' in _classes(attrs)):
+            frame.container = len(facts['containers'])
+            facts['containers'].append(['table' if name == 'table' else 'scroll', _classes(attrs), self.seq,
+                                        len(facts['rows']), None, len(facts['cells']), None])
+        if name == 'span' and self.cells_open:
+            # find_all('span') lists spans by where they open, so claim the slots now
+            frame.span_slots = []
+            for cell in self.cells_open:
+                spans = facts['cells'][cell][4]
+                frame.span_slots.append((cell, len(spans)))
+                spans.append(None)
+        if frame.cell is not None or frame.element_id or frame.span_slots:
+            frame.collect = []
+            self.collecting.append(frame)
+
+    def pop(self):
+        facts = self.facts
+        frame = self.stack.pop()
+        self.open_counts[frame.name] -= 1
+        if frame.name in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth -= 1
+        if frame.name in STRING_CONTAINER_TAGS:
+            self.containers_open.pop()
+        # .string: the only child's string, looking through single-child elements
+        string = frame.only if frame.children == 1 else None
+        parent = self.stack[-1]
+        if parent.only is frame:
+            parent.only = string
+        if frame.collect is not None:
+            self.collecting.remove(frame)
+        if frame.element_id:
+            facts['ids'][frame.element_id] = ''.join(frame.collect)
+        if frame.heading is not None:
+            facts['headings'][frame.heading][0] = string
+        if frame.cell is not None:
+            self.cells_open.pop()
+            cell = facts['cells'][frame.cell]
+            cell[1] = frame.collect
+            cell[2] = True if string is not None and frame.collect == [string] else string
+        elif frame.row is not None:
+            self.rows_open.pop()
+            facts['rows'][frame.row][2] = len(facts['cells'])
+        elif frame.container is not None:
+            container = facts['containers'][frame.container]
+            container[4] = len(facts['rows'])
+            container[6] = len(facts['cells'])
+        if frame.span_slots:
+            text = ''.join(s.strip() for s in frame.collect if s.strip())
+            for cell, slot in frame.span_slots:
+                facts['cells'][cell][4][slot] = text
+
+    # An end tag closes the most recent open element of that name and
+    # everything opened after it; with none open it is ignored.
+    def close_to(self, name):
+        self.flush()
+        if not self.open_counts.get(name):
+            return
+        while len(self.stack) > 1:
+            closed = self.stack[-1].name
+            self.pop()
+            if closed == name:
+                break
+
+    def finish(self):
+        self.close()
+        self.flush()
+        while len(self.stack) > 1:
+            self.pop()
+        return self.facts
+
+    # --- tokenizer callbacks ---
+
+    def handle_starttag(self, tag, attrs):
+        self.push(tag, _attr_dict(attrs))
+        if tag in VOID_ELEMENTS:
+            self.close_to(tag)
+            self.already_closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.push(tag, _attr_dict(attrs))
+        self.close_to(tag)
+
+    def handle_endtag(self, tag):
+        # </br> after <br> is part of the same element; nothing is flushed
+        if tag in self.already_closed_void:
+            self.already_closed_void.remove(tag)
+        else:
+            self.close_to(tag)
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.data.append(character if character is not None else f'&{name}')
+
+    def handle_charref(self, name):
+        base, pattern = 10, _DECIMAL_REF_RE
+        if name.startswith(('x', 'X')):
+            name, base, pattern = name[1:], 16, _HEX_REF_RE
+        try:
+            code, extra = int(name, base), ''
+        except ValueError:
+            m = pattern.search(name)
+            code, extra = (int(m.group(1), base), m.group(2)) if m else (None, name)
+        if code is not None:
+            self.data.append(UnicodeDammit.numeric_character_reference(code)[0])
+        self.data.append(extra)
+
+    def _special(self, data, kind):
+        self.flush()
+        self.data.append(data)
+        self.flush(kind)
+
+    def handle_comment(self, data):
+        self._special(data, 'comment')
+
+    def handle_decl(self, decl):
+        self._special(decl[len('DOCTYPE '):], 'doctype')
+
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            self._special(data[len('CDATA['):], 'cdata')
+        else:
+            self._special(data, 'declaration')
+
+    def handle_pi(self, data):
+        self._special(data, 'pi')
+
+def _attr_dict(attrs):
+    # Later duplicates win and valueless attributes are '', as in the tree builder
+    return {key: '' if value is None else value for key, value in attrs}
+
+def _classes(attrs):
+    return _NOT_SPACE_RE.findall(attrs.get('class', ''))
+
+def stream_facts(html):
+    parser = StreamingFactsParser()
+    parser.feed(html)
+    return parser.finish()
@@ -1,13 +1,20 @@
-import os
-import json
 import re
-from bs4 import BeautifulSoup
+from page_facts import load_facts
+from parcel_scheduler import process_parcels
+from input_discovery import iter_input_files
+from parcel_budget import parcel_budget, ParcelBudgetExceeded, RetryList
+from run_metrics import RunMetrics
+from slow_parcels import SlowParcelCapture
+from compressed_io import dump_json
+from extraction_profiles import skip_stage
 
 INPUT_DIR = './input/'
 OUTPUT_FILE = './owners/structure_data.json'
 
 def extract_structure_from_html(html, file_id):
-    soup = BeautifulSoup(html, 'html.parser')
+    return extract_structure_from_facts(load_facts(html), file_id)
+
+def extract_structure_from_facts(facts, file_id):
     # Required fields from schema
     def safe_enum(val, allowed):
         if val is None or val == '' or val == 'N/A':
@@ -69,9 +76,8 @@ def extract_structure_from_html(html, file_id):
     # Building type/attachment and architectural_style_type
     # Only extract if explicitly present in input (not inferred from use code)
     # Try to extract attachment_type from 'Property Use Code' or similar
-    use_code = soup.find(string=re.compile(r'Property Use Code'))
-    if use_code:
-        val = use_code.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Property Use Code'))
+    if val is not None:
         if 'CONDOMINIUM' in val.upper():
             structure['attachment_type'] = 'Attached'
         elif 'TOWNHOUSE' in val.upper():
@@ -86,9 +92,8 @@ def extract_structure_from_html(html, file_id):
         structure['attachment_type'] = None
     structure['architectural_style_type'] = None
     # Exterior wall
-    ext_wall = soup.find(string=re.compile(r'Exterior Wall 1'))
-    if ext_wall:
-        val = ext_wall.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Exterior Wall 1'))
+    if val is not None:
         # Use exact text if matches enum, else null
         if 'CB' in val.upper() or 'CONCRETE BLOCK' in val.upper():
             structure['exterior_wall_material_primary'] = 'Concrete Block'
@@ -99,9 +104,8 @@ def extract_structure_from_html(html, file_id):
         else:
             structure['exterior_wall_material_primary'] = None
     # Secondary wall
-    ext_wall2 = soup.find(string=re.compile(r'Exterior Wall 2'))
-    if ext_wall2:
-        val = ext_wall2.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Exterior Wall 2'))
+    if val is not None:
         if 'STUCCO' in val.upper():
             structure['exterior_wall_material_secondary'] = 'Stucco Accent'
         elif 'NONE' in val.upper():
@@ -109,18 +113,16 @@ def extract_structure_from_html(html, file_id):
         else:
             structure['exterior_wall_material_secondary'] = None
     # Roof
-    roof_struct = soup.find(string=re.compile(r'Roof Structure'))
-    if roof_struct:
-        val = roof_struct.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Roof Structure'))
+    if val is not None:
         if 'WOOD' in val.upper():
             structure['roof_structure_material'] = 'Wood Truss'
         elif 'CONCRETE' in val.upper():
             structure['roof_structure_material'] = 'Concrete Beam'
         else:
             structure['roof_structure_material'] = None
-    roof_cover = soup.find(string=re.compile(r'Roof Cover'))
-    if roof_cover:
-        val = roof_cover.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Roof Cover'))
+    if val is not None:
         if 'CONCRETE TILE' in val.upper():
             structure['roof_covering_material'] = 'Concrete Tile'
         elif 'MIN. ROOFING' in val.upper() or 'CORR/SH.M' in val.upper():
@@ -129,18 +131,16 @@ def extract_structure_from_html(html, file_id):
             structure['roof_covering_material'] = None
 
     # Flooring
-    floor1 = soup.find(string=re.compile(r'Floor Type 1'))
-    if floor1:
-        val = floor1.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Floor Type 1'))
+    if val is not None:
         if 'CARPET' in val.upper():
             structure['flooring_material_primary'] = 'Carpet'
         elif 'TILE' in val.upper():
             structure['flooring_material_primary'] = 'Ceramic Tile'
         else:
             structure['flooring_material_primary'] = None
-    floor2 = soup.find(string=re.compile(r'Floor Type 2'))
-    if floor2:
-        val = floor2.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Floor Type 2'))
+    if val is not None:
         if 'TILE' in val.upper():
             structure['flooring_material_secondary'] = 'Ceramic Tile'
         elif 'CARPET' in val.upper():
@@ -148,9 +148,8 @@ def extract_structure_from_html(html, file_id):
         else:
             structure['flooring_material_secondary'] = None
     # Interior wall surface material (primary)
-    int_wall1 = soup.find(string=re.compile(r'Interior Wall 1'))
-    if int_wall1:
-        val = int_wall1.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Interior Wall 1'))
+    if val is not None:
         if 'DRYWALL' in val.upper():
             structure['interior_wall_surface_material_primary'] = 'Drywall'
         elif 'PLASTER' in val.upper():
@@ -158,9 +157,8 @@ def extract_structure_from_html(html, file_id):
         else:
             structure['interior_wall_surface_material_primary'] = None
     # Year Built
-    year_built = soup.find(string=re.compile(r'Year Built'))
-    if year_built:
-        val = year_built.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Year Built'))
+    if val is not None:
         try:
             structure['year_built'] = int(val)
         except:
@@ -168,18 +166,34 @@ def extract_structure_from_html(html, file_id):
     # All other fields remain None unless explicitly present in input
     return structure
 
+# One parcel's entry, or the ParcelBudgetExceeded that cut it short
+def structure_entry(item, pages, context):
+    file_id, _ = item
+    html, = pages
+    try:
+        with parcel_budget():
+            return extract_structure_from_html(html, file_id)
+    except ParcelBudgetExceeded as e:
+        return e
+
 def main():
+    if skip_stage('structure_extractor'):
+        return
     result = {}
-    for fname in os.listdir(INPUT_DIR):
-        if not fname.endswith('.html'):
+    retry_list = RetryList('structure_extractor')
+    metrics = RunMetrics('structure_extractor').start(INPUT_DIR)
+    slow_parcels = SlowParcelCapture('structure_extractor').start()
+    for (file_id, _), entry in process_parcels(iter_input_files(INPUT_DIR), structure_entry, metrics, slow_parcels):
+        if isinstance(entry, ParcelBudgetExceeded):
+            retry_list.add(file_id, str(entry))
+            metrics.error('budget_exceeded')
             continue
-        file_id = fname.replace('.html', '')
-        with open(os.path.join(INPUT_DIR, fname), 'r', encoding='utf-8') as f:
-            html = f.read()
-        structure = extract_structure_from_html(html, file_id)
-        result[f'property_{file_id}'] = structure
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(result, f, indent=2)
+        result[f'property_{file_id}'] = entry
+    retry_list.write()
+    _, nbytes = dump_json(result, OUTPUT_FILE)
+    metrics.wrote(nbytes)
+    slow_parcels.close()
+    metrics.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,233 @@
+import os
+import csv
+import json
+import time
+import base64
+import random
+import argparse
+from multiprocessing import Pool
+
+from input_discovery import fanout_path
+from candidate_store import pack_directory
+
+STREETS = ['PALM WAY', 'OCEAN BLVD', 'LAKE AVE', 'US HIGHWAY 1', 'OKEECHOBEE BLVD', 'MILITARY TRL', 'CLINT MOORE RD']
+CITIES = ['WEST PALM BEACH', 'BOCA RATON', 'DELRAY BEACH', 'JUPITER', 'WELLINGTON']
+LAST_NAMES = ['SMITH', 'GARCIA', 'JOHNSON', 'NGUYEN', 'BROWN', 'MILLER', 'DAVIS', 'LOPEZ']
+FIRST_NAMES = ['JOHN', 'MARIA', 'JAMES', 'LINDA', 'ROBERT', 'ANA', 'MICHAEL', 'SUSAN']
+COMPANIES = ['FEDERAL NATIONAL MORTGAGE ASSOCIATION', 'PALM HOLDINGS LLC', 'SUNSHINE TRUST', 'OCEAN VIEW CONDO ASSOCIATION INC']
+USE_CODES = ['0100 - SINGLE FAMILY', '0400 - CONDOMINIUM', '0200 - DUPLEX', '0500 - TOWNHOUSE']
+DEED_TYPES = ['WARRANTY DEED', 'QUIT CLAIM', 'CERT OF TITLE', 'REP DEED']
+UNIT_LABELS = ['A', 'B', 'C', 'D', '1A', '2B', '3E', '101', '202', '303']
+LATEST_YEAR = 2024
+# Parcels handed to a worker at a time; each returns its seed.csv rows in order
+CHUNK_SIZE = 500
+
+# Shape of the generated pages. Each count is a fixed int or an inclusive
+# (low, high) range drawn per parcel. page_kb pads pages up to that size with
+# an ASP.NET __VIEWSTATE field, as the real pages carry; 0 leaves them bare.
+DEFAULT_SHAPE = {
+    'page_kb': 0,
+    'sales': 3,
+    'tax_years': 5,
+    'units': 1,
+    'candidates': 5,
+}
+
+ADDRESS_SCHEMA = {
+    'type': 'object',
+    'required': ['source_http_request', 'request_identifier', 'street_number', 'street_name'],
+    'properties': {
+        'source_http_request': {'type': 'object'},
+        'request_identifier': {'type': 'string'},
+        'street_number': {'type': 'string'},
+        'street_name': {'type': 'string'},
+    },
+}
+
+def _owner(rng):
+    if rng.random() < 0.2:
+        return rng.choice(COMPANIES)
+    return f'{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}'
+
+def _money(value):
+    return f'${value:,}'
+
+# An int, or a (low, high) range to draw from
+def _count(rng, spec):
+    if isinstance(spec, (tuple, list)):
+        return rng.randint(spec[0], spec[1])
+    return spec
+
+def _value_table(years, rows):
+    head = '<tr><th>Tax Year</th>' + ''.join(f'<th>{y}</th>' for y in years) + '</tr>'
+    body = ''.join('<tr><td>' + label + '</td>' + ''.join(f'<td>{_money(v)}</td>' for v in values) + '</tr>'
+                   for label, values in rows)
+    return f'<div class="table_scroll"><table>{head}{body}</table></div>'
+
+# Values drift down a few percent per year going back, like a real history
+def _history(value, n_years):
+    return [int(value * (1 - 0.03 * i)) // 10 * 10 for i in range(n_years)]
+
+def _viewstate(rng, nbytes):
+    raw = rng.randbytes(max(nbytes, 0) * 3 // 4)
+    return f'<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{base64.b64encode(raw).decode("ascii")}" />\n'
+
+def render_page(parcel_id, rng, n_sales=3, n_years=5, n_units=1, page_kb=0):
+    pcn = '-'.join([parcel_id[0:2], parcel_id[2:4], parcel_id[4:6], parcel_id[6:8], parcel_id[8:10], parcel_id[10:13], parcel_id[13:]])
+    use = rng.choice(USE_CODES) if n_units == 1 else '0800 - MULTIFAMILY < 10 UNITS'
+    owners = [_owner(rng) for _ in range(rng.randint(1, 2))]
+    sales = []
+    year = LATEST_YEAR
+    # Long histories step back more slowly so the dates stay plausible
+    max_step = max(1, min(6, 100 // max(n_sales, 1)))
+    for _ in range(n_sales):
+        year -= rng.randint(1, max_step)
+        sales.append((f'{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{year}', rng.choice([0, rng.randint(50, 900) * 1000]), _owner(rng)))
+    years = [str(LATEST_YEAR - i) for i in range(n_years)]
+    land = rng.randint(20, 300) * 1000
+    building = rng.randint(50, 900) * 1000 * n_units
+    market = [b + l for b, l in zip(_history(building, n_years), _history(land, n_years))]
+    sales_rows = ''.join(f'<tr><td>{d}</td><td>{_money(p)}</td><td>{rng.choice(DEED_TYPES)}</td><td>{rng.randint(10000, 40000)} / {rng.randint(1, 2000)}</td><td>{o}</td></tr>'
+                         for d, p, o in sales)
+    owner_spans = ''.join(f'<span>{o}</span><br/>' for o in owners)
+    # Rooms scale with the unit count, and each bedroom and bath becomes a layout entity
+    structural = ''.join(f'<tr><td>{label}</td><td>{value}</td></tr>' for label, value in [
+        ('Property Use Code', use), ('Year Built', rng.randint(1950, 2020)),
+        ('Bed Rooms', sum(rng.randint(1, 5) for _ in range(n_units))),
+        ('Full Baths', sum(rng.randint(1, 4) for _ in range(n_units))),
+        ('Half Baths', sum(rng.randint(0, 2) for _ in range(n_units))), ('Exterior Wall 1', 'CB STUCCO'),
+        ('Roof Structure', 'WOOD TRUSS'), ('Roof Cover', 'CONCRETE TILE'), ('Floor Type 1', 'CARPET'),
+        ('Interior Wall 1', 'DRYWALL'), ('Air Condition Desc.', 'CENTRAL'), ('Heat Type', 'FORCED AIR DUCT'),
+        ('Number of Units', n_units), ('Area', sum(rng.randint(800, 4000) for _ in range(n_units))),
+    ])
+    page = f'''<html><head><title>Property Detail</title></head><body><form id="form1">
+{{viewstate}}<div id="MainContent_pnlProperty">
+<span id="MainContent_lblPCN">{pcn}</span>
+<span id="MainContent_lblLegalDesc">{rng.choice(STREETS)} SUB LT {rng.randint(1, 40)} BLK {rng.randint(1, 9)}</span>
+<span id="MainContent_lblSubdiv">{rng.choice(['PALM GARDENS', 'OCEAN CONDO', 'LAKE TOWNHOUSE'])}</span>
+</div>
+<h2>Property detail</h2><table><tr><td>Location Address</td><td>{rng.randint(1, 9999)} {rng.choice(STREETS)}</td></tr><tr><td>Sale Date</td><td>{sales[0][0] if sales else ''}</td></tr></table>
+<h2>Owner INFORMATION</h2><table><tr><td>{owner_spans}</td><td>PO BOX {rng.randint(1, 9999)}</td></tr></table>
+<h2>Sales INFORMATION</h2><table><tr><th>Sales Date</th><th>Price</th><th>OR Book/Page</th><th>Sale Type</th><th>Owner</th></tr>{sales_rows}</table>
+<h2>Exemption INFORMATION</h2><table><tr><th>Applicant/Owner</th><th>Year</th></tr><tr><td>{owners[0]}</td><td>{LATEST_YEAR}</td></tr></table>
+<h2>Structural Details</h2><table class="structural_elements">{structural}</table>
+<h2>Appraisals</h2>{_value_table(years, [('Improvement Value', _history(building, n_years)), ('Land Value', _history(land, n_years)), ('Total Market Value', market)])}
+<h2>Assessed &amp; taxable values</h2>{_value_table(years, [('Assessed Value', market), ('Exemption Amount', [50000] * n_years), ('Taxable Value', [v - 50000 for v in market])])}
+<h2>Taxes</h2>{_value_table(years, [('Ad Valorem', [v // 60 for v in market]), ('Non Ad Valorem', [400] * n_years), ('Total tax', [v // 60 + 400 for v in market])])}
+</form></body></html>'''
+    padding = page_kb * 1024 - len(page)
+    return page.replace('{viewstate}', _viewstate(rng, padding) if padding > 0 else '', 1)
+
+def render_candidates(rng, n_candidates=5, n_units=1):
+    units = [None, None, '3E', 'A'] if n_units == 1 else UNIT_LABELS
+    return [{
+        'number': str(rng.randint(1, 9999)),
+        'street': rng.choice(STREETS),
+        'unit': rng.choice(units),
+        'city': rng.choice(CITIES),
+        'postcode': str(rng.randint(33401, 33499)),
+        'coordinates': [round(rng.uniform(-80.3, -80.0), 6), round(rng.uniform(26.3, 26.9), 6)],
+    } for _ in range(n_candidates)]
+
+# Writes parcel i's page and candidate list and returns its seed.csv row.
+# Every parcel has its own generator, so the corpus doesn't depend on how
+# the work was split between processes.
+def generate_parcel(root, i, seed, shape, fanout=0):
+    rng = random.Random(f'{seed}:{i}')
+    parcel_id = f'{rng.randint(0, 79):02d}42{rng.randint(40, 43)}{i:011d}'
+    n_units = max(_count(rng, shape['units']), 1)
+    page = render_page(parcel_id, rng, n_sales=_count(rng, shape['sales']), n_years=_count(rng, shape['tax_years']),
+                       n_units=n_units, page_kb=_count(rng, shape['page_kb']))
+    page_path = fanout_path(os.path.join(root, 'input'), parcel_id, f'{parcel_id}.html', fanout)
+    if fanout:
+        os.makedirs(os.path.dirname(page_path), exist_ok=True)
+    with open(page_path, 'w', encoding='utf-8') as f:
+        f.write(page)
+    candidates = render_candidates(rng, max(_count(rng, shape['candidates']), 1), n_units)
+    with open(os.path.join(root, 'possible_addresses', f'{parcel_id}.json'), 'w') as f:
+        json.dump(candidates, f)
+    target = candidates[0]
+    return [parcel_id, f"{target['number']} {target['street']}", 'Palm Beach', 'GET',
+            'https://www.pbcgov.org/papa/Property/Details', json.dumps({'parcelID': [parcel_id]})], len(page)
+
+def _generate_chunk(args):
+    root, start, stop, seed, shape, fanout = args
+    return [generate_parcel(root, i, seed, shape, fanout) for i in range(start, stop)]
+
+# Writes input/, possible_addresses/, seed.csv and schemas/address.json under
+# root and returns (parcels, html bytes). shape overrides DEFAULT_SHAPE.
+def generate_corpus(root, n_parcels, seed=0, shape=None, jobs=1, fanout=0, progress=False):
+    shape = dict(DEFAULT_SHAPE, **(shape or {}))
+    for sub in ('input', 'possible_addresses', 'schemas', 'owners'):
+        os.makedirs(os.path.join(root, sub), exist_ok=True)
+    with open(os.path.join(root, 'schemas', 'address.json'), 'w') as f:
+        json.dump(ADDRESS_SCHEMA, f, indent=2)
+    chunks = [(root, start, min(start + CHUNK_SIZE, n_parcels), seed, shape, fanout)
+              for start in range(0, n_parcels, CHUNK_SIZE)]
+    pool = Pool(jobs) if jobs > 1 else None
+    results = pool.imap(_generate_chunk, chunks) if pool else map(_generate_chunk, chunks)
+    written = 0
+    html_bytes = 0
+    start_time = time.perf_counter()
+    try:
+        with open(os.path.join(root, 'seed.csv'), 'w', newline='') as seed_file:
+            writer = csv.writer(seed_file)
+            writer.writerow(['parcel_id', 'Address', 'County', 'method', 'url', 'multiValueQueryString'])
+            for rows in results:
+                for row, size in rows:
+                    writer.writerow(row)
+                    html_bytes += size
+                written += len(rows)
+                if progress and written % (CHUNK_SIZE * 20) == 0:
+                    rate = written / max(time.perf_counter() - start_time, 1e-9)
+                    print(f'{written}/{n_parcels} parcels ({rate:.0f}/s)')
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return written, html_bytes
+
+# '3' -> 3, '0-12' -> (0, 12)
+def parse_count(text):
+    low, sep, high = text.partition('-')
+    if not sep:
+        return int(low)
+    if int(low) > int(high):
+        raise argparse.ArgumentTypeError(f'empty range {text!r}')
+    return (int(low), int(high))
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Palm Beach corpus: input/ pages, '
+                                                 'possible_addresses/, seed.csv and schemas/')
+    parser.add_argument('root', help='directory to write the corpus into')
+    parser.add_argument('--parcels', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--page-kb', type=parse_count, default=DEFAULT_SHAPE['page_kb'], metavar='N|LO-HI',
+                        help='pad each page to this many KB (0 = no padding)')
+    parser.add_argument('--sales', type=parse_count, default=DEFAULT_SHAPE['sales'], metavar='N|LO-HI',
+                        help='rows in the sales history')
+    parser.add_argument('--tax-years', type=parse_count, default=DEFAULT_SHAPE['tax_years'], metavar='N|LO-HI',
+                        help='years in the appraisal, assessment and tax tables')
+    parser.add_argument('--units', type=parse_count, default=DEFAULT_SHAPE['units'], metavar='N|LO-HI',
+                        help='units per parcel; rooms, and so layout entities, scale with it')
+    parser.add_argument('--candidates', type=parse_count, default=DEFAULT_SHAPE['candidates'], metavar='N|LO-HI',
+                        help='addresses in each possible_addresses list')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--fanout', type=int, default=0,
+                        help='hashed directory levels under input/ (run the stages with INPUT_FANOUT to match)')
+    parser.add_argument('--pack', action='store_true',
+                        help='also pack possible_addresses/ into possible_addresses.sqlite (read with CANDIDATE_STORE=1)')
+    args = parser.parse_args()
+
+    shape = {'page_kb': args.page_kb, 'sales': args.sales, 'tax_years': args.tax_years,
+             'units': args.units, 'candidates': args.candidates}
+    start = time.perf_counter()
+    parcels, html_bytes = generate_corpus(args.root, args.parcels, args.seed, shape, args.jobs, args.fanout, progress=True)
+    if args.pack:
+        pack_directory(os.path.join(args.root, 'possible_addresses'), os.path.join(args.root, 'possible_addresses.sqlite'))
+    seconds = time.perf_counter() - start
+    print(f'Wrote {parcels} parcels ({html_bytes / (1024 * 1024):.1f} MB of HTML) to {args.root} '
+          f'in {seconds:.1f}s ({parcels / max(seconds, 1e-9):.0f} parcels/s)')
+
+if __name__ == '__main__':
+    main()
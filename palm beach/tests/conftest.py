@@ -0,0 +1,54 @@
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.dirname(TESTS_DIR)
+# Three parcels: an exact, a fuzzy and a fallback address match; the first and
+# the third share a page layout
+FIXTURE_CORPUS = os.path.join(TESTS_DIR, 'fixtures', 'corpus')
+# The scripts import each other by module name, as they do when run from their directory
+sys.path.insert(0, SCRIPTS_DIR)
+
+from equivalence_check import STAGES, config_vars, compare_outputs
+
+PARCEL_IDS = sorted(name[:-len('.html')] for name in os.listdir(os.path.join(FIXTURE_CORPUS, 'input')))
+# Stages run without any of the scripts' settings unless a test passes them
+CLEAN_ENV = {k: v for k, v in os.environ.items() if k not in config_vars(SCRIPTS_DIR)}
+
+def copy_corpus(workdir):
+    shutil.copytree(FIXTURE_CORPUS, workdir)
+    os.makedirs(os.path.join(workdir, 'owners'))
+    return workdir
+
+# Runs the stages as scripts in workdir, the way the pipeline does, with env
+# on top of a clean environment; returns their combined stdout
+def run_stages(workdir, stages=STAGES, **env):
+    output = ''
+    for stage in stages:
+        proc = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, f'{stage}.py')], cwd=workdir,
+                              env=dict(CLEAN_ENV, **env), capture_output=True, text=True)
+        assert proc.returncode == 0, f'{stage} failed:\n{proc.stderr}'
+        output += proc.stdout
+    return output
+
+def assert_same_outputs(reference_dir, workdir, entity_types=None):
+    report = compare_outputs(reference_dir, workdir, 0, 5, entity_types)
+    assert report['files_compared'] > 0
+    assert (report['missing_in_optimized'], report['extra_in_optimized'], report['differing']) == (0, 0, 0), \
+        report['examples']
+
+# A scratch copy of the fixture corpus
+@pytest.fixture
+def corpus(tmp_path):
+    return copy_corpus(str(tmp_path / 'corpus'))
+
+# The plain pipeline's outputs on the fixture, built once per session
+@pytest.fixture(scope='session')
+def reference(tmp_path_factory):
+    workdir = copy_corpus(str(tmp_path_factory.mktemp('reference') / 'corpus'))
+    run_stages(workdir)
+    return workdir
@@ -0,0 +1,60 @@
+import os
+import csv
+import json
+import random
+from collections import Counter
+
+from conftest import run_stages, assert_same_outputs, FIXTURE_CORPUS, PARCEL_IDS
+from address_extraction import (parse_address, fuzzy_best_match, fuzzy_best_matches_batch, _char_counts,
+                                exact_match)
+
+def fixture_jobs():
+    jobs = []
+    with open(os.path.join(FIXTURE_CORPUS, 'seed.csv'), newline='') as f:
+        addresses = {row['parcel_id']: row['Address'] for row in csv.DictReader(f)}
+    for parcel_id in PARCEL_IDS:
+        address = addresses[parcel_id]
+        with open(os.path.join(FIXTURE_CORPUS, 'possible_addresses', f'{parcel_id}.json')) as f:
+            jobs.append((parse_address(address), json.load(f)))
+    return jobs
+
+# Near misses of the seed address: digits swapped, letters dropped, units changed
+def perturbed_jobs(rng, n):
+    jobs = []
+    for _ in range(n):
+        number = str(rng.randint(1, 9999))
+        street = rng.choice(['S US HIGHWAY 1', 'PALM WAY', 'NE 5TH AVE', 'OCEAN BLVD', 'LAKE AVE'])
+        unit = rng.choice([None, '3E', '2B', '101'])
+        candidates = []
+        for _ in range(rng.randint(0, 8)):
+            cand_number = number if rng.random() < 0.5 else ''.join(rng.sample(number, len(number)))
+            cand_street = street if rng.random() < 0.7 else street.replace(rng.choice(street), '', 1)
+            candidates.append({'number': cand_number, 'street': cand_street, 'unit': rng.choice([unit, None, 'A'])})
+        jobs.append((parse_address(f"{number} {street} {unit or ''}"), candidates))
+    return jobs
+
+def test_char_counts_match_counter():
+    texts = ['1605 us highway 1 3e', '', 'ñandú 12', '77 palm way']
+    counts, lengths = _char_counts(texts)
+    assert list(lengths) == [len(t) for t in texts]
+    assert [int(row.sum()) for row in counts] == [len(t) for t in texts]
+    assert sorted(sorted(Counter(t).values()) for t in texts) == \
+        sorted(sorted(int(c) for c in row if c) for row in counts)
+
+def test_batch_picks_what_the_loop_picks():
+    jobs = fixture_jobs() + perturbed_jobs(random.Random(7), 300)
+    assert fuzzy_best_matches_batch(jobs) == [fuzzy_best_match(parsed, candidates) for parsed, candidates in jobs]
+    assert fuzzy_best_matches_batch([]) == []
+
+def test_fuzzy_match_builds_the_address(corpus):
+    parsed, candidates = fixture_jobs()[2]
+    assert exact_match(parsed, candidates) is None
+    assert fuzzy_best_matches_batch([(parsed, candidates)]) == [candidates[1]]
+    run_stages(corpus, ['address_extraction'], BATCH_MATCHING='1')
+    with open(os.path.join(corpus, 'owners', 'addresses_mapping.json')) as f:
+        address = json.load(f)[f'property_{PARCEL_IDS[2]}']['address']
+    assert (address['street_number'], address['city_name']) == ('1605', 'JUPITER')
+
+def test_batch_pipeline_matches_the_plain_run(corpus, reference):
+    run_stages(corpus, BATCH_MATCHING='1')
+    assert_same_outputs(reference, corpus)
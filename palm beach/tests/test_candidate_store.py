@@ -0,0 +1,39 @@
+import os
+import json
+import shutil
+
+from conftest import run_stages, assert_same_outputs, PARCEL_IDS
+from candidate_store import pack_directory, CandidateStore
+
+def test_store_returns_the_packed_payloads(corpus):
+    src_dir = os.path.join(corpus, 'possible_addresses')
+    store_path = os.path.join(corpus, 'possible_addresses.sqlite')
+    assert pack_directory(src_dir, store_path) == len(PARCEL_IDS)
+    store = CandidateStore(store_path)
+    try:
+        assert len(store) == len(PARCEL_IDS)
+        for parcel_id, payload in store:
+            with open(os.path.join(src_dir, f'{parcel_id}.json')) as f:
+                assert payload == json.load(f)
+        assert store.get('missing') is None
+        assert sorted(store.sizes()) == PARCEL_IDS
+    finally:
+        store.close()
+
+def test_repacking_drops_removed_files(corpus):
+    src_dir = os.path.join(corpus, 'possible_addresses')
+    store_path = os.path.join(corpus, 'possible_addresses.sqlite')
+    pack_directory(src_dir, store_path)
+    os.remove(os.path.join(src_dir, f'{PARCEL_IDS[0]}.json'))
+    assert pack_directory(src_dir, store_path) == len(PARCEL_IDS) - 1
+    store = CandidateStore(store_path)
+    try:
+        assert store.get(PARCEL_IDS[0]) is None
+    finally:
+        store.close()
+
+def test_addresses_match_from_the_store_alone(corpus, reference):
+    run_stages(corpus, ['candidate_store'])
+    shutil.rmtree(os.path.join(corpus, 'possible_addresses'))
+    run_stages(corpus, CANDIDATE_STORE='1')
+    assert_same_outputs(reference, corpus)
@@ -0,0 +1,49 @@
+import os
+import json
+
+from conftest import run_stages, PARCEL_IDS
+
+# Runs in the same second are told apart by pid, which doesn't sort by time
+def last_changefeed(corpus):
+    logs = os.path.join(corpus, 'logs')
+    paths = [os.path.join(logs, name) for name in os.listdir(logs) if name.startswith('changefeed_')]
+    with open(max(paths, key=lambda path: os.stat(path).st_mtime_ns)) as f:
+        return [json.loads(line) for line in f]
+
+def mtimes(corpus):
+    data = os.path.join(corpus, 'data')
+    return {f'{parcel_id}/{name}': os.stat(os.path.join(data, parcel_id, name)).st_mtime_ns
+            for parcel_id in os.listdir(data) for name in os.listdir(os.path.join(data, parcel_id))}
+
+def test_first_run_adds_every_file(corpus):
+    run_stages(corpus)
+    entries = {entry['parcel_id']: entry for entry in last_changefeed(corpus)}
+    assert sorted(entries) == PARCEL_IDS
+    for parcel_id in PARCEL_IDS:
+        assert entries[parcel_id]['added'] == sorted(os.listdir(os.path.join(corpus, 'data', parcel_id)))
+
+def test_unchanged_rerun_touches_nothing(corpus):
+    run_stages(corpus)
+    before = mtimes(corpus)
+    run_stages(corpus, ['data_extractor'])
+    assert mtimes(corpus) == before
+    assert last_changefeed(corpus) == []
+
+def test_rerun_reports_only_what_changed(corpus):
+    run_stages(corpus)
+    parcel_id = PARCEL_IDS[0]
+    page = os.path.join(corpus, 'input', f'{parcel_id}.html')
+    with open(page) as f:
+        html = f.read()
+    with open(page, 'w') as f:
+        f.write(html.replace('$250,000', '$260,000'))
+    leftover = os.path.join(corpus, 'data', parcel_id, 'sales_9.json')
+    with open(leftover, 'w') as f:
+        f.write('{}')
+    before = mtimes(corpus)
+    run_stages(corpus, ['data_extractor'])
+    assert last_changefeed(corpus) == [{'parcel_id': parcel_id, 'added': [], 'changed': ['sales_1.json'],
+                                        'removed': ['sales_9.json']}]
+    after = mtimes(corpus)
+    assert sorted(set(before) - set(after)) == [f'{parcel_id}/sales_9.json']
+    assert [name for name in after if after[name] != before[name]] == [f'{parcel_id}/sales_1.json']
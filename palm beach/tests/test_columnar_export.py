@@ -0,0 +1,68 @@
+import os
+import json
+import math
+
+import numpy as np
+
+from conftest import run_stages, PARCEL_IDS
+from columnar_export import ColumnarExport, TAX_COLUMNS
+
+def load_columns(export_dir, table):
+    table_dir = os.path.join(export_dir, table)
+    return {name[:-len('.npy')]: np.load(os.path.join(table_dir, name)) for name in os.listdir(table_dir)}
+
+def data_records(corpus, prefix):
+    records = []
+    for parcel_id in PARCEL_IDS:
+        parcel_dir = os.path.join(corpus, 'data', parcel_id)
+        for name in sorted(os.listdir(parcel_dir)):
+            if name.startswith(prefix):
+                with open(os.path.join(parcel_dir, name)) as f:
+                    records.append((parcel_id, name, json.load(f)))
+    return records
+
+def test_export_has_a_row_per_published_record(corpus):
+    run_stages(corpus, EXPORT_COLUMNS='1')
+    with open(os.path.join(corpus, 'export', 'manifest.json')) as f:
+        manifest = json.load(f)
+    tax = load_columns(os.path.join(corpus, 'export'), 'tax')
+    sales = load_columns(os.path.join(corpus, 'export'), 'sales')
+    assert sorted(manifest['tax']['columns']) == sorted(tax) == sorted(['parcel_id', 'tax_year'] + TAX_COLUMNS)
+    assert tax['tax_year'].dtype == np.int32 and sales['sale_date'].dtype == np.dtype('datetime64[D]')
+    assert sorted(zip(tax['parcel_id'], tax['tax_year'].tolist())) == \
+        sorted((parcel_id, int(name[len('tax_'):-len('.json')])) for parcel_id, name, _ in data_records(corpus, 'tax_'))
+    published = sorted((parcel_id, record['ownership_transfer_date'], record.get('purchase_price_amount'))
+                       for parcel_id, _, record in data_records(corpus, 'sales_'))
+    exported = sorted((str(p), str(d), None if math.isnan(v) else v)
+                      for p, d, v in zip(sales['parcel_id'], sales['sale_date'], sales['sale_price'].tolist()))
+    assert manifest['sales']['rows'] == len(exported)
+    assert exported == published
+
+def test_standalone_export_matches_the_stage_export(corpus, tmp_path):
+    run_stages(corpus, EXPORT_COLUMNS='1')
+    stage_export = {table: load_columns(os.path.join(corpus, 'export'), table) for table in ('tax', 'sales')}
+    os.rename(os.path.join(corpus, 'export'), str(tmp_path / 'stage_export'))
+    run_stages(corpus, ['columnar_export'])
+    for table, columns in stage_export.items():
+        standalone = load_columns(os.path.join(corpus, 'export'), table)
+        for name, values in columns.items():
+            np.testing.assert_array_equal(standalone[name], values)
+
+def test_take_and_merge_round_trip(tmp_path):
+    worker = ColumnarExport(str(tmp_path))
+    tax_row = {'tax_year': 2024, **{col: 1.0 for col in TAX_COLUMNS}, 'taxable': None}
+    worker.add('p1', [(1, '2015-01-15', 250000.0)], [tax_row])
+    parent = ColumnarExport(str(tmp_path))
+    parent.merge(worker.take())
+    assert worker.take()[0] == []
+    parent.write()
+    tax = load_columns(str(tmp_path), 'tax')
+    assert tax['tax_year'].tolist() == [2024] and math.isnan(tax['taxable'][0])
+
+def test_abandoned_parcels_are_not_exported(corpus):
+    run_stages(corpus, EXPORT_COLUMNS='1', PARCEL_TIMEOUT_SECONDS='0.001')
+    with open(os.path.join(corpus, 'logs', 'retry_data_extractor.json')) as f:
+        abandoned = {entry['parcel_id'] for entry in json.load(f)}
+    assert abandoned
+    for table in ('tax', 'sales'):
+        assert not abandoned & set(load_columns(os.path.join(corpus, 'export'), table)['parcel_id'].tolist())
@@ -0,0 +1,54 @@
+import os
+import json
+
+from conftest import run_stages, assert_same_outputs, PARCEL_IDS
+
+# Everything but the owner entities, which only move
+OTHER_TYPES = ['address', 'property', 'sales', 'tax', 'layout', 'lot', 'structure', 'utility']
+
+def owner_links(workdir):
+    links = []
+    for parcel_id in PARCEL_IDS:
+        parcel_dir = os.path.join(workdir, 'data', parcel_id)
+        for name in sorted(os.listdir(parcel_dir)):
+            if name.startswith('relationship_'):
+                with open(os.path.join(parcel_dir, name)) as f:
+                    links.append(os.path.normpath(os.path.join(parcel_dir, json.load(f)['to']['/'])))
+    return links
+
+def test_owners_are_written_once_to_the_shared_store(corpus, reference):
+    run_stages(corpus, DEDUPE_OWNERS='1')
+    shared_dir = os.path.join(corpus, 'shared_entities')
+    links = owner_links(corpus)
+    # The mortgage company sold all three parcels and is stored once
+    assert len(set(links)) < len(links)
+    assert sorted(set(links)) == sorted(os.path.join(shared_dir, name) for name in os.listdir(shared_dir))
+    for parcel_id in PARCEL_IDS:
+        assert not [n for n in os.listdir(os.path.join(corpus, 'data', parcel_id)) if n.startswith(('person_', 'company_'))]
+    # Every shared entity carries the owner fields of a per-parcel one
+    with open(os.path.join(reference, 'data', PARCEL_IDS[0], 'company_2_1.json')) as f:
+        company = json.load(f)
+    with open(next(link for link in links if 'company_' in link)) as f:
+        shared = json.load(f)
+    assert shared['name'] == company['name']
+    assert_same_outputs(reference, corpus, OTHER_TYPES)
+
+def test_unreferenced_shared_entities_are_collected(corpus):
+    run_stages(corpus, DEDUPE_OWNERS='1')
+    shared_dir = os.path.join(corpus, 'shared_entities')
+    kept = sorted(os.listdir(shared_dir))
+    stale = os.path.join(shared_dir, 'person_00000000000000000000.json')
+    with open(stale, 'w') as f:
+        f.write('{}')
+    os.utime(stale, (0, 0))
+    run_stages(corpus, ['data_extractor'], DEDUPE_OWNERS='1')
+    assert sorted(os.listdir(shared_dir)) == kept
+    changefeed = [name for name in os.listdir(os.path.join(corpus, 'logs')) if name.startswith('changefeed_')]
+    removed = []
+    for name in changefeed:
+        with open(os.path.join(corpus, 'logs', name)) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry['parcel_id'] == '_shared_entities':
+                    removed += entry['removed']
+    assert removed == ['person_00000000000000000000.json']
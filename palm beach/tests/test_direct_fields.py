@@ -0,0 +1,56 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import SCRIPTS_DIR, CLEAN_ENV, FIXTURE_CORPUS, PARCEL_IDS
+from direct_fields import direct_field, direct_fields, DIRECT_IDS
+
+PCN = 'MainContent_lblPCN'
+
+@pytest.mark.parametrize('parcel_id', PARCEL_IDS)
+def test_fixture_fields_match_the_tree(parcel_id):
+    with open(os.path.join(FIXTURE_CORPUS, 'input', f'{parcel_id}.html'), encoding='utf-8') as f:
+        html = f.read()
+    soup = BeautifulSoup(html, 'html.parser')
+    fields = direct_fields(html)
+    assert sorted(fields) == sorted(DIRECT_IDS)
+    assert fields == {element_id: soup.find(id=element_id).text for element_id in DIRECT_IDS}
+
+@pytest.mark.parametrize('html, expected', [
+    ('<span id="MainContent_lblPCN">00-42 &amp; 1</span>', '00-42 & 1'),
+    ("<SPAN ID='MainContent_lblPCN'>A &#65;</SPAN>", 'A A'),
+    ('<b id=MainContent_lblPCN>SMITH & JONES</b>', 'SMITH & JONES'),
+    ('<span id="MainContent_lblPCNx">x</span><span id="MainContent_lblPCN">y</span>', 'y'),
+    ('<span id="MainContent_lblPCN"></span>', ''),
+])
+def test_plain_elements_are_read_directly(html, expected):
+    assert direct_field(html, PCN) == expected
+    assert BeautifulSoup(html, 'html.parser').find(id=PCN).text == expected
+
+# Markup the fast path can't vouch for is left to the tree
+@pytest.mark.parametrize('html', [
+    '<span id="MainContent_lblPCN">a<b>b</b></span>',
+    '<!-- <span id="MainContent_lblPCN">c</span> -->',
+    '<script>var s = \'<span id="MainContent_lblPCN">c</span>\';</script>',
+    '<style><span id="MainContent_lblPCN">c</span></style>',
+    '<ruby><rt><span id="MainContent_lblPCN">c</span></rt></ruby>',
+    '<span id="MainContent_lblPCN">&foo;</span>',
+    '<span id="MainContent_lblPCN">  \n </span>',
+    '<p>no such element</p>',
+])
+def test_unusual_markup_defers_to_the_tree(html):
+    assert direct_field(html, PCN) is None
+
+def test_fuzzed_documents_agree_with_the_tree(tmp_path):
+    report_path = str(tmp_path / 'facts_check.json')
+    proc = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'facts_check.py'), '--checks', 'direct',
+                           '--fuzz', '500', '--corpus', FIXTURE_CORPUS, '--output', report_path],
+                          env=CLEAN_ENV, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stdout
+    with open(report_path) as f:
+        report = json.load(f)
+    assert report['checks']['direct']['compared'] > 0
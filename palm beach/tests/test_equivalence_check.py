@@ -0,0 +1,48 @@
+import os
+import sys
+import json
+import subprocess
+
+from conftest import SCRIPTS_DIR, CLEAN_ENV
+from equivalence_check import first_difference, _normalize_links
+
+def run_check(corpus, tmp_path, *args):
+    report_path = str(tmp_path / 'report.json')
+    proc = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'equivalence_check.py'), '--corpus', corpus,
+                           '--output', report_path, *args], cwd=str(tmp_path), env=CLEAN_ENV,
+                          capture_output=True, text=True)
+    with open(report_path) as f:
+        return proc, json.load(f)
+
+def test_first_difference():
+    assert first_difference({'a': [1, 2.0]}, {'a': [1, 2]}, 0) is None
+    assert first_difference({'a': 100.0}, {'a': 100.5}, 0.01) is None
+    assert first_difference({'a': 100.0}, {'a': 102.0}, 0.01) == ('$.a', 100.0, 102.0)
+    # True == 1 in Python, but not in the output
+    assert first_difference([True], [1], 0) == ('$[0]', True, 1)
+    assert first_difference({'a': 1}, {'b': 1}, 0) == ('$.a', 1, '<missing>')
+    assert first_difference([1], [1, 2], 0) == ('$.length', 1, 2)
+    assert first_difference({'a b': 'x'}, {'a b': 'y'}, 0) == ('$["a b"]', 'x', 'y')
+
+def test_links_compare_by_logical_name():
+    assert _normalize_links({'to': {'/': './sales_1.json.gz'}}) == {'to': {'/': './sales_1.json'}}
+
+def test_opt_in_run_is_equivalent(corpus, tmp_path):
+    proc, report = run_check(corpus, tmp_path, '--env', 'BATCH_MATCHING=1', '--env', 'OUTPUT_COMPRESSION=gzip')
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    assert 'EQUIVALENT' in proc.stdout
+    assert report['equivalent'] and report['parcels'] == 3
+    assert report['diff']['files_compared'] > 0
+    assert report['optimized']['env'] == {'BATCH_MATCHING': '1', 'OUTPUT_COMPRESSION': 'gzip'}
+
+def test_differences_are_reported(corpus, tmp_path):
+    # Shared owners replace the per-parcel person and company files
+    proc, report = run_check(corpus, tmp_path, '--env', 'DEDUPE_OWNERS=1')
+    assert proc.returncode == 1
+    assert 'NOT EQUIVALENT' in proc.stdout
+    assert report['diff']['missing_in_optimized'] > 0 and report['diff']['differing'] > 0
+    assert report['diff']['examples']['differing'][0]['file'].startswith('data/')
+    # A profile run is only held to the entity types it produces
+    proc, report = run_check(corpus, tmp_path, '--env', 'EXTRACTION_PROFILE=valuation')
+    assert proc.returncode == 0, proc.stdout
+    assert report['entity_types'] == ['sales', 'tax']
@@ -0,0 +1,35 @@
+import os
+import csv
+import json
+
+import pytest
+
+from conftest import FIXTURE_CORPUS, PARCEL_IDS
+from parcel_extraction import extract_parcel
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def parcel_inputs(parcel_id):
+    with open(os.path.join(FIXTURE_CORPUS, 'seed.csv'), newline='') as f:
+        seed_row = next(row for row in csv.DictReader(f) if row['parcel_id'] == parcel_id)
+    with open(os.path.join(FIXTURE_CORPUS, 'input', f'{parcel_id}.html'), 'rb') as f:
+        html_bytes = f.read()
+    candidates = load(os.path.join(FIXTURE_CORPUS, 'possible_addresses', f'{parcel_id}.json'))
+    return html_bytes, seed_row, candidates, load(os.path.join(FIXTURE_CORPUS, 'schemas', 'address.json'))
+
+@pytest.mark.parametrize('parcel_id', PARCEL_IDS)
+def test_entities_match_the_scripts(parcel_id, reference):
+    entities = extract_parcel(*parcel_inputs(parcel_id))
+    parcel_dir = os.path.join(reference, 'data', parcel_id)
+    assert sorted(entities) == sorted(os.listdir(parcel_dir))
+    for name, record in entities.items():
+        assert record == load(os.path.join(parcel_dir, name)), name
+
+def test_text_html_and_missing_candidates():
+    html_bytes, seed_row, candidates, schema = parcel_inputs(PARCEL_IDS[0])
+    assert extract_parcel(html_bytes.decode('utf-8'), seed_row, candidates, schema) == \
+        extract_parcel(html_bytes, seed_row, candidates, schema)
+    entities = extract_parcel(html_bytes, seed_row, None, schema)
+    assert 'address.json' not in entities and 'sales_1.json' in entities
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from conftest import run_stages, assert_same_outputs, PARCEL_IDS
+from extraction_profiles import resolve_profile, entity_type, ENTITY_TYPES
+
+def data_types(corpus):
+    return {entity_type(name) for parcel_id in PARCEL_IDS
+            for name in os.listdir(os.path.join(corpus, 'data', parcel_id))}
+
+def test_resolve_profile():
+    assert resolve_profile('full') == frozenset(ENTITY_TYPES)
+    assert resolve_profile('valuation') == {'sales', 'tax'}
+    # Relationships link sales to owners, so they bring both along
+    assert resolve_profile('relationship, tax') == {'relationship', 'sales', 'person', 'company', 'tax'}
+    with pytest.raises(ValueError, match='unknown entity types'):
+        resolve_profile('sales,parcels')
+
+def test_entity_type():
+    assert entity_type('relationship_sales_person_1_1.json.gz') == 'relationship'
+    assert entity_type('tax_2024.json') == 'tax'
+
+def test_profile_run_produces_only_its_entities(corpus, reference):
+    output = run_stages(corpus, EXTRACTION_PROFILE='valuation')
+    for stage in ('owner_processor', 'layout_extractor', 'structure_extractor', 'utility_extractor'):
+        assert f'Skipping {stage}' in output
+    assert data_types(corpus) == {'sales', 'tax'}
+    assert_same_outputs(reference, corpus, ['sales', 'tax'])
+
+def test_profile_run_leaves_other_entities_alone(corpus, reference):
+    run_stages(corpus)
+    layout = os.path.join(corpus, 'data', PARCEL_IDS[0], 'layout_1.json')
+    mtime = os.stat(layout).st_mtime_ns
+    run_stages(corpus, EXTRACTION_PROFILE='geocoding')
+    assert os.stat(layout).st_mtime_ns == mtime
+    assert_same_outputs(reference, corpus)
@@ -0,0 +1,46 @@
+import os
+import re
+
+import pytest
+
+import field_cleaning
+from bench_field_cleaning import CASES, sample_values
+from conftest import FIXTURE_CORPUS, PARCEL_IDS
+
+# Inputs the fast paths have to hand to the general ones
+EDGE_VALUES = {
+    'money': ['$1,234.5.6', '$ 1 2 ', '١٢٣', '$١,٢٣٤', '$1,234,567', '$.5', '$5.', '.', '$', '-5', '1e3', '$1_000'],
+    'dates': ['01/15/2015', '١٢/٠١/٢٠٢٠', '12/01/２０２０', '01/15/201', '1/15/2015', '01-15-2015', '01/15/2015x'],
+    'names': ['A & B & ', '&&', 'SMITH  &  JONES', ' & '],
+    'streets': ['', ' .,', 'S.  Ocean  Blvd.'],
+}
+
+def fixture_values():
+    values = {'money': [], 'dates': []}
+    for parcel_id in PARCEL_IDS:
+        with open(os.path.join(FIXTURE_CORPUS, 'input', f'{parcel_id}.html')) as f:
+            html = f.read()
+        values['money'] += re.findall(r'\$[\d,]+', html)
+        values['dates'] += re.findall(r'\d{2}/\d{2}/\d{4}', html)
+    return values
+
+@pytest.mark.parametrize('name, legacy, cleaner, kind', CASES, ids=[case[0] for case in CASES])
+def test_cleaners_match_the_legacy_helpers(name, legacy, cleaner, kind):
+    values = sample_values(2000)[kind] + EDGE_VALUES[kind] + fixture_values().get(kind, [])
+    # Twice, so memoized results are checked too
+    for _ in range(2):
+        for value in values:
+            assert cleaner(value) == legacy(value), value
+
+def test_clean_money_non_strings():
+    assert field_cleaning.clean_money(1234.567) == 1234.57
+    assert field_cleaning.clean_money(0) == 0.0
+    assert field_cleaning.clean_money(None) is None
+    assert field_cleaning.clean_money(['$1']) is None
+
+def test_safe_val_and_clean_int():
+    assert field_cleaning.safe_val('0') is None
+    assert field_cleaning.safe_val('12.345') == 12.35
+    assert field_cleaning.safe_val('x') is None
+    assert field_cleaning.clean_int('2024') == 2024
+    assert field_cleaning.clean_int('Tax Year') is None
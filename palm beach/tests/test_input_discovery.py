@@ -0,0 +1,49 @@
+import os
+import hashlib
+
+from conftest import run_stages, assert_same_outputs, PARCEL_IDS
+import input_discovery
+from input_discovery import fanout_path, iter_input_files
+
+def fan_out_inputs(corpus, levels):
+    input_dir = os.path.join(corpus, 'input')
+    for parcel_id in PARCEL_IDS:
+        path = fanout_path(input_dir, parcel_id, f'{parcel_id}.html', levels)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.rename(os.path.join(input_dir, f'{parcel_id}.html'), path)
+
+def parcel_dirs(corpus):
+    data = os.path.join(corpus, 'data')
+    return sorted(os.path.relpath(dirpath, data) for dirpath, dirnames, filenames in os.walk(data) if filenames)
+
+def test_fanout_path():
+    digest = hashlib.md5(b'00424130000001010').hexdigest()
+    assert fanout_path('data', '00424130000001010') == os.path.join('data', '00424130000001010')
+    assert fanout_path('input', '00424130000001010', '00424130000001010.html', 2) == \
+        os.path.join('input', digest[:2], digest[2:4], '00424130000001010.html')
+
+def test_scan_follows_any_fanout(corpus):
+    fan_out_inputs(corpus, 2)
+    found = sorted(iter_input_files(os.path.join(corpus, 'input')))
+    assert [parcel_id for parcel_id, _ in found] == PARCEL_IDS
+    assert all(os.path.isfile(path) for _, path in found)
+
+def test_fanned_out_input_and_output(corpus, reference):
+    fan_out_inputs(corpus, 2)
+    run_stages(corpus, INPUT_FANOUT='2', OUTPUT_FANOUT='2')
+    assert parcel_dirs(corpus) == sorted(os.path.relpath(fanout_path('.', parcel_id, levels=2))
+                                         for parcel_id in PARCEL_IDS)
+    assert_same_outputs(reference, corpus)
+
+def test_manifest_limits_the_run(corpus, monkeypatch):
+    fan_out_inputs(corpus, 1)
+    manifest = os.path.join(corpus, 'manifest.txt')
+    with open(manifest, 'w') as f:
+        f.write(f'# two of the three parcels\n{PARCEL_IDS[2]}\n\n{PARCEL_IDS[0]}\n00000000000000000\n')
+    output = run_stages(corpus, INPUT_MANIFEST=manifest, INPUT_FANOUT='1')
+    assert parcel_dirs(corpus) == sorted([PARCEL_IDS[0], PARCEL_IDS[2]])
+    assert '00000000000000000 is in the manifest but' in output
+    # Parcels come in manifest order
+    monkeypatch.setattr(input_discovery, 'INPUT_FANOUT', 1)
+    found = [parcel_id for parcel_id, _ in iter_input_files(os.path.join(corpus, 'input'), manifest=manifest)]
+    assert found == [PARCEL_IDS[2], PARCEL_IDS[0]]
@@ -0,0 +1,39 @@
+import os
+import sys
+import json
+import subprocess
+
+from conftest import SCRIPTS_DIR, CLEAN_ENV, PARCEL_IDS
+from memory_benchmark import STAGES, run_stage, growth_per_1k
+
+def test_each_stage_reports_its_peak_and_allocators(corpus):
+    for stage in STAGES:
+        result = run_stage(stage, corpus, 3, True)
+        assert 'error' not in result, (stage, result)
+        assert result['peak_rss_mb'] > 0 and result['tracemalloc_peak_mb'] > 0
+        assert 0 < len(result['top_allocators']) <= 3
+    # The stages ran for real, in order
+    assert sorted(os.listdir(os.path.join(corpus, 'data'))) == PARCEL_IDS
+    assert 'tracemalloc_peak_mb' not in run_stage('owner_processor', corpus, 3, False)
+
+def test_failed_stage_reports_its_error(tmp_path):
+    result = run_stage('data_extractor', str(tmp_path), 3, False)
+    assert 'FileNotFoundError' in result['error']
+
+def test_growth_per_1k():
+    runs = {'100': {'s': {'peak_rss_mb': 50.0}}, '1100': {'s': {'peak_rss_mb': 80.0}, 't': {'error': 'x'}}}
+    assert growth_per_1k(runs, 's', [100, 1100]) == 30.0
+    assert growth_per_1k(runs, 't', [100, 1100]) is None
+
+def test_report_and_target(tmp_path):
+    report_path = str(tmp_path / 'report.json')
+    proc = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'memory_benchmark.py'), '--sizes', '2,4',
+                           '--stages', 'owner_processor', '--no-tracemalloc', '--target', 'owner_processor=1',
+                           '--output', report_path], cwd=str(tmp_path), env=CLEAN_ENV, capture_output=True, text=True)
+    # No stage runs in 1MB of RSS
+    assert proc.returncode == 1, proc.stderr
+    with open(report_path) as f:
+        report = json.load(f)
+    assert report['sizes'] == [2, 4] and not report['tracemalloc']
+    assert report['summary']['owner_processor']['within_target'] is False
+    assert report['runs']['4']['owner_processor']['peak_rss_mb'] > 0
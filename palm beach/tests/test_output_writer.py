@@ -0,0 +1,122 @@
+import os
+import json
+
+import pytest
+
+from conftest import run_stages, PARCEL_IDS
+import output_writer
+from output_writer import ParcelWriter, ParcelLock, recover_parcel_dir, _publish, _exchange, _sibling
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+def make_dir(path, files):
+    os.makedirs(path)
+    for name, text in files.items():
+        with open(os.path.join(path, name), 'w') as f:
+            f.write(text)
+
+def read_dir(path):
+    files = {}
+    for name in os.listdir(path):
+        with open(os.path.join(path, name)) as f:
+            files[name] = f.read()
+    return files
+
+@pytest.fixture(params=['exchange', 'two renames'])
+def publish_mode(request, monkeypatch):
+    if request.param == 'exchange':
+        if output_writer._renameat2 is None:
+            pytest.skip('renameat2 is not available')
+    else:
+        monkeypatch.setattr(output_writer, '_renameat2', None)
+    return request.param
+
+def test_publish_replaces_the_parcel_directory(tmp_path, publish_mode):
+    parcel = str(tmp_path / 'p1')
+    staging = _sibling(parcel, '.staging')
+    make_dir(staging, {'a.json': 'new'})
+    _publish(staging, parcel)
+    assert read_dir(parcel) == {'a.json': 'new'}
+    make_dir(staging, {'b.json': 'newer'})
+    _publish(staging, parcel)
+    assert read_dir(parcel) == {'b.json': 'newer'}
+    assert sorted(os.listdir(str(tmp_path))) == ['p1']
+
+def test_exchange_swaps_two_directories(tmp_path):
+    a, b = str(tmp_path / 'a'), str(tmp_path / 'b')
+    make_dir(a, {'x': 'a'})
+    make_dir(b, {'x': 'b'})
+    if not _exchange(a, b):
+        pytest.skip('the platform or filesystem cannot exchange')
+    assert read_dir(a) == {'x': 'b'} and read_dir(b) == {'x': 'a'}
+
+# The parcel path never goes missing, even for a reader that doesn't lock:
+# the old directory is never renamed away, only swapped out
+def test_publish_over_a_parcel_only_exchanges(tmp_path, monkeypatch):
+    if output_writer._renameat2 is None:
+        pytest.skip('renameat2 is not available')
+    parcel = str(tmp_path / 'p1')
+    make_dir(parcel, {'a.json': 'old'})
+    staging = _sibling(parcel, '.staging')
+    make_dir(staging, {'a.json': 'new'})
+
+    def rename(src, dst):
+        raise AssertionError(f'renamed {src} to {dst}')
+    monkeypatch.setattr(os, 'rename', rename)
+    _publish(staging, parcel)
+    assert read_dir(parcel) == {'a.json': 'new'}
+
+def test_recovery_after_a_crash(tmp_path):
+    parcel = str(tmp_path / 'p1')
+    # Died after moving the old directory aside
+    make_dir(_sibling(parcel, '.previous'), {'a.json': 'old'})
+    make_dir(_sibling(parcel, '.staging'), {'a.json': 'half'})
+    recover_parcel_dir(parcel)
+    assert read_dir(parcel) == {'a.json': 'old'}
+    # Died after moving the new one in
+    make_dir(_sibling(parcel, '.previous'), {'a.json': 'older'})
+    recover_parcel_dir(parcel)
+    assert read_dir(parcel) == {'a.json': 'old'}
+    assert sorted(os.listdir(str(tmp_path))) == ['p1']
+
+def test_writer_stages_only_changes(tmp_path):
+    parcel, locks = str(tmp_path / 'p1'), str(tmp_path / 'locks')
+    writer = ParcelWriter(parcel, lock_dir=locks)
+    writer.write('a.json', {'v': 1})
+    writer.write('b.json', {'v': 1})
+    writer.write('empty.json', {'v': None})
+    assert writer.finish() == {'added': ['a.json', 'b.json'], 'changed': [], 'removed': []}
+    inode = os.stat(os.path.join(parcel, 'b.json')).st_ino
+    writer = ParcelWriter(parcel, lock_dir=locks)
+    writer.write('a.json', {'v': 2})
+    writer.write('b.json', {'v': 1})
+    assert writer.finish() == {'added': [], 'changed': ['a.json'], 'removed': []}
+    # The unchanged file was carried over as is
+    assert os.stat(os.path.join(parcel, 'b.json')).st_ino == inode
+    writer = ParcelWriter(parcel, lock_dir=locks)
+    writer.write('a.json', {'v': 3})
+    writer.abort()
+    assert json.loads(read_dir(parcel)['a.json']) == {'v': 2}
+    assert sorted(os.listdir(str(tmp_path))) == ['locks', 'p1']
+
+@pytest.mark.skipif(fcntl is None, reason='no fcntl')
+def test_lock_excludes_other_holders(tmp_path):
+    parcel, locks = str(tmp_path / 'p1'), str(tmp_path / 'locks')
+    lock = ParcelLock(parcel, locks)
+    [stripe] = os.listdir(locks)
+    with open(os.path.join(locks, stripe), 'a') as other:
+        with pytest.raises(BlockingIOError):
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        lock.release()
+        fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+def test_lock_directory_stays_outside_the_output(corpus, tmp_path):
+    run_stages(corpus)
+    assert sorted(os.listdir(os.path.join(corpus, 'data'))) == PARCEL_IDS
+    assert os.listdir(os.path.join(corpus, 'data.locks'))
+    locks = str(tmp_path / 'locks')
+    run_stages(corpus, ['data_extractor'], PARCEL_LOCK_DIR=locks)
+    assert len(os.listdir(locks)) <= len(PARCEL_IDS)
@@ -0,0 +1,50 @@
+import os
+
+from bs4 import BeautifulSoup
+
+from conftest import run_stages, assert_same_outputs, FIXTURE_CORPUS, PARCEL_IDS
+import page_facts
+
+def fixture_html(parcel_id):
+    with open(os.path.join(FIXTURE_CORPUS, 'input', f'{parcel_id}.html'), encoding='utf-8') as f:
+        return f.read()
+
+def cache_entries(cache_dir):
+    return {os.path.join(dirpath, name): os.stat(os.path.join(dirpath, name)).st_mtime_ns
+            for dirpath, _, filenames in os.walk(cache_dir) for name in filenames}
+
+def test_facts_record_what_the_extractors_read():
+    facts = page_facts.parse_facts(fixture_html(PARCEL_IDS[0]))
+    assert facts['version'] == page_facts.FACTS_VERSION
+    assert facts['ids']['MainContent_lblLegalDesc'] == 'LOT 5 & 6 BLK 3'
+    assert [heading for heading, _ in facts['headings']][:2] == ['Property detail', 'Owner INFORMATION']
+    assert ['td', ['$250,000'], True] in [cell[:3] for cell in facts['cells']]
+    soup = BeautifulSoup(fixture_html(PARCEL_IDS[0]), 'html.parser')
+    assert page_facts.facts_from_soup(soup) == facts
+
+def test_cached_facts_are_served_without_parsing(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_facts, 'FACTS_CACHE_DIR', str(tmp_path))
+    html = fixture_html(PARCEL_IDS[1])
+    facts = page_facts.facts_for_html(html)
+    assert len(cache_entries(str(tmp_path))) == 1
+
+    def parse(html):
+        raise AssertionError('parsed a cached page')
+    monkeypatch.setattr(page_facts, 'parse_facts', parse)
+    assert page_facts.facts_for_html(html) == facts
+    # Each backend keeps its own entries
+    monkeypatch.setattr(page_facts, 'FACTS_BACKEND', 'stream')
+    monkeypatch.setattr(page_facts, 'parse_facts', page_facts._parse)
+    assert page_facts.facts_for_html(html) == facts
+    assert len(cache_entries(str(tmp_path))) == 2
+
+def test_pipeline_with_the_facts_cache(corpus, reference, tmp_path):
+    cache_dir = str(tmp_path / 'facts')
+    run_stages(corpus, FACTS_CACHE_DIR=cache_dir)
+    assert_same_outputs(reference, corpus)
+    # One entry per page, however many stages read it
+    entries = cache_entries(cache_dir)
+    assert len(entries) == len(PARCEL_IDS)
+    run_stages(corpus, FACTS_CACHE_DIR=cache_dir)
+    assert cache_entries(cache_dir) == entries
+    assert_same_outputs(reference, corpus)
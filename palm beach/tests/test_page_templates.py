@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from conftest import run_stages, assert_same_outputs, SCRIPTS_DIR, CLEAN_ENV, FIXTURE_CORPUS, PARCEL_IDS
+import page_facts
+import page_templates
+from page_templates import skeleton, template_facts
+
+def page(parcel_id):
+    with open(os.path.join(FIXTURE_CORPUS, 'input', f'{parcel_id}.html'), encoding='utf-8') as f:
+        return f.read()
+
+# The first and the third fixture parcels share a layout
+SAME_LAYOUT = (PARCEL_IDS[0], PARCEL_IDS[2])
+
+class CountingParse:
+    def __init__(self, parse=page_facts._parse):
+        self.parse = parse
+        self.calls = 0
+
+    def __call__(self, html):
+        self.calls += 1
+        return self.parse(html)
+
+def refuse(html):
+    raise AssertionError('the page was parsed')
+
+@pytest.fixture(autouse=True)
+def fresh_templates(monkeypatch):
+    monkeypatch.setattr(page_templates, 'templates', {})
+    monkeypatch.setattr(page_templates, 'PAGE_TEMPLATES_DIR', None)
+
+def test_skeleton_ignores_text():
+    first, third = (skeleton(page(parcel_id)) for parcel_id in SAME_LAYOUT)
+    assert first[0] == third[0] and first[2] != third[2]
+    assert skeleton(page(PARCEL_IDS[1]))[0] != first[0]
+    assert skeleton('<td>a</td>')[0] == skeleton('<td>b</td>')[0] != skeleton('<td>a</td><td>b</td>')[0]
+
+@pytest.mark.parametrize('html', [
+    '<td>1 < 2 <b</td>',
+    '<td>a</td><!-- unclosed',
+    '<script>document.write("</p>")</script>',
+    '<script/><td>a</td>',
+    # Text that holds a placeholder character
+    '<td>\ue000</td>',
+])
+def test_markup_it_cannot_vouch_for_is_parsed(html):
+    assert skeleton(html) is None
+    assert template_facts(html, refuse, page_facts.FACTS_VERSION, 'soup') is None
+
+def test_learned_template_fills_the_next_page():
+    first, third = (page(parcel_id) for parcel_id in SAME_LAYOUT)
+    parse = CountingParse()
+    assert template_facts(first, parse, page_facts.FACTS_VERSION, 'soup') == page_facts._parse(first)
+    # Once with placeholders to learn the template, once for the page itself
+    assert parse.calls == 2
+    assert template_facts(third, refuse, page_facts.FACTS_VERSION, 'soup') == page_facts._parse(third)
+
+def test_templates_are_kept_per_backend():
+    first, third = (page(parcel_id) for parcel_id in SAME_LAYOUT)
+    template_facts(first, page_facts._parse, page_facts.FACTS_VERSION, 'soup')
+    parse = CountingParse()
+    template_facts(third, parse, page_facts.FACTS_VERSION, 'stream')
+    assert parse.calls == 2
+
+def test_a_layout_that_does_not_learn_falls_back_for_good():
+    first, third = (page(parcel_id) for parcel_id in SAME_LAYOUT)
+    # Facts that don't carry the text runs can't be a template
+    parse = CountingParse(lambda html: {'cells': [], 'title': 'fixed'})
+    assert template_facts(first, parse, page_facts.FACTS_VERSION, 'soup') == {'cells': [], 'title': 'fixed'}
+    assert template_facts(third, refuse, page_facts.FACTS_VERSION, 'soup') is None
+
+def test_stored_templates_are_reused(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_templates, 'PAGE_TEMPLATES_DIR', str(tmp_path))
+    first, third = (page(parcel_id) for parcel_id in SAME_LAYOUT)
+    template_facts(first, page_facts._parse, page_facts.FACTS_VERSION, 'soup')
+    [(_, _, [stored])] = [entry for entry in os.walk(str(tmp_path)) if entry[2]]
+    assert stored.startswith(f'{page_facts.FACTS_VERSION}_soup_')
+    # A later process starts with an empty cache
+    monkeypatch.setattr(page_templates, 'templates', {})
+    assert template_facts(third, refuse, page_facts.FACTS_VERSION, 'soup') == page_facts._parse(third)
+
+@pytest.mark.parametrize('backend', ['soup', 'stream'])
+def test_template_pipeline(corpus, reference, tmp_path, backend):
+    templates_dir = str(tmp_path / 'templates')
+    run_stages(corpus, PAGE_TEMPLATES='1', PAGE_TEMPLATES_DIR=templates_dir, FACTS_BACKEND=backend)
+    assert_same_outputs(reference, corpus)
+    # One template per layout
+    assert sum(len(filenames) for _, _, filenames in os.walk(templates_dir)) == 2
+
+def test_fuzzed_layouts_agree_with_the_parse(tmp_path):
+    report_path = str(tmp_path / 'facts_check.json')
+    proc = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'facts_check.py'), '--checks', 'templates',
+                           '--fuzz', '10', '--corpus', FIXTURE_CORPUS, '--output', report_path],
+                          env=CLEAN_ENV, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stdout
+    with open(report_path) as f:
+        templates = json.load(f)['checks']['templates']
+    assert templates['compared'] > 0 and templates['mismatches'] == 0
@@ -0,0 +1,74 @@
+import os
+import json
+import time
+import signal
+import filecmp
+
+import pytest
+
+from conftest import run_stages, PARCEL_IDS
+from parcel_budget import parcel_budget, ParcelBudgetExceeded
+import data_extractor
+
+def busy(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+def test_timeout_interrupts_the_body_and_restores_the_handler():
+    previous = signal.getsignal(signal.SIGALRM)
+    with pytest.raises(ParcelBudgetExceeded):
+        with parcel_budget(max_seconds=0.02):
+            busy(2)
+    assert signal.getsignal(signal.SIGALRM) is previous
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+def test_memory_limit_interrupts_the_body():
+    with pytest.raises(ParcelBudgetExceeded, match='memory grew'):
+        with parcel_budget(max_memory_mb=16):
+            grown = b'x' * (64 * 1024 * 1024)
+            busy(2)
+    del grown
+
+def test_no_limits_leave_the_body_alone():
+    with parcel_budget(max_seconds=0, max_memory_mb=0):
+        busy(0.05)
+
+def snapshot(data_dir):
+    return {name: sorted(os.listdir(os.path.join(data_dir, name))) for name in sorted(os.listdir(data_dir))}
+
+def same_files(a, b):
+    return snapshot(a) == snapshot(b) and all(
+        not filecmp.dircmp(os.path.join(a, name), os.path.join(b, name)).diff_files for name in os.listdir(a))
+
+# The budget running out after part of a parcel was staged publishes none of it
+def test_discard_keeps_the_published_parcel(corpus, reference, monkeypatch):
+    run_stages(corpus)
+    monkeypatch.chdir(corpus)
+    parcel_id = PARCEL_IDS[0]
+
+    def run_out(parcel_id, html, writer, *context):
+        writer.write('sales_1.json', {'purchase_price_amount': 1})
+        writer.write('sales_9.json', {'purchase_price_amount': 9})
+        raise ParcelBudgetExceeded('out of time')
+
+    monkeypatch.setattr(data_extractor, 'process_parcel', run_out)
+    changes, exceeded = data_extractor.publish_parcel((parcel_id, None), [b''], (None,) * 5)
+    assert changes == {'added': [], 'changed': [], 'removed': []}
+    assert str(exceeded) == 'out of time'
+    assert sorted(os.listdir('data')) == PARCEL_IDS
+    assert same_files('data', os.path.join(reference, 'data'))
+
+def test_abandoned_parcels_are_listed_for_retry(corpus, reference):
+    run_stages(corpus)
+    # A millisecond is less than any fixture parcel takes to build
+    output = run_stages(corpus, ['data_extractor'], PARCEL_TIMEOUT_SECONDS='0.001')
+    with open(os.path.join(corpus, 'logs', 'retry_data_extractor.json')) as f:
+        retry = json.load(f)
+    assert sorted(entry['parcel_id'] for entry in retry) == PARCEL_IDS
+    assert output.count('Abandoned') == len(PARCEL_IDS)
+    assert sorted(os.listdir(os.path.join(corpus, 'data'))) == PARCEL_IDS
+    assert same_files(os.path.join(corpus, 'data'), os.path.join(reference, 'data'))
+    # A run within budget clears the list again
+    run_stages(corpus, ['data_extractor'])
+    assert not os.path.exists(os.path.join(corpus, 'logs', 'retry_data_extractor.json'))
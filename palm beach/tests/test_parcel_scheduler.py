@@ -0,0 +1,60 @@
+import os
+import multiprocessing
+
+import pytest
+
+from conftest import run_stages, assert_same_outputs, FIXTURE_CORPUS
+from input_discovery import iter_input_files
+from run_metrics import RunMetrics
+from slow_parcels import SlowParcelCapture
+from parcel_scheduler import plan_chunks, process_parcels, WorkerList
+
+needs_fork = pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='no fork()')
+
+def fixture_items():
+    return sorted(iter_input_files(os.path.join(FIXTURE_CORPUS, 'input')))
+
+def test_plan_chunks():
+    costs = [5, 100, 1, 40, 1, 3, 1, 20, 1, 1]
+    chunks = plan_chunks(costs, 2)
+    assert sorted(i for chunk in chunks for i in chunk) == list(range(len(costs)))
+    # Costliest first, and the run ends on single parcels
+    assert [i for chunk in chunks for i in chunk][:3] == [1, 3, 7]
+    assert chunks[0] == [1] and all(len(chunk) == 1 for chunk in chunks[-3:])
+    assert plan_chunks([], 2) == []
+
+@needs_fork
+@pytest.mark.parametrize('workers', [1, 2])
+def test_results_come_back_in_input_order(workers):
+    seen = WorkerList()
+
+    def work(item, contents, context):
+        seen.append(item[0])
+        return context + len(contents[0])
+
+    items = fixture_items()
+    # The smallest page first, so the workers finish out of order
+    items.sort(key=lambda item: os.path.getsize(item[1]))
+    metrics = RunMetrics('s')
+    results = list(process_parcels(iter(items), work, metrics, SlowParcelCapture('s'), context=1,
+                                   shared=[seen], workers=workers))
+    assert [item for item, _ in results] == items
+    assert [value for _, value in results] == [1 + os.path.getsize(path) for _, path in items]
+    # Additions made on the workers are carried back
+    assert sorted(seen) == sorted(parcel_id for parcel_id, _ in items)
+    assert metrics.processed == len(items)
+
+@needs_fork
+def test_worker_errors_reach_the_stage():
+    def work(item, contents, context):
+        raise ValueError(item[0])
+
+    with pytest.raises(ValueError):
+        list(process_parcels(fixture_items(), work, RunMetrics('s'), SlowParcelCapture('s'), workers=2))
+
+@needs_fork
+def test_workers_pipeline(corpus, reference):
+    run_stages(corpus, PARCEL_WORKERS='2')
+    assert_same_outputs(reference, corpus)
+    run_stages(corpus, PARCEL_WORKERS='3', BATCH_MATCHING='1')
+    assert_same_outputs(reference, corpus)
@@ -0,0 +1,58 @@
+import os
+import sys
+import subprocess
+
+from conftest import run_stages, assert_same_outputs, SCRIPTS_DIR, CLEAN_ENV, PARCEL_IDS
+from pipeline import code_closure, STAGES
+
+def run_pipeline(corpus, *args, **env):
+    return subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'pipeline.py'), *args], cwd=corpus,
+                          env=dict(CLEAN_ENV, **env), capture_output=True, text=True)
+
+def plan(corpus, **env):
+    proc = run_pipeline(corpus, '--dry-run', **env)
+    assert proc.returncode == 0, proc.stderr
+    return {stage for stage, action in (line.split() for line in proc.stdout.splitlines()) if action == 'run'}
+
+def test_code_closure():
+    scripts = {os.path.basename(path) for path in code_closure('data_extractor')}
+    assert {'data_extractor.py', 'page_facts.py', 'output_writer.py', 'compressed_io.py'} <= scripts
+    assert 'pipeline.py' not in scripts and 'json.py' not in scripts
+
+def test_pipeline_matches_the_stages(corpus, reference):
+    proc = run_pipeline(corpus, '--jobs', '2')
+    assert proc.returncode == 0, proc.stdout
+    assert proc.stdout.count(': done in') == len(STAGES)
+    assert_same_outputs(reference, corpus)
+    layout = os.path.join(corpus, 'data', PARCEL_IDS[0], 'layout_1.json')
+    mtime = os.stat(layout).st_mtime_ns
+    output = run_stages(corpus, ['pipeline'])
+    assert output.count(': unchanged since') == len(STAGES)
+    assert os.stat(layout).st_mtime_ns == mtime
+
+def test_only_stale_stages_run(corpus):
+    run_stages(corpus, ['pipeline'])
+    assert plan(corpus) == set()
+    # Settings that only change how a run is observed leave every stage current
+    assert plan(corpus, PARCEL_WORKERS='2', METRICS_DIR='metrics') == set()
+    # A setting a stage reads makes it stale, and everything downstream of it
+    assert plan(corpus, BATCH_MATCHING='1') == {'address_extraction', 'data_extractor'}
+    seed = os.path.join(corpus, 'seed.csv')
+    os.utime(seed, ns=(os.stat(seed).st_atime_ns, os.stat(seed).st_mtime_ns + 10**9))
+    assert plan(corpus) == {'address_extraction', 'data_extractor'}
+    run_stages(corpus, ['pipeline'])
+    # Output removed behind its back is written again
+    os.remove(os.path.join(corpus, 'data', PARCEL_IDS[0], 'layout_1.json'))
+    assert plan(corpus) == {'data_extractor'}
+
+def test_failed_stage_blocks_its_downstream(corpus):
+    # owner_processor can't replace a directory with its output
+    os.makedirs(os.path.join(corpus, 'owners', 'owners_extracted.json'))
+    proc = run_pipeline(corpus, '--stages', 'owner_processor,data_extractor')
+    assert proc.returncode == 1
+    assert 'owner_processor: failed' in proc.stdout
+    assert 'data_extractor: not run, an upstream stage failed' in proc.stdout
+    assert not os.path.exists(os.path.join(corpus, 'data'))
+    # A failed stage is never taken as current
+    os.rmdir(os.path.join(corpus, 'owners', 'owners_extracted.json'))
+    assert plan(corpus) == set(STAGES)
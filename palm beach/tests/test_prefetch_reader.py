@@ -0,0 +1,44 @@
+import os
+
+from conftest import run_stages, assert_same_outputs, FIXTURE_CORPUS, PARCEL_IDS
+from prefetch_reader import prefetch
+
+def fixture_pages():
+    return [os.path.join(FIXTURE_CORPUS, 'input', f'{parcel_id}.html') for parcel_id in PARCEL_IDS]
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+class CountingIter:
+    def __init__(self, items):
+        self.items = iter(items)
+        self.pulled = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self.items)
+        self.pulled += 1
+        return item
+
+def test_items_come_back_in_order_with_their_files():
+    pages = fixture_pages() * 4
+    missing = os.path.join(FIXTURE_CORPUS, 'input', 'missing.html')
+    results = list(prefetch(pages, lambda path: (path, missing), ahead=3, workers=2))
+    assert [item for item, _ in results] == pages
+    assert [contents for _, contents in results] == [[read(path), None] for path in pages]
+
+def test_reads_ahead_no_further_than_allowed():
+    items = CountingIter(fixture_pages() * 3)
+    for i, _ in enumerate(prefetch(items, ahead=2)):
+        assert items.pulled <= i + 2
+    # A one-byte budget still lets one item through at a time
+    items = CountingIter(fixture_pages() * 3)
+    for i, _ in enumerate(prefetch(items, ahead=8, max_bytes=1)):
+        assert items.pulled == i + 1
+
+def test_pipeline_output_does_not_depend_on_read_ahead(corpus, reference):
+    run_stages(corpus, PREFETCH_AHEAD='1', PREFETCH_WORKERS='1', PREFETCH_MAX_MB='0.001')
+    assert_same_outputs(reference, corpus)
@@ -0,0 +1,74 @@
+import os
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import run_stages, STAGES, PARCEL_IDS
+import run_metrics
+from run_metrics import RunMetrics
+
+# 'extraction_x{stage="s",le="0.1"} 3' -> {'extraction_x{stage="s",le="0.1"}': 3.0}
+def parse_prom(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def test_histogram_and_counters():
+    metrics = RunMetrics('s')
+    metrics.observe(0.003)
+    metrics.observe(0.2, parcels=3)
+    metrics.wrote(100, files=2)
+    metrics.error('no_match')
+    samples = parse_prom(metrics.render())
+    assert samples['extraction_parcels_processed_total{stage="s"}'] == 4
+    assert samples['extraction_parcel_latency_seconds_bucket{stage="s",le="0.005"}'] == 1
+    assert samples['extraction_parcel_latency_seconds_bucket{stage="s",le="0.1"}'] == 1
+    assert samples['extraction_parcel_latency_seconds_bucket{stage="s",le="0.25"}'] == 4
+    assert samples['extraction_parcel_latency_seconds_bucket{stage="s",le="+Inf"}'] == 4
+    assert samples['extraction_parcel_latency_seconds_sum{stage="s"}'] == pytest.approx(0.603)
+    assert samples['extraction_errors_total{stage="s",kind="no_match"}'] == 1
+    assert samples['extraction_done{stage="s"}'] == 0
+
+def test_worker_counts_merge_into_the_parent():
+    worker, parent = RunMetrics('s'), RunMetrics('s')
+    worker.wrote(10)
+    worker.error('validation_failed')
+    parent.wrote(5)
+    parent.merge(worker.take())
+    assert worker.take() == (0, 0, {})
+    assert (parent.files_written, parent.bytes_written, parent.errors) == (2, 15, {'validation_failed': 1})
+
+def test_endpoint_serves_the_metrics(monkeypatch):
+    monkeypatch.setattr(run_metrics, 'METRICS_PORT', free_port())
+    metrics = RunMetrics('s').start()
+    try:
+        metrics.observe(0.01)
+        url = f'http://127.0.0.1:{run_metrics.METRICS_PORT}'
+        with urllib.request.urlopen(f'{url}/metrics') as response:
+            assert parse_prom(response.read().decode('utf-8'))['extraction_parcels_processed_total{stage="s"}'] == 1
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f'{url}/other')
+    finally:
+        metrics.close()
+
+def test_every_stage_writes_its_metrics_file(corpus, tmp_path):
+    metrics_dir = str(tmp_path / 'metrics')
+    run_stages(corpus, METRICS_DIR=metrics_dir)
+    assert sorted(os.listdir(metrics_dir)) == sorted(f'{stage}.prom' for stage in STAGES)
+    for stage in STAGES:
+        with open(os.path.join(metrics_dir, f'{stage}.prom')) as f:
+            samples = parse_prom(f.read())
+        label = f'{{stage="{stage}"}}'
+        assert samples[f'extraction_done{label}'] == 1
+        assert samples[f'extraction_parcels_processed_total{label}'] == len(PARCEL_IDS)
+        assert samples[f'extraction_files_written_total{label}'] > 0
@@ -0,0 +1,33 @@
+import os
+import json
+
+from conftest import run_stages, PARCEL_IDS
+from schema_validation import schema_name_for
+
+def write_schema(corpus, name, schema):
+    with open(os.path.join(corpus, 'schemas', f'{name}.json'), 'w') as f:
+        json.dump(schema, f)
+
+def test_schema_name_for():
+    assert schema_name_for('sales_1.json') == 'sales'
+    assert schema_name_for('tax_2024.json') == 'tax'
+    assert schema_name_for('relationship_sales_person_1_2.json') == 'relationship_sales_person'
+
+def test_entities_are_checked_against_their_schemas(corpus):
+    # Sale prices are numbers, so every sale fails this one
+    write_schema(corpus, 'sales', {'type': 'object', 'required': ['purchase_price_amount'],
+                                   'properties': {'purchase_price_amount': {'type': 'string'}}})
+    write_schema(corpus, 'person', {'type': 'object', 'required': ['first_name', 'last_name'],
+                                    'properties': {'first_name': {'type': 'string'}, 'last_name': {'type': 'string'}}})
+    run_stages(corpus, DEDUPE_OWNERS='1')
+    with open(os.path.join(corpus, 'logs', 'validation_report.json')) as f:
+        report = json.load(f)
+    assert report['parcels_with_failures'] == len(PARCEL_IDS)
+    failed = sorted(entry['file'] for errors in report['failures'].values() for entry in errors)
+    assert failed == sorted(['sales_1.json', 'sales_2.json'] * len(PARCEL_IDS))
+    # Shared person_<digest> copies are checked under the person schema
+    assert not [name for name in report['records_without_schema'] if name.startswith('person')]
+    assert 'sales' not in report['records_without_schema']
+    people = len([n for n in os.listdir(os.path.join(corpus, 'shared_entities')) if n.startswith('person_')])
+    addresses = len(PARCEL_IDS)
+    assert report['records_checked'] == addresses + len(failed) + people
@@ -0,0 +1,62 @@
+import os
+import csv
+import json
+
+from conftest import run_stages, STAGES, PARCEL_IDS
+import slow_parcels
+from slow_parcels import SlowParcelCapture
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def data_files(parcel_dir):
+    return {name: load(os.path.join(parcel_dir, name)) for name in os.listdir(parcel_dir)}
+
+# Any parcel is slower than a nanosecond
+def capture_all(corpus, **env):
+    return run_stages(corpus, SLOW_PARCEL_SECONDS='0.000000001', QUARANTINE_DIR='quarantine', **env)
+
+def test_capture_writes_runnable_cases(corpus, reference):
+    output = capture_all(corpus)
+    assert f'captured {len(PARCEL_IDS)} slow parcels' in output
+    quarantine = os.path.join(corpus, 'quarantine')
+    assert sorted(name for name in os.listdir(quarantine) if not name.startswith('.')) == PARCEL_IDS
+    case_dir = os.path.join(quarantine, PARCEL_IDS[1])
+    assert sorted(os.listdir(case_dir)) == ['breakdown.json', 'input', 'possible_addresses', 'schemas', 'seed.csv']
+    with open(os.path.join(case_dir, 'seed.csv'), newline='') as f:
+        assert [row['parcel_id'] for row in csv.DictReader(f)] == [PARCEL_IDS[1]]
+    breakdown = load(os.path.join(case_dir, 'breakdown.json'))
+    assert sorted(breakdown['stages']) == sorted(STAGES)
+    assert [c['stage'] for c in breakdown['captured']] == STAGES
+    assert set(breakdown['stages']['data_extractor']['phases']) >= {'parse', 'build', 'publish'}
+    assert breakdown['slowest_stage'] in STAGES
+    # A case is a one-parcel corpus the stages rerun as is
+    os.makedirs(os.path.join(case_dir, 'owners'))
+    run_stages(case_dir)
+    assert data_files(os.path.join(case_dir, 'data', PARCEL_IDS[1])) == \
+        data_files(os.path.join(reference, 'data', PARCEL_IDS[1]))
+
+def test_quarantined_parcels_keep_getting_timed(corpus):
+    capture_all(corpus, PARCEL_WORKERS='2')
+    path = os.path.join(corpus, 'quarantine', PARCEL_IDS[0], 'breakdown.json')
+    captured = load(path)['captured']
+    output = run_stages(corpus, ['owner_processor'], SLOW_PARCEL_SECONDS='1000', QUARANTINE_DIR='quarantine')
+    assert 'captured' not in output
+    breakdown = load(path)
+    assert breakdown['captured'] == captured
+    assert breakdown['stages']['owner_processor']['seconds'] < 1000
+
+def test_partly_written_timing_lines_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(slow_parcels, 'TIMINGS_DIR', str(tmp_path))
+    with open(str(tmp_path / 'owner_processor.jsonl'), 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'parcel_id': 'p1', 'seconds': 0.5, 'rss_growth_mb': 0.0}) + '\n')
+        f.write('{"parcel_id": "p2", "seco')
+    capture = SlowParcelCapture('data_extractor')
+    assert capture._other_stage_timings(['p1', 'p2']) == \
+        {'p1': {'owner_processor': {'seconds': 0.5, 'rss_growth_mb': 0.0}}}
+
+def test_disabled_without_a_threshold(corpus):
+    run_stages(corpus, ['owner_processor'], QUARANTINE_DIR='quarantine')
+    assert not os.path.exists(os.path.join(corpus, 'quarantine'))
+    assert not os.path.exists(os.path.join(corpus, 'logs', 'parcel_timings'))
@@ -0,0 +1,49 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import run_stages, assert_same_outputs, SCRIPTS_DIR, CLEAN_ENV, FIXTURE_CORPUS, PARCEL_IDS
+from page_facts import facts_from_soup
+from stream_facts import stream_facts
+
+def soup_facts(html):
+    facts = facts_from_soup(BeautifulSoup(html, 'html.parser'))
+    facts.pop('version')
+    return facts
+
+def fixture_pages():
+    pages = []
+    for parcel_id in PARCEL_IDS:
+        with open(os.path.join(FIXTURE_CORPUS, 'input', f'{parcel_id}.html'), encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+@pytest.mark.parametrize('html', fixture_pages() + [
+    '<table><tr><td>a<td>b</tr><tr><th>c</table>',
+    '<div class="table_scroll x"><table><tr><td><span> A </span><span>B</span></td></tr></table></div>',
+    '<h2>Sales <b>INFORMATION</b></h2><h2>Taxes</h2>',
+    '<td>1 &lt; 2 &amp;&nbsp;3</td><script>if (a < b) {}</script><td><!-- c -->x</td>',
+    '<pre>\n  pad</pre><td>\n</td><br/><p/>',
+    '<span id="MainContent_lblPCN">a<b>b</b></span><span id="MainContent_lblPCN">second</span>',
+    '</td></tr>stray<tr>',
+])
+def test_stream_facts_match_the_tree(html):
+    facts = stream_facts(html)
+    facts.pop('version', None)
+    assert facts == soup_facts(html)
+
+def test_stream_backend_pipeline(corpus, reference):
+    run_stages(corpus, FACTS_BACKEND='stream')
+    assert_same_outputs(reference, corpus)
+
+def test_fuzzed_documents_agree_with_the_tree(tmp_path):
+    report_path = str(tmp_path / 'facts_check.json')
+    proc = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'facts_check.py'), '--checks', 'stream',
+                           '--fuzz', '300', '--output', report_path], env=CLEAN_ENV, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stdout
+    with open(report_path) as f:
+        assert json.load(f)['checks']['stream']['compared'] == 300
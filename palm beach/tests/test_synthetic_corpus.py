@@ -0,0 +1,59 @@
+import os
+import sys
+import argparse
+import filecmp
+import subprocess
+
+import pytest
+
+from conftest import run_stages, SCRIPTS_DIR, CLEAN_ENV
+from synthetic_corpus import generate_corpus, parse_count
+from candidate_store import CandidateStore
+
+def corpus_files(root):
+    return sorted(os.path.relpath(os.path.join(dirpath, name), root)
+                  for dirpath, _, filenames in os.walk(root) for name in filenames)
+
+def test_corpus_depends_only_on_the_seed(tmp_path):
+    a, b, c = (str(tmp_path / name) for name in 'abc')
+    assert generate_corpus(a, 12, seed=3)[0] == 12
+    # Parcels are generated independently, so splitting the work changes nothing
+    generate_corpus(b, 12, seed=3, jobs=2)
+    generate_corpus(c, 12, seed=4)
+    assert corpus_files(a) == corpus_files(b)
+    assert not filecmp.cmpfiles(a, b, corpus_files(a), shallow=False)[1]
+    assert not filecmp.cmp(os.path.join(a, 'seed.csv'), os.path.join(c, 'seed.csv'), shallow=False)
+
+def test_shape(tmp_path):
+    root = str(tmp_path / 'corpus')
+    parcels, html_bytes = generate_corpus(root, 6, shape={'page_kb': 8, 'sales': (0, 2), 'tax_years': 2})
+    pages = []
+    for name in os.listdir(os.path.join(root, 'input')):
+        with open(os.path.join(root, 'input', name), encoding='utf-8') as f:
+            pages.append(f.read())
+    assert html_bytes == sum(len(page) for page in pages)
+    assert all(8 * 1024 - 100 <= len(page) <= 8 * 1024 + 100 for page in pages)
+    # Each sales row ends with the owner cell, after the four header cells
+    assert all(0 <= page.count('</td></tr>', page.index('Sales INFORMATION'), page.index('Exemption')) <= 2
+               for page in pages)
+    assert all(page.count('<th>2024</th><th>2023</th></tr>') == 3 for page in pages)
+
+def test_parse_count():
+    assert parse_count('3') == 3
+    assert parse_count('0-12') == (0, 12)
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_count('5-1')
+
+def test_generated_corpus_runs_through_the_pipeline(tmp_path):
+    root = str(tmp_path / 'corpus')
+    proc = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'synthetic_corpus.py'), root, '--parcels', '8',
+                           '--fanout', '1', '--units', '1-3', '--jobs', '1', '--pack'],
+                          env=CLEAN_ENV, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    store = CandidateStore(os.path.join(root, 'possible_addresses.sqlite'))
+    try:
+        assert len(store) == 8
+    finally:
+        store.close()
+    run_stages(root, INPUT_FANOUT='1', CANDIDATE_STORE='1')
+    assert len(os.listdir(os.path.join(root, 'data'))) == 8
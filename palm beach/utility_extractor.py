@@ -1,13 +1,20 @@
-import os
-import json
 import re
-from bs4 import BeautifulSoup
+from page_facts import load_facts
+from parcel_scheduler import process_parcels
+from input_discovery import iter_input_files
+from parcel_budget import parcel_budget, ParcelBudgetExceeded, RetryList
+from run_metrics import RunMetrics
+from slow_parcels import SlowParcelCapture
+from compressed_io import dump_json
+from extraction_profiles import skip_stage
 
 INPUT_DIR = './input/'
 OUTPUT_FILE = './owners/utility_data.json'
 
 def extract_utility_from_html(html, file_id):
-    soup = BeautifulSoup(html, 'html.parser')
+    return extract_utility_from_facts(load_facts(html), file_id)
+
+def extract_utility_from_facts(facts, file_id):
     utility = {
         'request_identifier': file_id,
         'source_http_request': {},
@@ -32,16 +39,14 @@ def extract_utility_from_html(html, file_id):
         'hvac_unit_issues': None
     }
     # HVAC
-    ac = soup.find(text=re.compile(r'Air Condition'))
-    if ac:
-        val = ac.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Air Condition'))
+    if val is not None:
         if 'AC' in val.upper() or 'CENTRAL' in val.upper():
             utility['cooling_system_type'] = 'CentralAir'
         elif 'DUCTLESS' in val.upper():
             utility['cooling_system_type'] = 'Ductless'
-    heat = soup.find(text=re.compile(r'Heat Type'))
-    if heat:
-        val = heat.find_parent('tr').find_all('td')[-1].get_text(strip=True)
+    val = facts.row_value(re.compile(r'Heat Type'))
+    if val is not None:
         if 'FORCED AIR' in val.upper():
             utility['heating_system_type'] = 'ElectricFurnace'
         elif 'ELECTRIC' in val.upper():
@@ -57,18 +62,34 @@ def extract_utility_from_html(html, file_id):
     utility['water_source_type'] = None
     return utility
 
+# One parcel's entry, or the ParcelBudgetExceeded that cut it short
+def utility_entry(item, pages, context):
+    file_id, _ = item
+    html, = pages
+    try:
+        with parcel_budget():
+            return extract_utility_from_html(html, file_id)
+    except ParcelBudgetExceeded as e:
+        return e
+
 def main():
+    if skip_stage('utility_extractor'):
+        return
     result = {}
-    for fname in os.listdir(INPUT_DIR):
-        if not fname.endswith('.html'):
+    retry_list = RetryList('utility_extractor')
+    metrics = RunMetrics('utility_extractor').start(INPUT_DIR)
+    slow_parcels = SlowParcelCapture('utility_extractor').start()
+    for (file_id, _), entry in process_parcels(iter_input_files(INPUT_DIR), utility_entry, metrics, slow_parcels):
+        if isinstance(entry, ParcelBudgetExceeded):
+            retry_list.add(file_id, str(entry))
+            metrics.error('budget_exceeded')
             continue
-        file_id = fname.replace('.html', '')
-        with open(os.path.join(INPUT_DIR, fname), 'r', encoding='utf-8') as f:
-            html = f.read()
-        utility = extract_utility_from_html(html, file_id)
-        result[f'property_{file_id}'] = utility
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(result, f, indent=2)
+        result[f'property_{file_id}'] = entry
+    retry_list.write()
+    _, nbytes = dump_json(result, OUTPUT_FILE)
+    metrics.wrote(nbytes)
+    slow_parcels.close()
+    metrics.close()
 
 if __name__ == '__main__':
     main()